@@ -0,0 +1,87 @@
+import numpy as np
+
+from candle_store_module import OHLCV_COLUMNS, arrays_to_frame, frame_to_arrays, interval_to_ms, to_ms
+
+# Binance opens weekly candles on Monday 00:00 UTC; the Unix epoch was a Thursday
+_INTERVAL_OFFSET_MS = {"1w": 4 * 86_400_000}
+
+
+def interval_offset_ms(interval):
+    """Offset of an interval's bucket boundaries from the Unix epoch (exchange alignment)"""
+    if interval in _INTERVAL_OFFSET_MS:
+        return _INTERVAL_OFFSET_MS[interval]
+    # Custom weekly multiples follow the same Monday alignment
+    return _INTERVAL_OFFSET_MS["1w"] if interval.strip().endswith("w") else 0
+
+
+def can_aggregate(base_interval, target_interval):
+    """True when whole base candles tile every target candle on the exchange boundaries"""
+    base_ms, target_ms = interval_to_ms(base_interval), interval_to_ms(target_interval)
+    if target_ms <= base_ms or target_ms % base_ms:
+        return False
+    offset_gap = interval_offset_ms(target_interval) - interval_offset_ms(base_interval)
+    return offset_gap % base_ms == 0
+
+
+def bucket_open_times(open_times, target_interval):
+    """Open time (ms) of the target candle that each base candle falls into"""
+    target_ms = interval_to_ms(target_interval)
+    offset = interval_offset_ms(target_interval)
+    return (open_times - offset) // target_ms * target_ms + offset
+
+
+def aggregate_arrays(open_times, values, base_interval, target_interval, now_ms=None, drop_incomplete=True):
+    """Roll base candles up into target candles with ``np.*.reduceat``.
+
+    ``open_times`` must be ascending ms timestamps and ``values`` an (n, 5) OHLCV array.
+    Open is the first open, High the max, Low the min, Close the last close and Volume the sum.
+    With ``drop_incomplete`` buckets missing base candles are dropped, except the newest one
+    when it is still forming at ``now_ms`` (matching what the exchange returns).
+    Returns (bucket open times, aggregated values).
+    """
+    if not can_aggregate(base_interval, target_interval):
+        raise ValueError(f"Cannot build {target_interval} candles from {base_interval} candles")
+    if len(open_times) == 0:
+        return np.empty(0, dtype=np.int64), np.empty((0, len(OHLCV_COLUMNS)))
+
+    open_times = np.asarray(open_times, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    buckets = bucket_open_times(open_times, target_interval)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)] - 1
+
+    out = np.empty((len(starts), len(OHLCV_COLUMNS)))
+    out[:, 0] = values[starts, 0]
+    out[:, 1] = np.maximum.reduceat(values[:, 1], starts)
+    out[:, 2] = np.minimum.reduceat(values[:, 2], starts)
+    out[:, 3] = values[ends, 3]
+    out[:, 4] = np.add.reduceat(values[:, 4], starts)
+    bucket_times = buckets[starts]
+
+    if drop_incomplete:
+        base_ms, target_ms = interval_to_ms(base_interval), interval_to_ms(target_interval)
+        counts = ends - starts + 1
+        complete = counts == target_ms // base_ms
+        if now_ms is not None:
+            # The forming candle is legitimately partial, as long as nothing up to "now" is missing
+            forming = (bucket_times <= now_ms) & (bucket_times + target_ms > now_ms)
+            complete |= forming & (counts == (now_ms - bucket_times) // base_ms + 1)
+        bucket_times, out = bucket_times[complete], out[complete]
+
+    return bucket_times, out
+
+
+def aggregate_ohlcv(df, target_interval, base_interval, now=None, drop_incomplete=True):
+    """Aggregate an OHLCV frame indexed by 'Open Time' into ``target_interval`` candles"""
+    open_times, values = frame_to_arrays(df if df.index.is_monotonic_increasing else df.sort_index())
+    bucket_times, out = aggregate_arrays(open_times, values, base_interval, target_interval,
+                                         now_ms=to_ms(now), drop_incomplete=drop_incomplete)
+    return arrays_to_frame(bucket_times, out)
+
+
+def best_base_interval(target_interval, available):
+    """Pick the coarsest available interval that tiles ``target_interval`` (fewest rows to reduce)"""
+    candidates = [interval for interval in available if can_aggregate(interval, target_interval)]
+    if not candidates:
+        return None
+    return max(candidates, key=interval_to_ms)
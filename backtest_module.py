@@ -0,0 +1,230 @@
+import numpy as np
+import pandas as pd
+
+from candle_store_module import OHLCV_COLUMNS
+from confluence_module import CONFLUENCE_RULES, evaluate_confluences
+from indicators_module import INDICATOR_COLUMNS, compute_indicators
+
+# Levels generate_trading_plan builds its stops and targets from
+PLAN_COLUMNS = ("ATR", "EMA_50", "R1", "S1", "BB_Upper", "BB_Lower")
+
+TRADE_COLUMNS = ["entry_time", "exit_time", "direction", "strength", "entry", "stop", "target", "exit",
+                 "exit_reason", "bars", "return_pct", "r_multiple"]
+
+
+def with_backtest_indicators(df, rules=None):
+    """``df`` with the rule and plan indicator columns (and those custom ``rules`` read), minus the warm-up rows.
+
+    Unlike add_indicators, bars with a NaN indicator after the warm-up (0/0 on a flat stretch)
+    are kept so the replay has no holes; the rules reading that value simply stay silent.
+    """
+    needed = {col for rule in CONFLUENCE_RULES for col in rule[4]} | set(PLAN_COLUMNS)
+    needed |= set(rules.columns if rules else ())
+    columns = [col for col in INDICATOR_COLUMNS if col in needed]
+    if set(columns) <= set(df.columns):
+        return df
+    indicators = compute_indicators(*(df[col].to_numpy() for col in OHLCV_COLUMNS), columns=columns)
+    warm_up = max((int(np.argmax(~np.isnan(values))) if not np.isnan(values).all() else len(df))
+                  for values in indicators.values())
+    return df.assign(**indicators).iloc[warm_up:]
+
+
+def _plan_levels(direction, fill, atr, ema_50, pivot_target, band_target, stop_rule, target_rule, atr_multiplier):
+    """Stop and target for one entry, following generate_trading_plan (None when no valid stop)"""
+    atr_stop = fill - direction * atr_multiplier * atr
+    # EMA 50 only works as a stop when it sits on the losing side of the entry
+    ema_stop = ema_50 if direction * (fill - ema_50) > 0 else None
+    if stop_rule == "atr" or ema_stop is None:
+        stop = atr_stop
+    elif stop_rule == "ema50":
+        stop = ema_stop
+    else:  # "nearest": whichever of the two would be hit first
+        stop = max(atr_stop, ema_stop) if direction > 0 else min(atr_stop, ema_stop)
+    risk = direction * (fill - stop)
+    if not risk > 0:
+        return None, None
+
+    candidates = {"pivot": [pivot_target, band_target], "band": [band_target, pivot_target]}[target_rule]
+    for target in candidates:
+        if direction * (target - fill) > 0:
+            return stop, target
+    return stop, fill + direction * 2 * risk  # Neither level is ahead of price: aim for 1:2
+
+
+def _find_exit(bars, start, end, stop, target, direction, scan=16, window=64):
+    """First bar in [start, end) touching the stop or target.
+
+    ``bars`` is (high, low) as arrays and as lists: the first ``scan`` bars (most trades end
+    there) are checked in plain Python, the rest in doubling NumPy windows. Returns
+    (bar, stop_hit) or (None, False); a bar touching both counts as a stop (conservative).
+    """
+    high, low, highs, lows = bars
+    for i in range(start, min(end, start + scan)):
+        stop_hit = lows[i] <= stop if direction > 0 else highs[i] >= stop
+        if stop_hit or (highs[i] >= target if direction > 0 else lows[i] <= target):
+            return i, stop_hit
+    i = start + scan
+    while i < end:
+        j = min(end, i + window)
+        if direction > 0:
+            stop_hit, target_hit = low[i:j] <= stop, high[i:j] >= target
+        else:
+            stop_hit, target_hit = high[i:j] >= stop, low[i:j] <= target
+        hits = stop_hit | target_hit
+        if hits.any():
+            k = int(hits.argmax())
+            return i + k, bool(stop_hit[k])
+        i, window = j, window * 2
+    return None, False
+
+
+def _equity_curve(close, entries, exits, directions, fills, nets, fee):
+    """Mark-to-market equity per bar (flat between trades) and the in-position mask"""
+    n = len(close)
+    after = np.cumprod(1 + nets)
+    before = np.r_[1.0, after[:-1]]
+    equity = np.ones(n)
+    # Balance after the most recent exit, carried forward over flat bars
+    last_exit = np.full(n, -1)
+    last_exit[exits] = np.arange(len(exits))
+    last_exit = np.maximum.accumulate(last_exit)
+    equity[last_exit >= 0] = after[last_exit[last_exit >= 0]]
+    # Open bars (entry .. exit - 1) are marked at the close
+    lengths = exits - entries
+    trade = np.repeat(np.arange(len(entries)), lengths)
+    bars = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths) + np.repeat(entries, lengths)
+    equity[bars] = before[trade] * (1 + directions[trade] * (close[bars] / fills[trade] - 1) - fee)
+    in_position = np.zeros(n, dtype=bool)
+    in_position[bars] = True
+    in_position[exits] = True
+    return equity, in_position
+
+
+class BacktestResult:
+    """Trades, mark-to-market equity curve and summary statistics of one backtest"""
+
+    def __init__(self, trades, equity, stats):
+        self.trades = trades
+        self.equity = equity
+        self.stats = stats
+
+    def summary(self):
+        s = self.stats
+        return "\n".join([
+            f"📊 Trades: {s['trades']} ({s['long_trades']} long / {s['short_trades']} short) over {s['bars']} bars",
+            f"🎯 Win rate: {s['win_rate']:.1f}% | Profit factor: {s['profit_factor']:.2f}",
+            f"💰 Expectancy: {s['expectancy_pct']:+.3f}% per trade ({s['expectancy_r']:+.2f}R)",
+            f"📈 Total return: {s['total_return_pct']:+.2f}% | Max drawdown: {s['max_drawdown_pct']:.2f}%",
+            f"⏱️ Exposure: {s['exposure_pct']:.1f}% of bars",
+        ])
+
+
+def run_backtest(df, threshold=3, min_strength=60, fee=0.001, slippage=0.0005, stop="nearest", target="pivot",
+                 atr_multiplier=1.5, max_holding=None, allow_short=True, history=None, params=None,
+                 strength_weights=None, rules=None):
+    """Replay the confluence trading plan over ``df`` (OHLCV, indicators added when missing).
+
+    A bar whose bias is Bullish/Bearish with strength above ``min_strength`` (scored like
+    calculate_confluence_strength) opens a trade at the next bar's open. The stop is 1.5 ATR or
+    EMA 50 (``stop``: 'atr', 'ema50' or 'nearest'), the target R1/S1 or the Bollinger band
+    (``target``: 'pivot' or 'band', falling back to the other and then to 1:2). One position at
+    a time. ``fee`` is charged per side; ``slippage`` worsens market fills (entry, stop, time
+    exit) but not the limit target. ``history`` can pass a precomputed ConfluenceHistory;
+    otherwise ``params``/``strength_weights`` tune the rules and ``rules`` adds custom ones, as in
+    evaluate_confluences.
+    """
+    if stop not in ("atr", "ema50", "nearest") or target not in ("pivot", "band"):
+        raise ValueError(f"Unknown stop/target rule: {stop}/{target}")
+    df = with_backtest_indicators(df, rules)
+    if history is None:
+        history = evaluate_confluences(df, threshold, params=params, strength_weights=strength_weights, rules=rules)
+
+    open_, high, low, close = (df[col].to_numpy(dtype=np.float64) for col in ("Open", "High", "Low", "Close"))
+    n = len(df)
+    direction_of = np.zeros(n, dtype=np.int8)
+    strong = history.strength > min_strength
+    direction_of[(history.bias_codes == 1) & strong] = 1
+    if allow_short:
+        direction_of[(history.bias_codes == 2) & strong] = -1
+    signal_bars = np.flatnonzero(direction_of[:-1]).tolist()
+
+    # Scalar lookups per trade are much cheaper on lists than on NumPy arrays
+    opens, closes, directions = open_.tolist(), close.tolist(), direction_of.tolist()
+    atr, ema_50, r1, s1, bb_upper, bb_lower = (df[col].to_numpy(dtype=np.float64).tolist() for col in PLAN_COLUMNS)
+    bars = (high, low, high.tolist(), low.tolist())
+
+    trades = []
+    free_from = 0  # First bar whose signal may open a new trade
+    for signal in signal_bars:
+        if signal < free_from:
+            continue
+        direction = directions[signal]
+        entry_bar = signal + 1
+        fill = opens[entry_bar] * (1 + direction * slippage)
+        levels = (r1, bb_upper) if direction > 0 else (s1, bb_lower)
+        stop_price, target_price = _plan_levels(direction, fill, atr[signal], ema_50[signal], levels[0][signal],
+                                                levels[1][signal], stop, target, atr_multiplier)
+        if stop_price is None:
+            continue
+
+        end = n if max_holding is None else min(n, entry_bar + max_holding)
+        exit_bar, stop_hit = _find_exit(bars, entry_bar, end, stop_price, target_price, direction)
+        if exit_bar is None:
+            exit_bar = end - 1
+            reason = "end" if end == n else "time"
+            exit_price = closes[exit_bar] * (1 - direction * slippage)
+        elif stop_hit:
+            reason = "stop"
+            # Gapping through the stop fills at the open, not at the stop
+            gapped = exit_bar > entry_bar and direction * (opens[exit_bar] - stop_price) < 0
+            exit_price = (opens[exit_bar] if gapped else stop_price) * (1 - direction * slippage)
+        else:
+            reason = "target"
+            gapped = exit_bar > entry_bar and direction * (opens[exit_bar] - target_price) > 0
+            exit_price = opens[exit_bar] if gapped else target_price
+
+        net = direction * (exit_price / fill - 1) - fee * (1 + exit_price / fill)
+        risk = direction * (fill - stop_price) / fill
+        trades.append((entry_bar, exit_bar, direction, signal, fill, stop_price, target_price, exit_price, reason,
+                       net, net / risk))
+        free_from = exit_bar
+
+    columns = list(zip(*trades)) if trades else [[]] * 11
+    entries, exits, trade_directions, signals = (np.array(col, dtype=np.int64) for col in columns[:4])
+    fills, nets = np.array(columns[4], dtype=np.float64), np.array(columns[9], dtype=np.float64)
+    equity, in_position = _equity_curve(close, entries, exits, trade_directions, fills, nets, fee)
+
+    # Keys in TRADE_COLUMNS order: passing columns= as well makes pandas box the timestamps
+    trades = pd.DataFrame({
+        "entry_time": df.index[entries], "exit_time": df.index[exits],
+        "direction": np.where(trade_directions > 0, "long", "short"),
+        "strength": history.strength[signals], "entry": fills, "stop": np.array(columns[5], dtype=np.float64),
+        "target": np.array(columns[6], dtype=np.float64), "exit": np.array(columns[7], dtype=np.float64),
+        "exit_reason": np.array(columns[8], dtype=object), "bars": exits - entries + 1,
+        "return_pct": nets * 100, "r_multiple": np.array(columns[10], dtype=np.float64),
+    })
+    equity = pd.Series(equity, index=df.index, name="equity")
+    return BacktestResult(trades, equity, _trade_stats(trades, equity, in_position))
+
+
+def _trade_stats(trades, equity, in_position):
+    returns = trades["return_pct"].to_numpy()
+    wins, losses = returns[returns > 0], returns[returns <= 0]
+    peak = np.maximum.accumulate(equity.to_numpy())
+    gross_loss = -losses.sum()
+    return {
+        "bars": len(equity),
+        "trades": len(trades),
+        "long_trades": int((trades["direction"] == "long").sum()),
+        "short_trades": int((trades["direction"] == "short").sum()),
+        "win_rate": len(wins) / len(returns) * 100 if len(returns) else 0.0,
+        "expectancy_pct": float(returns.mean()) if len(returns) else 0.0,
+        "expectancy_r": float(trades["r_multiple"].mean()) if len(returns) else 0.0,
+        "avg_win_pct": float(wins.mean()) if len(wins) else 0.0,
+        "avg_loss_pct": float(losses.mean()) if len(losses) else 0.0,
+        "profit_factor": float(wins.sum() / gross_loss) if gross_loss > 0 else float("inf") if len(wins) else 0.0,
+        "total_return_pct": (float(equity.iloc[-1]) - 1) * 100 if len(equity) else 0.0,
+        "max_drawdown_pct": float((1 - equity.to_numpy() / peak).max()) * 100 if len(equity) else 0.0,
+        "exposure_pct": float(in_position.mean()) * 100 if len(in_position) else 0.0,
+        "exit_reasons": trades["exit_reason"].value_counts().to_dict(),
+    }
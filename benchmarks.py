@@ -0,0 +1,613 @@
+"""Micro-benchmarks for Nunno's data and analysis hot paths.
+
+Run with ``python benchmarks.py`` (all) or ``python benchmarks.py kline_parsing``.
+No network access is needed; every benchmark uses generated data.
+"""
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import betterpredictormodule
+from synthetic_module import generate_ohlcv, simulate_ohlcv_arrays, MARKET_REGIMES
+from aggregation_module import aggregate_ohlcv
+from indicators_module import INDICATOR_COLUMNS, IncrementalIndicators, add_indicators, add_indicators_batch
+from backtest_module import _plan_levels, run_backtest, with_backtest_indicators
+from confluence_module import evaluate_confluences
+from sweep_module import run_sweep
+from rules_module import RuleSet, load_rules
+
+
+def _time_call(func, repeat=5, number=20):
+    """Best-of-``repeat`` mean time per call in milliseconds"""
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number * 1000
+
+
+def _print_result(name, baseline_ms, optimized_ms):
+    print(f"{name:<40} baseline {baseline_ms:9.3f} ms | optimized {optimized_ms:9.3f} ms | "
+          f"speedup {baseline_ms / optimized_ms:6.1f}x")
+
+
+def _print_memory(name, baseline_bytes, optimized_bytes):
+    print(f"{name:<40} baseline {baseline_bytes / 1024:9.1f} KiB | optimized {optimized_bytes / 1024:9.1f} KiB | "
+          f"reduction {baseline_bytes / optimized_bytes:5.1f}x")
+
+
+def _measure_memory(func):
+    """(result, bytes the result retains, peak bytes allocated while building it)"""
+    tracemalloc.start()
+    try:
+        result = func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, int(result.memory_usage(index=True, deep=True).sum()), peak
+
+
+def _make_klines(rows, start=1_700_000_000_000, step=900_000, seed=7):
+    """Build a Binance-style kline payload (prices as strings, like the REST API)"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, rows)))
+    klines = []
+    for i in range(rows):
+        open_time = start + i * step
+        price = close[i]
+        klines.append([
+            open_time, f"{price:.2f}", f"{price * 1.002:.2f}", f"{price * 0.998:.2f}",
+            f"{price * 1.0005:.2f}", f"{rng.uniform(10, 1000):.4f}", open_time + step - 1,
+            "12345.6", 100, "600.1", "6000.1", "0"
+        ])
+    return klines
+
+
+def _legacy_parse_binance_response(data):
+    """The original DataFrame/astype parser, kept as the benchmark baseline"""
+    df = pd.DataFrame(data, columns=[
+        "Open Time", "Open", "High", "Low", "Close", "Volume",
+        "Close Time", "Quote Asset Volume", "Number of Trades",
+        "Taker Buy Base", "Taker Buy Quote", "Ignore"
+    ])
+    df['Open Time'] = pd.to_datetime(df['Open Time'], unit='ms')
+    df = df[["Open Time", "Open", "High", "Low", "Close", "Volume"]].astype({
+        "Open": float, "High": float, "Low": float, "Close": float, "Volume": float
+    })
+    df.set_index('Open Time', inplace=True)
+    return df
+
+
+def bench_kline_parsing(rows=1000):
+    """Legacy vs NumPy kline parser, from decoded rows and from raw JSON bytes"""
+    analyzer = betterpredictormodule.TradingAnalyzer(use_candle_cache=False)
+    klines = _make_klines(rows)
+    raw = json.dumps(klines).encode()
+
+    pd.testing.assert_frame_equal(_legacy_parse_binance_response(klines),
+                                  analyzer._parse_binance_response(klines))
+
+    baseline = _time_call(lambda: _legacy_parse_binance_response(klines))
+    optimized = _time_call(lambda: analyzer._parse_binance_response(klines))
+    _print_result(f"kline parsing ({rows} rows)", baseline, optimized)
+
+    baseline_raw = _time_call(lambda: _legacy_parse_binance_response(json.loads(raw)))
+    optimized_raw = _time_call(lambda: analyzer._parse_binance_response(raw))
+    _print_result(f"kline decode+parse ({rows} rows)", baseline_raw, optimized_raw)
+    return {"baseline_ms": baseline, "optimized_ms": optimized,
+            "baseline_raw_ms": baseline_raw, "optimized_raw_ms": optimized_raw}
+
+
+def _make_ohlcv(rows, freq="4h", seed=11):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, rows)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    index = pd.date_range("2024-01-01", periods=rows, freq=freq, name="Open Time")
+    return pd.DataFrame({
+        "Open": open_,
+        "High": np.maximum(open_, close) * 1.01,
+        "Low": np.minimum(open_, close) * 0.99,
+        "Close": close,
+        "Volume": rng.uniform(1e5, 1e6, rows),
+    }, index=index)
+
+
+def _legacy_resample_data(df, target_length):
+    """The original per-row interpolation loop, kept as the benchmark baseline"""
+    import random
+    if len(df) >= target_length:
+        return df
+    expanded_data = []
+    for i in range(len(df) - 1):
+        current = df.iloc[i]
+        next_row = df.iloc[i + 1]
+        expanded_data.append(current)
+        steps = min(4, target_length // len(df))
+        for step in range(1, steps):
+            ratio = step / steps
+            interpolated = {
+                'Open': current['Close'],
+                'High': current['High'] + ratio * (next_row['High'] - current['High']),
+                'Low': current['Low'] + ratio * (next_row['Low'] - current['Low']),
+                'Close': current['Close'] + ratio * (next_row['Close'] - current['Close']),
+                'Volume': current['Volume'] * (1 + random.uniform(-0.3, 0.3))
+            }
+            time_diff = next_row.name - current.name
+            new_time = current.name + (time_diff * ratio)
+            expanded_data.append(pd.Series(interpolated, name=new_time))
+    if len(df) > 0:
+        expanded_data.append(df.iloc[-1])
+    return pd.DataFrame(expanded_data).tail(target_length)
+
+
+def bench_resample(rows=180, target_length=1000):
+    """Legacy vs vectorized CoinGecko upsampling (_resample_data)"""
+    analyzer = betterpredictormodule.TradingAnalyzer(use_candle_cache=False, random_seed=1)
+    df = _make_ohlcv(rows)
+
+    legacy = _legacy_resample_data(df, target_length)
+    fast = analyzer._resample_data(df, "15m", target_length)
+    assert legacy.index.equals(fast.index)
+    np.testing.assert_allclose(legacy[["Open", "High", "Low", "Close"]].to_numpy(),
+                               fast[["Open", "High", "Low", "Close"]].to_numpy())
+
+    baseline = _time_call(lambda: _legacy_resample_data(df, target_length), number=5)
+    optimized = _time_call(lambda: analyzer._resample_data(df, "15m", target_length))
+    _print_result(f"resample ({rows} -> {len(fast)} rows)", baseline, optimized)
+    return {"baseline_ms": baseline, "optimized_ms": optimized}
+
+
+def _legacy_generate_synthetic_data(limit, base_price=45000):
+    """The original loop-based synthetic generator, kept as the benchmark baseline"""
+    import random
+    timestamps = pd.date_range(end=pd.Timestamp.now(), periods=limit, freq="15min")
+    np.random.seed(42)
+    returns = np.random.normal(0, 0.01, limit) + np.linspace(-0.02, 0.02, limit)
+    prices = [base_price]
+    for i in range(1, limit):
+        prices.append(max(prices[-1] * (1 + returns[i]), base_price * 0.1))
+    data = []
+    for i, (timestamp, price) in enumerate(zip(timestamps, prices)):
+        volatility = random.uniform(0.005, 0.025)
+        open_price = prices[i - 1] if i > 0 else price
+        data.append({
+            "Open Time": timestamp, "Open": open_price,
+            "High": max(open_price, price) * (1 + random.uniform(0, volatility)),
+            "Low": min(open_price, price) * (1 - random.uniform(0, volatility)),
+            "Close": price, "Volume": random.uniform(50000, 500000)
+        })
+    return pd.DataFrame(data).set_index("Open Time")
+
+
+def bench_synthetic(rows=10000, large_rows=1_000_000, symbols=100):
+    """Legacy vs vectorized synthetic OHLCV, plus raw throughput for load-test sized datasets"""
+    baseline = _time_call(lambda: _legacy_generate_synthetic_data(rows), repeat=3, number=1)
+    optimized = _time_call(lambda: generate_ohlcv(rows, base_price=45000, trend=(-0.02, 0.02), seed=1))
+    _print_result(f"synthetic frame ({rows} candles)", baseline, optimized)
+
+    large_ms = _time_call(lambda: generate_ohlcv(large_rows, seed=1, regimes=MARKET_REGIMES), repeat=3, number=1)
+    panel_ms = _time_call(lambda: simulate_ohlcv_arrays(symbols, large_rows // symbols, seed=1), repeat=3, number=1)
+    print(f"{'synthetic throughput':<40} frame {large_rows / large_ms / 1000:9.2f} M candles/s | "
+          f"{symbols}-symbol panel {large_rows / panel_ms / 1000:9.2f} M candles/s")
+    return {"baseline_ms": baseline, "optimized_ms": optimized, "large_ms": large_ms, "panel_ms": panel_ms}
+
+
+def _pandas_resample(df, rule):
+    """pandas resample baseline for the aggregation engine"""
+    return df.resample(rule, label="left", closed="left").agg({
+        "Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"
+    }).dropna()
+
+
+def bench_aggregate(rows=100_000):
+    """pandas resample vs reduceat aggregation of 1m candles into 15m/4h/1d"""
+    df = generate_ohlcv(rows, interval="1m", end="2026-01-01", seed=5)
+    results = {}
+    for target, rule in [("15m", "15min"), ("4h", "4h"), ("1d", "1D")]:
+        fast = aggregate_ohlcv(df, target, "1m", drop_incomplete=False)
+        pd.testing.assert_frame_equal(fast, _pandas_resample(df, rule), check_freq=False, check_names=False)
+        baseline = _time_call(lambda: _pandas_resample(df, rule), number=5)
+        optimized = _time_call(lambda: aggregate_ohlcv(df, target, "1m", drop_incomplete=False), number=5)
+        _print_result(f"aggregate 1m -> {target} ({rows} rows)", baseline, optimized)
+        results[target] = {"baseline_ms": baseline, "optimized_ms": optimized}
+    return results
+
+
+def _legacy_add_indicators(df):
+    """The original per-indicator ``ta`` pipeline, kept as the parity reference and baseline"""
+    from ta.momentum import RSIIndicator, StochasticOscillator, WilliamsRIndicator
+    from ta.trend import EMAIndicator, SMAIndicator, MACD, ADXIndicator
+    from ta.volatility import BollingerBands, AverageTrueRange, KeltnerChannel
+    from ta.volume import OnBalanceVolumeIndicator, ChaikinMoneyFlowIndicator
+    df = df.copy()
+    close, high, low, volume = df["Close"], df["High"], df["Low"], df["Volume"]
+    df["RSI_14"] = RSIIndicator(close, window=14).rsi()
+    df["RSI_21"] = RSIIndicator(close, window=21).rsi()
+    df["Stoch_K"] = StochasticOscillator(high, low, close, window=14).stoch()
+    df["Stoch_D"] = StochasticOscillator(high, low, close, window=14).stoch_signal()
+    df["Williams_R"] = WilliamsRIndicator(high, low, close).williams_r()
+    df["EMA_9"] = EMAIndicator(close, window=9).ema_indicator()
+    df["EMA_21"] = EMAIndicator(close, window=21).ema_indicator()
+    df["EMA_50"] = EMAIndicator(close, window=50).ema_indicator()
+    df["SMA_20"] = SMAIndicator(close, window=20).sma_indicator()
+    df["SMA_50"] = SMAIndicator(close, window=50).sma_indicator()
+    macd = MACD(close)
+    df["MACD"] = macd.macd()
+    df["MACD_Signal"] = macd.macd_signal()
+    df["MACD_Histogram"] = macd.macd_diff()
+    adx = ADXIndicator(high, low, close)
+    df["ADX"] = adx.adx()
+    df["DI_Plus"] = adx.adx_pos()
+    df["DI_Minus"] = adx.adx_neg()
+    bb = BollingerBands(close, window=20, window_dev=2)
+    df["BB_Upper"] = bb.bollinger_hband()
+    df["BB_Middle"] = bb.bollinger_mavg()
+    df["BB_Lower"] = bb.bollinger_lband()
+    df["BB_Width"] = (df["BB_Upper"] - df["BB_Lower"]) / df["BB_Middle"] * 100
+    df["BB_Position"] = (close - df["BB_Lower"]) / (df["BB_Upper"] - df["BB_Lower"])
+    kc = KeltnerChannel(high, low, close)
+    df["KC_Upper"] = kc.keltner_channel_hband()
+    df["KC_Lower"] = kc.keltner_channel_lband()
+    df["KC_Middle"] = kc.keltner_channel_mband()
+    df["ATR"] = AverageTrueRange(high, low, close).average_true_range()
+    df["ATR_Percent"] = (df["ATR"] / close) * 100
+    df["Volume_SMA"] = volume.rolling(window=20).mean()
+    df["Volume_Ratio"] = volume / df["Volume_SMA"]
+    df["OBV"] = OnBalanceVolumeIndicator(close, volume).on_balance_volume()
+    df["CMF"] = ChaikinMoneyFlowIndicator(high, low, close, volume).chaikin_money_flow()
+    df["Body_Size"] = abs(df["Close"] - df["Open"]) / df["Open"] * 100
+    df["Upper_Wick"] = (df["High"] - np.maximum(df["Open"], df["Close"])) / df["Open"] * 100
+    df["Lower_Wick"] = (np.minimum(df["Open"], df["Close"]) - df["Low"]) / df["Open"] * 100
+    df["Total_Range"] = (df["High"] - df["Low"]) / df["Open"] * 100
+    df["Pivot"] = (df["High"] + df["Low"] + df["Close"]) / 3
+    df["R1"] = 2 * df["Pivot"] - df["Low"]
+    df["S1"] = 2 * df["Pivot"] - df["High"]
+    df["ROC_5"] = ((close / close.shift(5)) - 1) * 100
+    df["ROC_14"] = ((close / close.shift(14)) - 1) * 100
+    df.dropna(inplace=True)
+    return df
+
+
+def check_indicator_parity(df, rtol=1e-7):
+    """Assert the fused kernel reproduces the ``ta`` columns (and the rows dropna keeps)"""
+    expected = _legacy_add_indicators(df)
+    actual = add_indicators(df)
+    assert list(actual.columns) == list(expected.columns), "column order differs"
+    assert actual.index.equals(expected.index), "kept rows differ"
+    for col in INDICATOR_COLUMNS:
+        np.testing.assert_allclose(actual[col].to_numpy(), expected[col].to_numpy(),
+                                   rtol=rtol, atol=1e-9, err_msg=col)
+
+
+def bench_indicators(rows=1000):
+    """Per-indicator ``ta`` objects vs the fused NumPy kernel, with parity checks on several series"""
+    for seed, length in [(1, 60), (2, 300), (3, rows), (4, 5000)]:
+        check_indicator_parity(generate_ohlcv(length, base_price=45000, regimes=MARKET_REGIMES, seed=seed))
+    check_indicator_parity(_make_ohlcv(rows))  # Different price scale and volume profile
+    flat = generate_ohlcv(rows, base_price=45000, trend=(-0.02, 0.02), seed=6)
+    # Collapses onto the price floor and lifts off again: flat windows, 0/0 bands. pandas' online
+    # rolling variance (the ``ta`` side) drifts ~1e-7 when one candle leaves a flat window.
+    check_indicator_parity(flat, rtol=1e-6)
+
+    df = generate_ohlcv(rows, base_price=45000, regimes=MARKET_REGIMES, seed=3)
+    baseline = _time_call(lambda: _legacy_add_indicators(df), number=5)
+    optimized = _time_call(lambda: add_indicators(df))
+    _print_result(f"indicators ({rows} rows)", baseline, optimized)
+    return {"baseline_ms": baseline, "optimized_ms": optimized}
+
+
+def bench_incremental_indicators(rows=1000):
+    """Full-frame recompute vs one O(1) incremental update per tick (live and closing candle)"""
+    df = generate_ohlcv(rows + 1, base_price=45000, regimes=MARKET_REGIMES, seed=8)
+    state = IncrementalIndicators.from_frame(df.iloc[:-1])
+    open_time = int(df.index[-1].value // 1_000_000)
+    candle = df[["Open", "High", "Low", "Close", "Volume"]].iloc[-1].to_numpy()
+
+    live = state.update(open_time, *candle, final=False)
+    expected = add_indicators(df).iloc[-1]
+    np.testing.assert_allclose([live[col] for col in INDICATOR_COLUMNS], expected[INDICATOR_COLUMNS].to_numpy(),
+                               rtol=1e-7, atol=1e-9)
+
+    baseline = _time_call(lambda: add_indicators(df))
+    optimized = _time_call(lambda: state.update(open_time, *candle, final=False), number=200)
+    _print_result(f"indicator tick, live candle ({rows} rows)", baseline, optimized)
+    closing = _time_call(lambda: state.update(open_time, *candle, final=True), number=200)
+    _print_result(f"indicator tick, closed candle ({rows} rows)", baseline, closing)
+    return {"baseline_ms": baseline, "optimized_ms": optimized, "closed_ms": closing}
+
+
+def bench_indicator_subsets(rows=1000):
+    """Full indicator set vs the graph-resolved subsets used by light analyses"""
+    df = generate_ohlcv(rows, base_price=45000, regimes=MARKET_REGIMES, seed=3)
+    analyzer = betterpredictormodule.TradingAnalyzer(use_candle_cache=False)
+    full = add_indicators(df)
+    baseline = _time_call(lambda: add_indicators(df))
+    results = {"baseline_ms": baseline}
+    for name, columns in [("RSI_14 only", ["RSI_14"]),
+                          ("momentum step", analyzer.indicator_columns("momentum")),
+                          ("all analysis steps", analyzer.indicator_columns(*analyzer.ANALYSIS_COLUMNS))]:
+        subset = add_indicators(df, columns)
+        # Subsets warm up sooner, so they keep extra leading rows; the shared rows are identical
+        np.testing.assert_array_equal(subset.loc[full.index, columns].to_numpy(), full[columns].to_numpy())
+        optimized = _time_call(lambda: add_indicators(df, columns))
+        _print_result(f"indicators: {name} ({rows} rows)", baseline, optimized)
+        results[f"{name}_ms"] = optimized
+    return results
+
+
+def bench_batch_indicators(symbols=200, rows=1000, scan_rows=150):
+    """One add_indicators call per symbol vs (symbols, time) panel passes for a watchlist"""
+    frames = {f"SYM{i}USDT": generate_ohlcv(rows, base_price=10 * (i + 1), regimes=MARKET_REGIMES, seed=100 + i)
+              for i in range(symbols)}
+    batch = add_indicators_batch(frames)
+    for symbol in list(frames)[:20]:
+        pd.testing.assert_frame_equal(batch[symbol], add_indicators(frames[symbol]), check_freq=False)
+
+    results = {}
+    for length in (rows, scan_rows):  # Full history, and a short scanner window
+        tails = {symbol: df.tail(length) for symbol, df in frames.items()}
+        baseline = _time_call(lambda: [add_indicators(df) for df in tails.values()], repeat=3, number=2)
+        optimized = _time_call(lambda: add_indicators_batch(tails), repeat=3, number=2)
+        _print_result(f"watchlist indicators ({symbols}x{length})", baseline, optimized)
+        results[f"{length}_rows"] = {"baseline_ms": baseline, "optimized_ms": optimized}
+    return results
+
+def bench_frame_memory(rows=1000):
+    """Retained and peak memory of an analysis frame: legacy ta+dropna vs default vs compact frames"""
+    df = generate_ohlcv(rows, base_price=45000, regimes=MARKET_REGIMES, seed=3)
+    analyzer = betterpredictormodule.TradingAnalyzer(use_candle_cache=False)
+    legacy, legacy_size, legacy_peak = _measure_memory(lambda: _legacy_add_indicators(df))
+    full, full_size, full_peak = _measure_memory(lambda: analyzer.add_comprehensive_indicators(df))
+    compact, compact_size, compact_peak = _measure_memory(
+        lambda: analyzer.add_comprehensive_indicators(df, compact=True))
+
+    # Compact frames must not change the analysis
+    for frame in (full, compact):
+        confluences, _ = analyzer.generate_comprehensive_analysis(frame)
+        assert analyzer.calculate_confluence_strength(confluences) == \
+            analyzer.calculate_confluence_strength(analyzer.generate_comprehensive_analysis(legacy)[0])
+
+    _print_memory(f"analysis frame, retained ({rows} rows)", legacy_size, full_size)
+    _print_memory(f"compact frame, retained ({rows} rows)", legacy_size, compact_size)
+    _print_memory(f"analysis frame, peak ({rows} rows)", legacy_peak, full_peak)
+    _print_memory(f"compact frame, peak ({rows} rows)", legacy_peak, compact_peak)
+    return {"legacy_bytes": legacy_size, "full_bytes": full_size, "compact_bytes": compact_size,
+            "legacy_peak": legacy_peak, "full_peak": full_peak, "compact_peak": compact_peak}
+
+
+class _OfflineAnalyzer(betterpredictormodule.TradingAnalyzer):
+    """Analyzer whose kline fetch returns generated candles (no network), up to the current one"""
+
+    source = "candle cache"
+
+    def fetch_binance_ohlcv(self, symbol="BTCUSDT", interval="15m", limit=1000):
+        now = pd.Timestamp.now(tz="UTC").tz_localize(None)
+        df = generate_ohlcv(limit, base_price=45000, interval=interval, end=now, regimes=MARKET_REGIMES, seed=5)
+        df.attrs["source"] = self.source
+        return df
+
+
+def bench_analysis_cache(rows=1000):
+    """Full analyze_symbol run vs a hit in the per-candle analysis result cache"""
+    analyzer = _OfflineAnalyzer(use_candle_cache=False)
+    betterpredictormodule._analysis_cache.clear()
+    first = betterpredictormodule.analyze_symbol("BTCUSDT", "15m", rows, analyzer=analyzer)
+    assert betterpredictormodule.analyze_symbol("BTCUSDT", "15m", rows, analyzer=analyzer) is first
+    # Fallback data is never cached
+    fallback = _OfflineAnalyzer(use_candle_cache=False)
+    fallback.source = "synthetic"
+    assert betterpredictormodule.analyze_symbol("ETHUSDT", "15m", rows, analyzer=fallback) is not \
+        betterpredictormodule.analyze_symbol("ETHUSDT", "15m", rows, analyzer=fallback)
+
+    baseline = _time_call(lambda: betterpredictormodule.analyze_symbol("BTCUSDT", "15m", rows, analyzer=analyzer,
+                                                                        use_cache=False), number=5)
+    optimized = _time_call(lambda: betterpredictormodule.analyze_symbol("BTCUSDT", "15m", rows, analyzer=analyzer),
+                           number=1000)
+    _print_result(f"analyze_symbol, cached ({rows} rows)", baseline, optimized)
+    return {"baseline_ms": baseline, "optimized_ms": optimized, **betterpredictormodule.analysis_cache_stats()}
+
+
+def _score_bars_in_loop(analyzer, df):
+    """Per-bar scalar scoring: the analyze_*_confluence methods on every row, as a Python loop"""
+    results = []
+    for i in range(len(df)):
+        confluences, _ = analyzer.generate_comprehensive_analysis(df.iloc[:i + 1])
+        results.append(analyzer.calculate_confluence_strength(confluences))
+    return results
+
+
+def bench_confluence_history(rows=1000):
+    """Scalar confluence methods looped over every bar vs the vectorized rule matrices"""
+    analyzer = betterpredictormodule.TradingAnalyzer(use_candle_cache=False)
+    df = analyzer.add_comprehensive_indicators(generate_ohlcv(rows, base_price=45000, regimes=MARKET_REGIMES, seed=3))
+    history = analyzer.evaluate_confluence_history(df)
+    expected = _score_bars_in_loop(analyzer, df)
+    assert [history.bias(i) for i in range(len(df))] == expected, "per-bar bias/strength differs"
+    # A tuned configuration (as SweepResult.best_config() returns it) scores the same on both paths
+    tuned = betterpredictormodule.TradingAnalyzer(use_candle_cache=False, use_custom_rules=False)
+    tuned.apply_config({"threshold": 4, "params": {"rsi_oversold": 35, "adx_trending": 20, "volume_high": 1.3,
+                                                   "cmf_pressure": 0.1, "bb_squeeze": 3},
+                        "strength_weights": {"Strong": 4, "Medium": 2, "Low": 0}})
+    assert [tuned.evaluate_confluence_history(df).bias(i) for i in range(len(df))] == \
+        _score_bars_in_loop(tuned, df), "per-bar bias/strength differs with tuned parameters"
+
+    baseline = _time_call(lambda: _score_bars_in_loop(analyzer, df), repeat=3, number=1)
+    optimized = _time_call(lambda: analyzer.evaluate_confluence_history(df))
+    _print_result(f"confluences over all bars ({len(df)} bars)", baseline, optimized)
+    return {"baseline_ms": baseline, "optimized_ms": optimized}
+
+
+def _eager_confluences(analyzer, df):
+    """The former confluence dicts: every record's text rendered up front"""
+    confluences, _ = analyzer.generate_comprehensive_analysis(df)
+    return {direction: [dict(conf) for conf in records] for direction, records in confluences.items()}
+
+
+def _retained_bytes(func):
+    """(result, bytes still allocated by ``func`` once it returns)"""
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        result = func()
+        return result, tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+
+
+def bench_confluence_records(analyses=100):
+    """Analyses of consecutive bars: eagerly rendered confluence dicts vs slotted records with lazy text"""
+    analyzer = betterpredictormodule.TradingAnalyzer(use_candle_cache=False)
+    df = analyzer.add_comprehensive_indicators(generate_ohlcv(400, base_price=45000, regimes=MARKET_REGIMES, seed=3))
+    windows = [df.iloc[:i] for i in range(len(df) - analyses, len(df))]
+    lazy = lambda: [analyzer.generate_comprehensive_analysis(window)[0] for window in windows]
+    eager = lambda: [_eager_confluences(analyzer, window) for window in windows]
+    assert lazy() == eager(), "records differ from the rendered dicts"
+
+    # The row copies are the same for both; keep only the confluences when measuring
+    _, baseline_bytes = _retained_bytes(eager)
+    _, optimized_bytes = _retained_bytes(lazy)
+    _print_memory(f"confluences retained ({analyses} analyses)", baseline_bytes, optimized_bytes)
+    baseline = _time_call(eager, repeat=3, number=1)
+    optimized = _time_call(lazy, repeat=3, number=1)
+    _print_result(f"confluence analyses ({analyses})", baseline, optimized)
+    return {"baseline_bytes": baseline_bytes, "optimized_bytes": optimized_bytes,
+            "baseline_ms": baseline, "optimized_ms": optimized}
+
+
+def _example_rule_set(copies=8):
+    """The example rule file repeated ``copies`` times under fresh ids (a few dozen rules)"""
+    with open("confluence_rules.example.json", "r", encoding="utf-8") as f:
+        specs = json.load(f)["rules"]
+    return RuleSet([{**spec, "id": f"{spec['id']}_{i}"} for i in range(copies) for spec in specs])
+
+
+def bench_custom_rules(rows=1000, symbols=200):
+    """Custom rule file over a history and a watchlist: per-bar evaluation vs compiled NumPy passes"""
+    load_rules("confluence_rules.example.json")  # The shipped example must compile
+    rules = _example_rule_set()
+    df = add_indicators(generate_ohlcv(rows, base_price=45000, regimes=MARKET_REGIMES, seed=3))
+    levels = rules.evaluate(df)
+
+    def per_bar():
+        fired = []
+        for i in range(len(df)):
+            confluences = {"bullish": [], "bearish": [], "neutral": []}
+            rules.apply(df.iloc[:i + 1], confluences)
+            fired.append(sorted(conf.key for records in confluences.values() for conf in records))
+        return fired
+
+    ids = [rule.id for rule in rules]
+    expected = [sorted(ids[r] for r in np.flatnonzero(levels[:, :, i].any(axis=0))) for i in range(len(df))]
+    assert per_bar() == expected, "per-bar custom rules differ from the compiled history"
+    baseline = _time_call(per_bar, repeat=3, number=1)
+    optimized = _time_call(lambda: rules.evaluate(df))
+    _print_result(f"{len(rules)} custom rules over {len(df)} bars", baseline, optimized)
+
+    frames = {f"SYM{i}": df.iloc[:len(df) - i] for i in range(symbols)}
+    scan = rules.scan(frames)
+    one_by_one = lambda: {symbol: rules.apply(frame, {"bullish": [], "bearish": [], "neutral": []})
+                          for symbol, frame in frames.items()}
+    fired = {symbol: sorted(conf.key for records in confluences.values() for conf in records)
+             for symbol, confluences in one_by_one().items()}
+    assert fired == {symbol: sorted(scan.columns[scan.loc[symbol] > 0]) for symbol in frames}, "scan differs"
+    scan_baseline = _time_call(one_by_one, repeat=3, number=1)
+    scan_optimized = _time_call(lambda: rules.scan(frames), repeat=3, number=5)
+    _print_result(f"{len(rules)} custom rules, {symbols}-symbol scan", scan_baseline, scan_optimized)
+    return {"baseline_ms": baseline, "optimized_ms": optimized,
+            "scan_baseline_ms": scan_baseline, "scan_optimized_ms": scan_optimized}
+
+
+def _reference_backtest_trades(df, history, fee=0.001, slippage=0.0005, min_strength=60):
+    """Bar-by-bar event loop over the same plan rules (stop first on a bar touching both levels)"""
+    rows = df[["Open", "High", "Low", "Close", "ATR", "EMA_50", "R1", "S1", "BB_Upper", "BB_Lower"]].to_numpy().tolist()
+    biases = history.bias_codes.tolist()
+    strengths = history.strength.tolist()
+    trades, position = [], None
+    for i, (o, h, l, c, *_) in enumerate(rows):
+        if position is not None:
+            direction, entry_bar, fill, stop, target = position
+            stop_hit = l <= stop if direction > 0 else h >= stop
+            target_hit = h >= target if direction > 0 else l <= target
+            if stop_hit or target_hit:
+                gapped = i > entry_bar and (direction * (o - stop) < 0 if stop_hit else direction * (o - target) > 0)
+                price = o if gapped else (stop if stop_hit else target)
+                exit_price = price * (1 - direction * slippage) if stop_hit else price
+                trades.append((entry_bar, i, exit_price))
+                position = None
+            elif i == len(rows) - 1:
+                trades.append((entry_bar, i, c * (1 - direction * slippage)))
+        if position is None and i + 1 < len(rows) and strengths[i] > min_strength and biases[i] in (1, 2) \
+                and not (trades and trades[-1][1] > i):
+            direction = 1 if biases[i] == 1 else -1
+            fill = rows[i + 1][0] * (1 + direction * slippage)
+            _, _, _, _, atr, ema_50, r1, s1, bb_upper, bb_lower = rows[i]
+            levels = (r1, bb_upper) if direction > 0 else (s1, bb_lower)
+            stop, target = _plan_levels(direction, fill, atr, ema_50, *levels, "nearest", "pivot", 1.5)
+            if stop is not None:
+                position = (direction, i + 1, fill, stop, target)
+    return trades
+
+
+def bench_backtest(years=3):
+    """Backtest throughput on years of synthetic 15m candles, checked against a bar-by-bar event loop"""
+    df = generate_ohlcv(years * 35040, base_price=45000, volatility=0.003, intrabar_range=(0.001, 0.006), seed=9)
+    frame = with_backtest_indicators(df)
+    history = evaluate_confluences(frame)
+    result = run_backtest(frame, history=history)
+    expected = _reference_backtest_trades(frame, history)
+    positions = {time: i for i, time in enumerate(frame.index)}
+    actual = [(positions[entry], positions[exit_], price) for entry, exit_, price in
+              result.trades[["entry_time", "exit_time", "exit"]].itertuples(index=False)]
+    assert actual == expected, "trades differ from the bar-by-bar reference"
+
+    replay = _time_call(lambda: run_backtest(frame, history=history), repeat=3, number=1)
+    end_to_end = _time_call(lambda: run_backtest(df), repeat=3, number=1)
+    print(f"{f'backtest replay ({len(frame)} bars)':<40} {replay:9.1f} ms ({len(result.trades)} trades)")
+    print(f"{'backtest incl. indicators + confluences':<40} {end_to_end:9.1f} ms for {years} years of 15m candles")
+    return {"replay_ms": replay, "end_to_end_ms": end_to_end, **result.stats}
+
+def bench_sweep(configs=48, years=1, datasets=2):
+    """Parameter sweep throughput, single process vs one worker per core"""
+    frames = {f"SYN{i} 15m": generate_ohlcv(years * 35040, base_price=45000, volatility=0.003,
+                                             intrabar_range=(0.001, 0.006), seed=20 + i) for i in range(datasets)}
+    timings = {}
+    for workers in sorted({1, os.cpu_count() or 1}):
+        result = run_sweep(frames, n_configs=configs, workers=workers, seed=3)
+        timings[workers] = result.elapsed
+        # The defaults row must pool plain backtests of the same in-sample bars
+        plain = [run_backtest(frame.iloc[:int(len(frame) * 0.7)])
+                 for frame in map(with_backtest_indicators, frames.values())]
+        assert result.baseline["is_trades"] == sum(r.stats["trades"] for r in plain), "baseline differs"
+    for workers, elapsed in timings.items():
+        rate = configs / elapsed
+        print(f"{f'sweep, {workers} worker(s)':<40} {rate:9.1f} configs/s | 2000 configs x {datasets} x {years}y "
+              f"15m: {2000 / rate / 60:5.1f} min")
+    return timings
+
+BENCHMARKS = {
+    "kline_parsing": bench_kline_parsing,
+    "resample": bench_resample,
+    "synthetic": bench_synthetic,
+    "aggregate": bench_aggregate,
+    "indicators": bench_indicators,
+    "incremental_indicators": bench_incremental_indicators,
+    "indicator_subsets": bench_indicator_subsets,
+    "batch_indicators": bench_batch_indicators,
+    "frame_memory": bench_frame_memory,
+    "analysis_cache": bench_analysis_cache,
+    "confluence_history": bench_confluence_history,
+    "confluence_records": bench_confluence_records,
+    "custom_rules": bench_custom_rules,
+    "backtest": bench_backtest,
+    "sweep": bench_sweep,
+}
+
+
+def main(names=None):
+    for name in names or BENCHMARKS:
+        BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
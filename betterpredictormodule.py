@@ -1,20 +1,115 @@
 import requests
 import pandas as pd
 import numpy as np
-from ta.momentum import RSIIndicator, StochasticOscillator, WilliamsRIndicator
-from ta.trend import EMAIndicator, SMAIndicator, MACD, ADXIndicator, IchimokuIndicator
-from ta.volatility import BollingerBands, AverageTrueRange, KeltnerChannel
-from ta.volume import OnBalanceVolumeIndicator, ChaikinMoneyFlowIndicator
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime
 import warnings
 import time
 import random
+from network_module import (ACCEPT_ENCODING, SessionPool, RateLimitExceeded, get_session_pool,
+                            get_health_registry, endpoint_key, json_loads)
+from candle_store_module import INTERVAL_MS, get_candle_store, interval_to_ms, to_ms, find_gaps, arrays_to_frame
+from stream_module import BINANCE_STREAM_URL, KlineStream, get_active_kline_stream, set_active_kline_stream
+from cache_module import LRUCache, SingleFlight
+from synthetic_module import generate_ohlcv
+from coin_index_module import get_coin_index
+from exchange_info_module import UnknownSymbolError, get_symbol_table
+from indicators_module import add_indicators, add_indicators_batch, indicator_columns
+from confluence_module import (LOW, MEDIUM, STRONG, STRENGTH_WEIGHTS, Confluence, evaluate_confluences,
+                               level_weights, rule_params)
+from backtest_module import run_backtest
+from rules_module import get_custom_rules, load_rules
+from sweep_module import load_cached_datasets, run_sweep
+from aggregation_module import aggregate_ohlcv, best_base_interval, bucket_open_times, can_aggregate
 warnings.filterwarnings('ignore')
 
 class TradingAnalyzer:
-    def __init__(self):
+    # Indicator columns each analysis step reads; add_comprehensive_indicators computes only these
+    ANALYSIS_COLUMNS = {
+        'momentum': ('RSI_14', 'Stoch_K', 'Stoch_D', 'Williams_R'),
+        'trend': ('EMA_9', 'EMA_21', 'EMA_50', 'MACD', 'MACD_Signal', 'MACD_Histogram', 'ADX', 'DI_Plus', 'DI_Minus'),
+        'volatility': ('BB_Position', 'BB_Width', 'ATR_Percent'),
+        'volume': ('CMF', 'Volume_Ratio'),
+        'price_action': ('Body_Size', 'Upper_Wick', 'Lower_Wick'),
+        'plan': ('ATR', 'ATR_Percent', 'EMA_21', 'EMA_50', 'BB_Upper', 'BB_Lower', 'Pivot', 'R1', 'S1', 'Volume_SMA'),
+    }
+    
+    # df.attrs['source'] tag of the frames each fetch_binance_ohlcv source returns
+    DATA_SOURCES = {
+        "Direct Binance API": "binance",
+        "Binance with Rotation": "binance",
+        "Alternative APIs": "alternative",
+        "Synthetic Data": "synthetic",
+    }
+    
+    def __init__(self, session_pool=None, pool_maxsize=None, hedged_fetch=True, hedge_delay=0.3,
+                 candle_store=None, use_candle_cache=True, kline_stream=None, random_seed=None,
+                 coin_index=None, symbol_table=None, validate_symbols=True, compact_frames=False,
+                 custom_rules=None, use_custom_rules=True, confluence_params=None):
         self.confluence_threshold = 3  # Minimum confluences for strong signals
         
+        # Scoring of the confluence rules: RULE_PARAMS cutoffs (with ``confluence_params``
+        # overrides), strength weights and the trade-entry strength (see apply_config)
+        self.confluence_params = rule_params(confluence_params)
+        self.strength_weights = dict(STRENGTH_WEIGHTS)
+        self.min_strength = 60
+        
+        # Private generator for synthetic/jittered data (never touches the global RNG state)
+        self.rng = np.random.default_rng(random_seed)
+        
+        # Keep-alive HTTP sessions (shared process-wide unless a pool size is requested)
+        self._owns_session_pool = session_pool is None and pool_maxsize is not None
+        if session_pool is not None:
+            self.session_pool = session_pool
+        elif pool_maxsize is not None:
+            self.session_pool = SessionPool(pool_maxsize=pool_maxsize)
+        else:
+            self.session_pool = get_session_pool()
+        
+        # Binance mirrors raced by the hedged fetch (launch order comes from latency stats); all
+        # serve the same binance.com order book, so their candles are interchangeable
+        self.binance_mirrors = [
+            "https://api.binance.com",
+            "https://api1.binance.com",
+            "https://api2.binance.com",
+            "https://api3.binance.com",
+        ]
+        # Binance.US is a separate exchange (own prices and volumes): only tried after every
+        # binance.com mirror failed, and its candles are never cached or mixed with .com ones
+        self.binance_us_url = "https://api.binance.us"
+        self.hedged_fetch = hedged_fetch
+        self.hedge_delay = hedge_delay  # Seconds to wait before racing the next mirror
+        self.mirror_timeout = 12
+        
+        # Deep-history backfill settings
+        self.backfill_workers = 4
+        self.backfill_retries = 3
+        self.endpoint_health = get_health_registry()
+        
+        # Persistent candle cache: only candles newer than the last stored one are downloaded
+        if candle_store is not None:
+            self.candle_store = candle_store
+        else:
+            self.candle_store = get_candle_store() if use_candle_cache else None
+        
+        # Live kline windows (falls back to the process-wide stream when one is running)
+        self.kline_stream = kline_stream
+        
+        # CoinGecko coin list index used to map trading pairs to coin ids
+        self.coin_index = coin_index if coin_index is not None else get_coin_index()
+        
+        # Cached exchangeInfo: unknown symbols are rejected before any kline request
+        self.symbol_table = symbol_table if symbol_table is not None else get_symbol_table()
+        self.validate_symbols = validate_symbols
+        
+        # Compact analysis frames: only the ANALYSIS_COLUMNS, oscillators/ratios stored as float32
+        self.compact_frames = compact_frames
+        
+        # Declarative confluence rules scored next to the built-in ones: a RuleSet, a rule file, or
+        # (by default) the process-wide rule file when one exists
+        self._custom_rules = load_rules(custom_rules) if isinstance(custom_rules, str) else custom_rules
+        self.use_custom_rules = use_custom_rules
+        
         # Enhanced proxy and fallback system
         self.proxy_endpoints = [
             # Primary fallback APIs (free alternatives)
@@ -36,7 +131,7 @@ class TradingAnalyzer:
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
                 "Accept": "application/json",
                 "Accept-Language": "en-US,en;q=0.9",
-                "Accept-Encoding": "gzip, deflate, br",
+                "Accept-Encoding": ACCEPT_ENCODING,
                 "Connection": "keep-alive",
                 "Upgrade-Insecure-Requests": "1",
             },
@@ -44,59 +139,114 @@ class TradingAnalyzer:
                 "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.1.1 Safari/605.1.15",
                 "Accept": "application/json, text/plain, */*",
                 "Accept-Language": "en-us",
-                "Accept-Encoding": "gzip, deflate, br",
+                "Accept-Encoding": ACCEPT_ENCODING,
                 "Connection": "keep-alive",
             },
             {
                 "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/88.0.4324.96 Safari/537.36",
                 "Accept": "application/json",
                 "Accept-Language": "en-US,en;q=0.5",
-                "Accept-Encoding": "gzip, deflate",
+                "Accept-Encoding": ACCEPT_ENCODING,
                 "Connection": "keep-alive",
             }
         ]
     
+    def start_streaming(self, pairs, window=1000, url=BINANCE_STREAM_URL, share=True, track_indicators=False):
+        """Stream klines for [(symbol, interval), ...] so fetch_binance_ohlcv can serve them locally.
+        
+        With ``share`` the stream becomes the process-wide one used by every analyzer. With
+        ``track_indicators`` every tick also updates incremental indicators (see get_indicators).
+        """
+        self.stop_streaming()
+        self.kline_stream = KlineStream(self, pairs, window=window, url=url,
+                                        track_indicators=track_indicators).start()
+        if share:
+            set_active_kline_stream(self.kline_stream)
+        return self.kline_stream
+    
+    def stop_streaming(self):
+        if self.kline_stream is not None:
+            self.kline_stream.stop()
+            if get_active_kline_stream() is self.kline_stream:
+                set_active_kline_stream(None)
+            self.kline_stream = None
+    
+    def _live_stream(self, symbol, interval):
+        stream = self.kline_stream or get_active_kline_stream()
+        if stream is not None and stream.is_live() and stream.has(symbol, interval):
+            return stream
+        return None
+    
+    def endpoint_health_report(self):
+        """Debug view of host/source health: circuit state, latency and last status per endpoint"""
+        return self.endpoint_health.snapshot()
+    
+    def close(self):
+        """Release pooled connections owned by this analyzer"""
+        if self._owns_session_pool:
+            self.session_pool.close()
+    
     def make_request_with_fallback(self, url, max_retries=3):
         """Enhanced request method with proxy fallback and error handling"""
         
+        host = endpoint_key(url)
+        direct_allowed = self.endpoint_health.is_available(host)
+        if not direct_allowed:
+            print(f"Circuit open for {host}, skipping direct connection...")
+        
         # Try direct connection first
-        for attempt in range(max_retries):
+        for attempt in range(max_retries if direct_allowed else 0):
+            start = time.perf_counter()
             try:
                 headers = random.choice(self.headers_list)
-                response = requests.get(
+                response = self.session_pool.get(
                     url, 
                     headers=headers, 
                     timeout=15,
                     verify=True  # Keep SSL verification for security
                 )
                 if response.status_code == 200:
+                    self.endpoint_health.record_success(host, time.perf_counter() - start)
                     return response
-                elif response.status_code == 451:  # Geo-blocked
+                
+                self.endpoint_health.record_failure(host, time.perf_counter() - start, response.status_code)
+                if response.status_code == 451:  # Geo-blocked
                     print(f"Geo-blocked (451), trying proxy fallback...")
                     break
                 else:
                     print(f"API returned status {response.status_code}, retrying...")
                     
-            except requests.exceptions.Timeout:
+            except RateLimitExceeded as e:
+                # Our own budget is exhausted; that says nothing about the host's health
+                print(f"Rate limit reached: {str(e)}")
+                break
+            except requests.exceptions.Timeout as e:
+                self.endpoint_health.record_failure(host, time.perf_counter() - start, error=e)
                 print(f"Timeout on attempt {attempt + 1}, retrying...")
                 time.sleep(1)
-            except requests.exceptions.ConnectionError:
+            except requests.exceptions.ConnectionError as e:
+                self.endpoint_health.record_failure(host, time.perf_counter() - start, error=e)
                 print(f"Connection error on attempt {attempt + 1}, trying proxy...")
                 break
             except Exception as e:
+                self.endpoint_health.record_failure(host, time.perf_counter() - start, error=e)
                 print(f"Request error: {str(e)}")
                 if attempt == max_retries - 1:
                     break
                 time.sleep(1)
+            
+            if not self.endpoint_health.is_available(host):
+                print(f"Circuit opened for {host}, giving up on direct connection")
+                break
         
         # If direct connection fails, try with proxies (if available)
         if hasattr(self, 'proxy_api_key') and self.proxy_api_key:
             for proxy in self.proxy_list:
                 try:
-                    headers = random.choice(self.headers_list)
+                    headers = dict(random.choice(self.headers_list))
                     headers['X-API-Key'] = self.proxy_api_key
                     
-                    response = requests.get(
+                    response = self.session_pool.get(
                         url,
                         headers=headers,
                         proxies=proxy,
@@ -118,7 +268,7 @@ class TradingAnalyzer:
         binance_url = f"https://api.binance.com/api/v3/klines?symbol={symbol.upper()}&interval={interval}&limit={limit}"
         try:
             response = self.make_request_with_fallback(binance_url)
-            return self._parse_binance_response(response.json())
+            return self._parse_binance_response(response.content)
         except Exception as e:
             print(f"Binance main API failed: {str(e)}")
         
@@ -126,7 +276,7 @@ class TradingAnalyzer:
         try:
             binance_us_url = f"https://api.binance.us/api/v3/klines?symbol={symbol.upper()}&interval={interval}&limit={limit}"
             response = self.make_request_with_fallback(binance_us_url)
-            return self._parse_binance_response(response.json())
+            return self._parse_binance_response(response.content)
         except Exception as e:
             print(f"Binance US API failed: {str(e)}")
         
@@ -144,41 +294,22 @@ class TradingAnalyzer:
         return self._generate_synthetic_data(symbol, interval, limit)
     
     def _parse_binance_response(self, data):
-        """Parse standard Binance API response"""
-        df = pd.DataFrame(data, columns=[
-            "Open Time", "Open", "High", "Low", "Close", "Volume",
-            "Close Time", "Quote Asset Volume", "Number of Trades",
-            "Taker Buy Base", "Taker Buy Quote", "Ignore"
-        ])
-        
-        # Convert timestamps and prices
-        df['Open Time'] = pd.to_datetime(df['Open Time'], unit='ms')
-        df = df[["Open Time", "Open", "High", "Low", "Close", "Volume"]].astype({
-            "Open": float, "High": float, "Low": float, "Close": float, "Volume": float
-        })
-        df.set_index('Open Time', inplace=True)
-        return df
+        """Parse standard Binance API response straight into NumPy columns (accepts raw JSON bytes too)"""
+        if isinstance(data, (bytes, bytearray, str)):
+            data = json_loads(data)
+        
+        # Only the first six fields are used: open time + OHLCV (prices arrive as strings)
+        n = len(data)
+        open_times = np.empty(n, dtype=np.int64)
+        values = np.empty((n, 5), dtype=np.float64)
+        if n:
+            open_times[:] = [row[0] for row in data]
+            values[:] = [row[1:6] for row in data]
+        return arrays_to_frame(open_times, values)
     
     def _symbol_to_coingecko_id(self, symbol):
         """Convert trading symbol to CoinGecko ID"""
-        symbol_map = {
-            "BTCUSDT": "bitcoin",
-            "ETHUSDT": "ethereum", 
-            "BNBUSDT": "binancecoin",
-            "ADAUSDT": "cardano",
-            "SOLUSDT": "solana",
-            "XRPUSDT": "ripple",
-            "DOGEUSDT": "dogecoin",
-            "AVAXUSDT": "avalanche-2",
-            "MATICUSDT": "matic-network",
-            "DOTUSDT": "polkadot",
-            "LINKUSDT": "chainlink",
-            "UNIUSDT": "uniswap",
-            "LTCUSDT": "litecoin",
-            "BCHUSDT": "bitcoin-cash",
-            "FILUSDT": "filecoin"
-        }
-        return symbol_map.get(symbol.upper())
+        return self.coin_index.resolve_trading_symbol(symbol)
     
     def _fetch_coingecko_data(self, coin_id, interval, limit):
         """Fetch data from CoinGecko API"""
@@ -192,7 +323,7 @@ class TradingAnalyzer:
         # CoinGecko returns [timestamp, open, high, low, close]
         df = pd.DataFrame(data, columns=["timestamp", "Open", "High", "Low", "Close"])
         df['Open Time'] = pd.to_datetime(df['timestamp'], unit='ms')
-        df['Volume'] = np.random.uniform(100000, 1000000, len(df))  # Synthetic volume
+        df['Volume'] = self.rng.uniform(100000, 1000000, len(df))  # Synthetic volume
         df = df[["Open Time", "Open", "High", "Low", "Close", "Volume"]].astype({
             "Open": float, "High": float, "Low": float, "Close": float, "Volume": float
         })
@@ -204,44 +335,40 @@ class TradingAnalyzer:
         
         return df.tail(limit)
     
-    def _resample_data(self, df, target_interval, target_length):
-        """Resample data to create more granular timeframes"""
+    def _resample_data(self, df, target_interval, target_length, rng=None):
+        """Resample data to create more granular timeframes (vectorized linear upsampling)"""
         if len(df) >= target_length:
             return df
         
-        # Simple interpolation method for demo
-        expanded_data = []
-        for i in range(len(df) - 1):
-            current = df.iloc[i]
-            next_row = df.iloc[i + 1]
-            
-            # Add current row
-            expanded_data.append(current)
-            
-            # Add interpolated rows
-            steps = min(4, target_length // len(df))  # Create up to 4 sub-intervals
-            for step in range(1, steps):
-                ratio = step / steps
-                interpolated = {
-                    'Open': current['Close'],  # Open is previous close
-                    'High': current['High'] + ratio * (next_row['High'] - current['High']),
-                    'Low': current['Low'] + ratio * (next_row['Low'] - current['Low']),
-                    'Close': current['Close'] + ratio * (next_row['Close'] - current['Close']),
-                    'Volume': current['Volume'] * (1 + random.uniform(-0.3, 0.3))
-                }
-                
-                # Create timestamp
-                time_diff = next_row.name - current.name
-                new_time = current.name + (time_diff * ratio)
-                
-                new_row = pd.Series(interpolated, name=new_time)
-                expanded_data.append(new_row)
-        
-        # Add final row
-        if len(df) > 0:
-            expanded_data.append(df.iloc[-1])
-        
-        result_df = pd.DataFrame(expanded_data)
+        n = len(df)
+        steps = min(4, target_length // n) if n else 0  # Create up to 4 sub-intervals
+        if n < 2 or steps < 2:
+            return df.tail(target_length)
+        rng = rng if rng is not None else self.rng
+        
+        # Each source candle i expands into `steps` rows: itself plus steps-1 points towards candle i+1
+        ratios = np.arange(steps) / steps
+        times = df.index.values.astype('datetime64[ns]').astype(np.int64)
+        opens, highs, lows, closes, volumes = (df[col].to_numpy(dtype=np.float64)
+                                               for col in ["Open", "High", "Low", "Close", "Volume"])
+        
+        def interpolate(values):
+            return values[:-1, None] + ratios * (values[1:] - values[:-1])[:, None]
+        
+        new_opens = np.repeat(closes[:-1, None], steps, axis=1)  # Open is previous close
+        new_opens[:, 0] = opens[:-1]
+        new_volumes = volumes[:-1, None] * (1 + rng.uniform(-0.3, 0.3, size=(n - 1, steps)))
+        new_volumes[:, 0] = volumes[:-1]
+        new_times = times[:-1, None] + (np.diff(times)[:, None] * ratios).astype(np.int64)
+        
+        columns = [new_opens, interpolate(highs), interpolate(lows), interpolate(closes), new_volumes]
+        values = np.empty(((n - 1) * steps + 1, 5), dtype=np.float64)
+        for j, column in enumerate(columns):
+            values[:-1, j] = column.ravel()
+        values[-1] = [opens[-1], highs[-1], lows[-1], closes[-1], volumes[-1]]  # Add final row
+        
+        index = pd.DatetimeIndex(np.append(new_times.ravel(), times[-1]).astype('datetime64[ns]'), name=df.index.name)
+        result_df = pd.DataFrame(values, index=index, columns=["Open", "High", "Low", "Close", "Volume"])
         return result_df.tail(target_length)
     
     def _generate_synthetic_data(self, symbol, interval, limit):
@@ -264,114 +391,363 @@ class TradingAnalyzer:
         
         base_price = base_prices.get(symbol.upper(), 1.0)
         
-        # Generate time series
-        interval_minutes = {
-            "1m": 1, "3m": 3, "5m": 5, "15m": 15, "30m": 30,
-            "1h": 60, "2h": 120, "4h": 240, "6h": 360, "12h": 720, "1d": 1440
-        }
-        
-        minutes = interval_minutes.get(interval, 15)
-        end_time = datetime.now()
-        timestamps = pd.date_range(
-            end=end_time, 
-            periods=limit, 
-            freq=f"{minutes}min"
+        # Vectorized random walk: 1% volatility with a slight upward trend, drawn from the
+        # analyzer's own generator so the global NumPy RNG is never reseeded
+        df = generate_ohlcv(
+            length=limit,
+            base_price=base_price,
+            interval=interval if interval in INTERVAL_MS else "15m",
+            volatility=0.01,
+            trend=(-0.02, 0.02),
+            rng=self.rng
         )
         
-        # Generate realistic price movement
-        np.random.seed(42)  # For reproducible results
-        returns = np.random.normal(0, 0.01, limit)  # 1% volatility
-        
-        # Add some trending behavior
-        trend = np.linspace(-0.02, 0.02, limit)  # Slight upward trend
-        returns += trend
-        
-        # Generate price series
-        prices = [base_price]
-        for i in range(1, limit):
-            new_price = prices[-1] * (1 + returns[i])
-            prices.append(max(new_price, base_price * 0.1))  # Prevent negative prices
-        
-        # Generate OHLCV data
-        data = []
-        for i, (timestamp, price) in enumerate(zip(timestamps, prices)):
-            # Generate realistic OHLC from close price
-            volatility = random.uniform(0.005, 0.025)  # 0.5% to 2.5% intrabar movement
-            
-            open_price = prices[i-1] if i > 0 else price
-            close_price = price
-            
-            high_price = max(open_price, close_price) * (1 + random.uniform(0, volatility))
-            low_price = min(open_price, close_price) * (1 - random.uniform(0, volatility))
-            
-            volume = random.uniform(50000, 500000)  # Random volume
-            
-            data.append({
-                "Open Time": timestamp,
-                "Open": open_price,
-                "High": high_price, 
-                "Low": low_price,
-                "Close": close_price,
-                "Volume": volume
-            })
-        
-        df = pd.DataFrame(data)
-        df.set_index('Open Time', inplace=True)
-        
         print(f"Generated {len(df)} synthetic candles for {symbol}")
         return df
     
     def fetch_binance_ohlcv(self, symbol="BTCUSDT", interval="15m", limit=1000):
-        """Enhanced fetch method with comprehensive fallback system"""
-        
-        # Try multiple approaches in order of preference
-        methods = [
-            ("Direct Binance API", self._try_direct_binance),
-            ("Binance with Rotation", self._try_binance_with_rotation),
-            ("Alternative APIs", self._try_alternative_apis),
-            ("Synthetic Data", self._generate_synthetic_fallback)
-        ]
+        """Enhanced fetch method with comprehensive fallback system.
+        
+        ``df.attrs['source']`` names where the candles came from (see DATA_SOURCES).
+        """
+        
+        # Fail fast on symbols Binance does not list instead of timing out on every mirror
+        if self.validate_symbols:
+            try:
+                symbol = self.symbol_table.resolve(symbol)
+            except UnknownSymbolError as e:
+                return self._fetch_unlisted(symbol, interval, limit, e)
+        
+        # Serve straight from a live kline stream window (no network round trip)
+        stream = self._live_stream(symbol, interval)
+        if stream is not None and limit <= stream.window_size:
+            df = stream.get_frame(symbol, interval, limit)
+            if len(df) >= limit:
+                df.attrs['source'] = 'stream'
+                return df
+        
+        # Derive the interval from finer candles already in the cache (no network round trip)
+        if self.candle_store is not None:
+            try:
+                df = self._aggregate_from_store(symbol, interval, limit)
+                if df is not None:
+                    df.attrs['source'] = 'candle cache'
+                    return df
+            except Exception as e:
+                print(f"Candle aggregation unavailable: {str(e)}")
+        
+        # Intervals Binance does not serve (e.g. 10m) are built from the nearest native one
+        if interval not in INTERVAL_MS:
+            return self._fetch_aggregated(symbol, interval, limit)
+        
+        # Serve from the candle cache, topping it up with only the newest candles
+        if self.candle_store is not None:
+            try:
+                df = self._fetch_incremental(symbol, interval, limit)
+                if df is not None and len(df) > 50:
+                    df.attrs['source'] = 'candle cache'
+                    return df
+            except Exception as e:
+                print(f"Candle cache unavailable: {str(e)}")
+        
+        # Try multiple approaches, fastest healthy source first (synthetic data always last)
+        sources = {
+            "Direct Binance API": self._try_direct_binance,
+            "Binance with Rotation": self._try_binance_with_rotation,
+            "Alternative APIs": self._try_alternative_apis,
+        }
+        # Blocked hosts fail instantly through their own circuits, so sources are only reordered here
+        ranked = self.endpoint_health.rank([f"source:{name}" for name in sources], include_open=True)
+        methods = [(key[len("source:"):], sources[key[len("source:"):]]) for key in ranked]
+        methods.append(("Synthetic Data", self._generate_synthetic_fallback))
         
         for method_name, method_func in methods:
+            source_key = f"source:{method_name}"
+            start = time.perf_counter()
             try:
                 print(f"Trying {method_name}...")
                 df = method_func(symbol, interval, limit)
                 if df is not None and len(df) > 50:  # Minimum viable dataset
                     print(f"✅ Success with {method_name}")
+                    df.attrs.setdefault('source', self.DATA_SOURCES[method_name])
+                    self.endpoint_health.record_success(source_key, time.perf_counter() - start)
                     return df
                 else:
                     print(f"❌ {method_name} returned insufficient data")
+                    self.endpoint_health.record_failure(source_key, time.perf_counter() - start)
             except Exception as e:
                 print(f"❌ {method_name} failed: {str(e)}")
+                self.endpoint_health.record_failure(source_key, time.perf_counter() - start, error=e)
                 continue
         
         # If all methods fail, raise an exception
         raise Exception("All data fetching methods failed. Please check your internet connection.")
     
+    def _fetch_unlisted(self, symbol, interval, limit, error):
+        """Serve a token Binance does not list from CoinGecko, or re-raise the lookup error"""
+        if self._symbol_to_coingecko_id(symbol) is None:
+            raise error
+        print(f"⚠️ {error} - trying alternative APIs")
+        df = self._try_alternative_apis(symbol, interval, limit)
+        if df is not None and len(df) > 50:
+            df.attrs['source'] = self.DATA_SOURCES["Alternative APIs"]
+            return df
+        raise error
+    
+    def _fetch_incremental(self, symbol, interval, limit):
+        """Merge newly closed candles into the cache and return the requested tail"""
+        last_open = self.candle_store.last_open_time(symbol, interval)
+        stale = last_open is None or (
+            self.candle_store.count(symbol, interval) < limit or
+            (int(time.time() * 1000) - last_open) // interval_to_ms(interval) >= 1000 or
+            # Missing candles inside the cached tail are never re-fetched by a top-up
+            bool(find_gaps(self.candle_store.load(symbol, interval, limit=limit), interval))
+        )
+        
+        if stale and limit > 1000:
+            # More than one page requested: backfill the window in parallel (stored as it goes)
+            end_time = int(time.time() * 1000)
+            try:
+                df = self.backfill_ohlcv(symbol, interval, start=end_time - limit * interval_to_ms(interval),
+                                         end=end_time)
+            except Exception as e:
+                print(f"Candle backfill failed: {str(e)}")
+                return self._load_stale(symbol, interval, limit, last_open)
+            return self.candle_store.load(symbol, interval, limit=limit) if len(df) else None
+        
+        if stale:
+            # Not enough (contiguous) history cached, or too far behind: download the full window
+            data = self._fetch_binance_klines_raw(symbol, interval, limit)
+        else:
+            # Re-fetch from the last stored candle, which may still have been forming when saved;
+            # with startTime set Binance only returns the candles that exist after it
+            data = self._fetch_binance_klines_raw(symbol, interval, 1000, start_time=last_open)
+        
+        if not data:
+            return self._load_stale(symbol, interval, limit, last_open)
+        self.candle_store.upsert(symbol, interval, self._parse_binance_response(data))
+        return self.candle_store.load(symbol, interval, limit=limit)
+    
+    def _load_stale(self, symbol, interval, limit, last_open):
+        """Cached window served when the top-up fails, or None unless the cache holds ``limit`` contiguous rows"""
+        if last_open is None:
+            return None
+        df = self.candle_store.load(symbol, interval, limit=limit)
+        if len(df) < limit or find_gaps(df, interval):
+            return None
+        age = (int(time.time() * 1000) - last_open) // interval_to_ms(interval)
+        print(f"⚠️ Top-up failed: serving cached {symbol} ({interval}) candles, {age} candles behind")
+        df.attrs['stale'] = True
+        return df
+    
+    def _aggregate_from_store(self, symbol, interval, limit):
+        """Build ``limit`` candles from a finer cached interval whose newest candle is still current"""
+        now_ms = int(time.time() * 1000)
+        target_ms = interval_to_ms(interval)
+        bases = [base for base in self.candle_store.intervals(symbol) if can_aggregate(base, interval)]
+        for base in sorted(bases, key=interval_to_ms, reverse=True):
+            last_open = self.candle_store.last_open_time(symbol, base)
+            if last_open is None or now_ms - last_open >= interval_to_ms(base):
+                continue  # Cached candles stop before the current one
+            start = int(bucket_open_times(now_ms, interval)) - (limit - 1) * target_ms
+            df = aggregate_ohlcv(self.candle_store.load(symbol, base, start_time=start), interval, base, now=now_ms)
+            if len(df) >= limit:
+                print(f"✅ Built {interval} candles for {symbol} from cached {base} candles")
+                return df.tail(limit)
+        return None
+    
+    def _fetch_aggregated(self, symbol, interval, limit):
+        """Fetch the nearest native Binance interval and aggregate it into ``interval``"""
+        if interval in INTERVAL_MS:
+            return self.fetch_binance_ohlcv(symbol, interval, limit)
+        base = best_base_interval(interval, INTERVAL_MS)
+        if base is None:
+            raise Exception(f"Unsupported interval: {interval}")
+        base_ms = interval_to_ms(base)
+        base_limit = (limit + 1) * (interval_to_ms(interval) // base_ms)
+        now_ms = int(time.time() * 1000)
+        
+        def backfill():
+            return self.backfill_ohlcv(symbol, base, start=now_ms - base_limit * base_ms, end=now_ms)
+        
+        # A single request is capped at 1000 rows; without a candle store (which pages through
+        # _fetch_incremental) larger windows are backfilled page by page
+        backfilled = base_limit > 1000 and self.candle_store is None
+        df = backfill() if backfilled else self.fetch_binance_ohlcv(symbol, base, base_limit)
+        source = df.attrs.get('source')
+        result = aggregate_ohlcv(df, interval, base, now=now_ms).tail(limit)
+        
+        # Buckets missing base candles are dropped by the aggregation: refill the base window once
+        gaps = find_gaps(result, interval)
+        if (gaps or len(result) < limit) and base_limit > 1000 and not backfilled:
+            try:
+                result = aggregate_ohlcv(backfill(), interval, base, now=now_ms).tail(limit)
+                gaps = find_gaps(result, interval)
+                source = 'binance'
+            except Exception as e:
+                print(f"Backfill of {base} candles failed: {str(e)}")
+        if gaps:
+            print(f"⚠️ {len(gaps)} gaps in the {interval} candles built for {symbol}")
+        result.attrs['gaps'] = gaps
+        result.attrs['source'] = source
+        return result
+    
+    def _fetch_binance_klines_raw(self, symbol, interval, limit, start_time=None, end_time=None):
+        """Fetch raw kline rows from the binance.com mirrors (hedged when enabled)"""
+        if self.hedged_fetch:
+            return self._hedged_binance_fetch(symbol, interval, limit, start_time, end_time)
+        for base_url in self.endpoint_health.rank(self.binance_mirrors):
+            data = self._fetch_klines_from_mirror(base_url, symbol, interval, limit, start_time, end_time)
+            if data:
+                return data
+        return None
+    
+    def backfill_ohlcv(self, symbol="BTCUSDT", interval="15m", start=None, end=None, max_workers=None, page_size=1000):
+        """Download a date range as parallel startTime/endTime pages and stitch them into one frame.
+        
+        ``start``/``end`` accept epoch milliseconds, datetimes or date strings (UTC); ``end`` defaults
+        to now. Missing candles are listed in ``df.attrs['gaps']``.
+        """
+        interval_ms = interval_to_ms(interval)
+        end_ms = to_ms(end) if end is not None else int(time.time() * 1000)
+        start_ms = to_ms(start) if start is not None else end_ms - page_size * interval_ms
+        if start_ms >= end_ms:
+            raise ValueError("Backfill start must be before end")
+        
+        page_span = page_size * interval_ms
+        pages = [(page_start, min(page_start + page_span - 1, end_ms))
+                 for page_start in range(start_ms, end_ms + 1, page_span)]
+        workers = max(1, min(max_workers or self.backfill_workers, len(pages)))
+        print(f"Backfilling {symbol} ({interval}): {len(pages)} pages with {workers} workers")
+        
+        frames = []
+        failed_pages = []
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="binance-backfill") as executor:
+            futures = {executor.submit(self._fetch_backfill_page, symbol, interval, page_size, page_start, page_end):
+                       (page_start, page_end) for page_start, page_end in pages}
+            for future, page in futures.items():
+                df = future.result()
+                if df is None:
+                    failed_pages.append(page)
+                elif len(df):
+                    frames.append(df)
+        
+        if not frames:
+            raise Exception(f"Backfill failed for {symbol} ({interval}): no pages downloaded")
+        
+        df = pd.concat(frames)
+        df = df[~df.index.duplicated(keep='last')].sort_index()
+        df = df[(df.index >= pd.to_datetime(start_ms, unit='ms')) & (df.index <= pd.to_datetime(end_ms, unit='ms'))]
+        
+        gaps = find_gaps(df, interval)
+        df.attrs['gaps'] = gaps
+        if failed_pages:
+            print(f"⚠️ {len(failed_pages)} backfill pages failed after {self.backfill_retries} attempts")
+        if gaps:
+            print(f"⚠️ Backfill found {len(gaps)} gaps in {symbol} ({interval}) history")
+        
+        if self.candle_store is not None:
+            self.candle_store.upsert(symbol, interval, df)
+        df.attrs['source'] = 'binance'
+        return df
+    
+    def _fetch_backfill_page(self, symbol, interval, page_size, start_time, end_time):
+        """Fetch one backfill page with exponential backoff; returns None if every attempt fails"""
+        for attempt in range(self.backfill_retries):
+            data = self._fetch_binance_klines_raw(symbol, interval, page_size, start_time, end_time)
+            if data is not None:
+                return self._parse_binance_response(data)
+            time.sleep(min(8, 2 ** attempt) + random.uniform(0, 0.5))
+        return None
+    
     def _try_direct_binance(self, symbol, interval, limit):
         """Try direct Binance API call"""
         url = f"https://api.binance.com/api/v3/klines?symbol={symbol.upper()}&interval={interval}&limit={limit}"
         response = self.make_request_with_fallback(url)
-        return self._parse_binance_response(response.json())
+        return self._parse_binance_response(response.content)
     
     def _try_binance_with_rotation(self, symbol, interval, limit):
-        """Try Binance with header rotation and delays"""
-        urls = [
-            f"https://api.binance.com/api/v3/klines?symbol={symbol.upper()}&interval={interval}&limit={limit}",
-            f"https://api.binance.us/api/v3/klines?symbol={symbol.upper()}&interval={interval}&limit={limit}",
-            f"https://api1.binance.com/api/v3/klines?symbol={symbol.upper()}&interval={interval}&limit={limit}",
-            f"https://api2.binance.com/api/v3/klines?symbol={symbol.upper()}&interval={interval}&limit={limit}"
-        ]
-        
-        for url in urls:
-            try:
-                headers = random.choice(self.headers_list)
-                response = requests.get(url, headers=headers, timeout=12)
-                if response.status_code == 200:
-                    return self._parse_binance_response(response.json())
-                time.sleep(random.uniform(0.5, 1.5))  # Rate limiting
-            except Exception:
-                continue
+        """Try Binance mirrors, racing them when hedged fetch is enabled (Binance.US as a last resort)"""
+        data = self._fetch_binance_klines_raw(symbol, interval, limit)
+        source = 'binance'
+        if not data and self.endpoint_health.is_available(self.binance_us_url):
+            # Never cached or merged with binance.com candles (see binance_us_url)
+            data = self._fetch_klines_from_mirror(self.binance_us_url, symbol, interval, limit)
+            source = 'binance.us'
+        if not data:
+            return None
+        df = self._parse_binance_response(data)
+        df.attrs['source'] = source
+        return df
+    
+    def _klines_url(self, base_url, symbol, interval, limit, start_time=None, end_time=None):
+        url = f"{base_url}/api/v3/klines?symbol={symbol.upper()}&interval={interval}&limit={limit}"
+        if start_time is not None:
+            url += f"&startTime={int(start_time)}"
+        if end_time is not None:
+            url += f"&endTime={int(end_time)}"
+        return url
+    
+    def _is_valid_klines(self, data, allow_empty=False):
+        """Check that a payload looks like a Binance kline array"""
+        if not isinstance(data, list):
+            return False
+        if not data:
+            return allow_empty
+        return isinstance(data[0], list) and len(data[0]) >= 6
+    
+    def _fetch_klines_from_mirror(self, base_url, symbol, interval, limit, start_time=None, end_time=None):
+        """Fetch raw klines from one mirror, recording its health; returns None on failure"""
+        start = time.perf_counter()
+        status_code = None
+        error = None
+        try:
+            headers = random.choice(self.headers_list)
+            response = self.session_pool.get(
+                self._klines_url(base_url, symbol, interval, limit, start_time, end_time),
+                headers=headers,
+                timeout=self.mirror_timeout
+            )
+            status_code = response.status_code
+            if response.status_code == 200:
+                data = json_loads(response.content)
+                # A ranged request may legitimately be empty (e.g. before the symbol listed)
+                if self._is_valid_klines(data, allow_empty=start_time is not None):
+                    self.endpoint_health.record_success(base_url, time.perf_counter() - start)
+                    return data
+        except RateLimitExceeded:
+            return None
+        except Exception as e:
+            error = e
+        self.endpoint_health.record_failure(base_url, time.perf_counter() - start, status_code, error)
+        return None
+    
+    def _hedged_binance_fetch(self, symbol, interval, limit, start_time=None, end_time=None):
+        """Race Binance mirrors: start the next one every hedge_delay seconds, keep the first valid answer"""
+        mirrors = self.endpoint_health.rank(self.binance_mirrors)
+        if not mirrors:
+            return None  # Every mirror's circuit is open (network loss, geo-block)
+        executor = ThreadPoolExecutor(max_workers=len(mirrors), thread_name_prefix="binance-hedge")
+        pending = set()
+        next_mirror = 0
+        try:
+            while next_mirror < len(mirrors) or pending:
+                if next_mirror < len(mirrors):
+                    pending.add(executor.submit(
+                        self._fetch_klines_from_mirror, mirrors[next_mirror], symbol, interval, limit,
+                        start_time, end_time))
+                    next_mirror += 1
+                
+                # Wait for an answer; if none arrives within the hedge delay, launch another mirror
+                timeout = self.hedge_delay if next_mirror < len(mirrors) else None
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    data = future.result()
+                    if data:
+                        return data
+        finally:
+            # Losers are ignored; queued attempts are cancelled and running ones finish in the background
+            executor.shutdown(wait=False, cancel_futures=True)
         
         return None
     
@@ -413,394 +789,288 @@ class TradingAnalyzer:
         """Generate synthetic data as final fallback"""
         return self._generate_synthetic_data(symbol, interval, limit)
     
-    def add_comprehensive_indicators(self, df):
-        """Add comprehensive technical indicators - unchanged from original"""
-        close = df['Close']
-        high = df['High']
-        low = df['Low']
-        volume = df['Volume']
-        
-        # Momentum Indicators
-        df['RSI_14'] = RSIIndicator(close, window=14).rsi()
-        df['RSI_21'] = RSIIndicator(close, window=21).rsi()
-        df['Stoch_K'] = StochasticOscillator(high, low, close, window=14).stoch()
-        df['Stoch_D'] = StochasticOscillator(high, low, close, window=14).stoch_signal()
-        df['Williams_R'] = WilliamsRIndicator(high, low, close).williams_r()
-        
-        # Trend Indicators
-        df['EMA_9'] = EMAIndicator(close, window=9).ema_indicator()
-        df['EMA_21'] = EMAIndicator(close, window=21).ema_indicator()
-        df['EMA_50'] = EMAIndicator(close, window=50).ema_indicator()
-        df['SMA_20'] = SMAIndicator(close, window=20).sma_indicator()
-        df['SMA_50'] = SMAIndicator(close, window=50).sma_indicator()
-        
-        # MACD
-        macd = MACD(close)
-        df['MACD'] = macd.macd()
-        df['MACD_Signal'] = macd.macd_signal()
-        df['MACD_Histogram'] = macd.macd_diff()
-        
-        # ADX and DI
-        adx = ADXIndicator(high, low, close)
-        df['ADX'] = adx.adx()
-        df['DI_Plus'] = adx.adx_pos()
-        df['DI_Minus'] = adx.adx_neg()
-        
-        # Volatility Indicators
-        bb = BollingerBands(close, window=20, window_dev=2)
-        df['BB_Upper'] = bb.bollinger_hband()
-        df['BB_Middle'] = bb.bollinger_mavg()
-        df['BB_Lower'] = bb.bollinger_lband()
-        df['BB_Width'] = (df['BB_Upper'] - df['BB_Lower']) / df['BB_Middle'] * 100
-        df['BB_Position'] = (close - df['BB_Lower']) / (df['BB_Upper'] - df['BB_Lower'])
-        
-        # Keltner Channels
-        kc = KeltnerChannel(high, low, close)
-        df['KC_Upper'] = kc.keltner_channel_hband()
-        df['KC_Lower'] = kc.keltner_channel_lband()
-        df['KC_Middle'] = kc.keltner_channel_mband()
-        
-        # ATR and volatility measures
-        df['ATR'] = AverageTrueRange(high, low, close).average_true_range()
-        df['ATR_Percent'] = (df['ATR'] / close) * 100
-        
-        # Volume Indicators  
-        df['Volume_SMA'] = volume.rolling(window=20).mean()
-        df['Volume_Ratio'] = volume / df['Volume_SMA']
-        df['OBV'] = OnBalanceVolumeIndicator(close, volume).on_balance_volume()
-        df['CMF'] = ChaikinMoneyFlowIndicator(high, low, close, volume).chaikin_money_flow()
-        
-        # Price Action
-        df['Body_Size'] = abs(df['Close'] - df['Open']) / df['Open'] * 100
-        df['Upper_Wick'] = (df['High'] - np.maximum(df['Open'], df['Close'])) / df['Open'] * 100
-        df['Lower_Wick'] = (np.minimum(df['Open'], df['Close']) - df['Low']) / df['Open'] * 100
-        df['Total_Range'] = (df['High'] - df['Low']) / df['Open'] * 100
-        
-        # Support/Resistance levels (simplified)
-        df['Pivot'] = (df['High'] + df['Low'] + df['Close']) / 3
-        df['R1'] = 2 * df['Pivot'] - df['Low']
-        df['S1'] = 2 * df['Pivot'] - df['High']
-        
-        # Rate of Change
-        df['ROC_5'] = ((close / close.shift(5)) - 1) * 100
-        df['ROC_14'] = ((close / close.shift(14)) - 1) * 100
-        
-        df.dropna(inplace=True)
-        return df
+    @property
+    def custom_rules(self):
+        """RuleSet scored next to the built-in confluence rules, or None"""
+        if self._custom_rules is not None:
+            return self._custom_rules
+        return get_custom_rules() if self.use_custom_rules else None
+    
+    def indicator_columns(self, *analyses):
+        """Indicator columns needed by the named ANALYSIS_COLUMNS steps (all of them when none are named)"""
+        if not analyses:
+            return list(indicator_columns())
+        unknown = [name for name in analyses if name not in self.ANALYSIS_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown analysis step(s): {', '.join(unknown)}")
+        return list(indicator_columns([col for name in analyses for col in self.ANALYSIS_COLUMNS[name]]))
+    
+    def add_comprehensive_indicators(self, df, columns=None, compact=None):
+        """Add technical indicators (fused NumPy kernel); ``columns`` limits the work to that subset
+        
+        The default is every column, as before. A light pass such as a momentum scan can ask for
+        ``self.indicator_columns('momentum')`` and skip the rest of the indicator graph.
+        ``compact`` (default: the analyzer's ``compact_frames``) keeps only the columns the analysis
+        steps read, with oscillators and ratios in float32.
+        """
+        compact = self.compact_frames if compact is None else compact
+        if compact and columns is None:
+            rules = self.custom_rules
+            columns = self.indicator_columns(*self.ANALYSIS_COLUMNS)
+            if rules:
+                columns = list(indicator_columns(columns + rules.indicator_columns))
+        return add_indicators(df, columns, compact=compact)
     
-    def analyze_momentum_confluence(self, row):
-        """Analyze momentum indicators for confluences - unchanged from original"""
-        confluences = {'bullish': [], 'bearish': [], 'neutral': []}
+    def add_comprehensive_indicators_batch(self, frames, columns=None, length=None):
+        """Indicators for a whole watchlist ({symbol: OHLCV frame}) in one 2-D NumPy pass
+        
+        Frames are cut to their last ``length`` candles (default: the shortest frame) and stacked
+        into (symbols, time) panels. Returns {symbol: frame}, as add_comprehensive_indicators would.
+        """
+        return add_indicators_batch(frames, columns, length)
+    
+    def analyze_momentum_confluence(self, row, confluences=None):
+        """Analyze momentum indicators for confluences (Confluence records; fills ``confluences`` if given)"""
+        if confluences is None:
+            confluences = {'bullish': [], 'bearish': [], 'neutral': []}
+        
+        p = self.confluence_params
         
         # RSI Analysis
-        if row['RSI_14'] < 30:
-            confluences['bullish'].append({
-                'indicator': 'RSI (14)',
-                'condition': f"Oversold at {row['RSI_14']:.1f}",
-                'implication': "Potential bounce or reversal setup. Watch for bullish divergence or break above 30.",
-                'strength': 'Medium',
-                'timeframe': 'Short-term'
-            })
-        elif row['RSI_14'] > 70:
-            confluences['bearish'].append({
-                'indicator': 'RSI (14)',
-                'condition': f"Overbought at {row['RSI_14']:.1f}",
-                'implication': "Potential pullback or distribution. Watch for bearish divergence or break below 70.",
-                'strength': 'Medium',
-                'timeframe': 'Short-term'
-            })
-        elif 45 <= row['RSI_14'] <= 55:
-            confluences['neutral'].append({
-                'indicator': 'RSI (14)',
-                'condition': f"Neutral at {row['RSI_14']:.1f}",
-                'implication': "Balanced momentum. Look for directional break above 55 or below 45.",
-                'strength': 'Low',
-                'timeframe': 'Short-term'
-            })
+        rsi = row['RSI_14']
+        if rsi < p['rsi_oversold']:
+            confluences['bullish'].append(Confluence('rsi_oversold', 'bullish', MEDIUM, rsi))
+        elif rsi > p['rsi_overbought']:
+            confluences['bearish'].append(Confluence('rsi_overbought', 'bearish', MEDIUM, rsi))
+        elif p['rsi_neutral_low'] <= rsi <= p['rsi_neutral_high']:
+            confluences['neutral'].append(Confluence('rsi_neutral', 'neutral', LOW, rsi))
         
         # Stochastic Analysis
-        if row['Stoch_K'] < 20 and row['Stoch_D'] < 20:
-            confluences['bullish'].append({
-                'indicator': 'Stochastic',
-                'condition': f"Both %K ({row['Stoch_K']:.1f}) and %D ({row['Stoch_D']:.1f}) oversold",
-                'implication': "Strong oversold condition. Potential reversal when %K crosses above %D.",
-                'strength': 'Strong' if row['Stoch_K'] > row['Stoch_D'] else 'Medium',
-                'timeframe': 'Short-term'
-            })
-        elif row['Stoch_K'] > 80 and row['Stoch_D'] > 80:
-            confluences['bearish'].append({
-                'indicator': 'Stochastic',
-                'condition': f"Both %K ({row['Stoch_K']:.1f}) and %D ({row['Stoch_D']:.1f}) overbought",
-                'implication': "Strong overbought condition. Potential reversal when %K crosses below %D.",
-                'strength': 'Strong' if row['Stoch_K'] < row['Stoch_D'] else 'Medium',
-                'timeframe': 'Short-term'
-            })
+        stoch_k, stoch_d = row['Stoch_K'], row['Stoch_D']
+        if stoch_k < p['stoch_oversold'] and stoch_d < p['stoch_oversold']:
+            confluences['bullish'].append(Confluence('stoch_oversold', 'bullish',
+                                                     STRONG if stoch_k > stoch_d else MEDIUM, (stoch_k, stoch_d)))
+        elif stoch_k > p['stoch_overbought'] and stoch_d > p['stoch_overbought']:
+            confluences['bearish'].append(Confluence('stoch_overbought', 'bearish',
+                                                     STRONG if stoch_k < stoch_d else MEDIUM, (stoch_k, stoch_d)))
         
         # Williams %R Analysis
-        if row['Williams_R'] < -80:
-            confluences['bullish'].append({
-                'indicator': 'Williams %R',
-                'condition': f"Oversold at {row['Williams_R']:.1f}",
-                'implication': "Potential buying opportunity. Watch for move above -80 for confirmation.",
-                'strength': 'Medium',
-                'timeframe': 'Short-term'
-            })
-        elif row['Williams_R'] > -20:
-            confluences['bearish'].append({
-                'indicator': 'Williams %R',
-                'condition': f"Overbought at {row['Williams_R']:.1f}",
-                'implication': "Potential selling pressure. Watch for move below -20 for confirmation.",
-                'strength': 'Medium',
-                'timeframe': 'Short-term'
-            })
+        williams = row['Williams_R']
+        if williams < p['williams_oversold']:
+            confluences['bullish'].append(Confluence('williams_oversold', 'bullish', MEDIUM, williams))
+        elif williams > p['williams_overbought']:
+            confluences['bearish'].append(Confluence('williams_overbought', 'bearish', MEDIUM, williams))
         
         return confluences
     
-    def analyze_trend_confluence(self, row):
-        """Analyze trend indicators for confluences - unchanged from original"""
-        confluences = {'bullish': [], 'bearish': [], 'neutral': []}
+    def analyze_trend_confluence(self, row, confluences=None):
+        """Analyze trend indicators for confluences (Confluence records; fills ``confluences`` if given)"""
+        if confluences is None:
+            confluences = {'bullish': [], 'bearish': [], 'neutral': []}
+        
+        p = self.confluence_params
         
         # EMA Alignment
-        ema_alignment = "bullish" if row['EMA_9'] > row['EMA_21'] > row['EMA_50'] else "bearish" if row['EMA_9'] < row['EMA_21'] < row['EMA_50'] else "mixed"
-        
-        if ema_alignment == "bullish":
-            confluences['bullish'].append({
-                'indicator': 'EMA Alignment',
-                'condition': "EMA 9 > EMA 21 > EMA 50",
-                'implication': "Strong bullish trend structure. Expect continuation with pullbacks to EMAs as support.",
-                'strength': 'Strong',
-                'timeframe': 'Medium-term'
-            })
-        elif ema_alignment == "bearish":
-            confluences['bearish'].append({
-                'indicator': 'EMA Alignment',
-                'condition': "EMA 9 < EMA 21 < EMA 50",
-                'implication': "Strong bearish trend structure. Expect continuation with rallies to EMAs as resistance.",
-                'strength': 'Strong',
-                'timeframe': 'Medium-term'
-            })
+        ema_9, ema_21, ema_50 = row['EMA_9'], row['EMA_21'], row['EMA_50']
+        if ema_9 > ema_21 > ema_50:
+            confluences['bullish'].append(Confluence('ema_bullish', 'bullish', STRONG))
+        elif ema_9 < ema_21 < ema_50:
+            confluences['bearish'].append(Confluence('ema_bearish', 'bearish', STRONG))
         
         # Price vs EMAs
-        if row['Close'] > row['EMA_21']:
-            confluences['bullish'].append({
-                'indicator': 'Price vs EMA 21',
-                'condition': f"Price {((row['Close']/row['EMA_21']-1)*100):+.2f}% above EMA 21",
-                'implication': "Bullish bias maintained. EMA 21 likely to act as dynamic support.",
-                'strength': 'Medium',
-                'timeframe': 'Short to Medium-term'
-            })
+        distance = (row['Close'] / ema_21 - 1) * 100
+        if row['Close'] > ema_21:
+            confluences['bullish'].append(Confluence('price_above_ema21', 'bullish', MEDIUM, distance))
         else:
-            confluences['bearish'].append({
-                'indicator': 'Price vs EMA 21',
-                'condition': f"Price {((row['Close']/row['EMA_21']-1)*100):+.2f}% below EMA 21",
-                'implication': "Bearish bias maintained. EMA 21 likely to act as dynamic resistance.",
-                'strength': 'Medium',
-                'timeframe': 'Short to Medium-term'
-            })
-        
-        # MACD Analysis
-        if row['MACD'] > row['MACD_Signal'] and row['MACD_Histogram'] > 0:
-            confluences['bullish'].append({
-                'indicator': 'MACD',
-                'condition': "MACD above signal line with positive histogram",
-                'implication': "Bullish momentum building. Watch for histogram expansion for stronger moves.",
-                'strength': 'Strong' if row['MACD_Histogram'] > 0 else 'Medium',
-                'timeframe': 'Medium-term'
-            })
-        elif row['MACD'] < row['MACD_Signal'] and row['MACD_Histogram'] < 0:
-            confluences['bearish'].append({
-                'indicator': 'MACD',
-                'condition': "MACD below signal line with negative histogram",
-                'implication': "Bearish momentum building. Watch for histogram expansion for stronger moves.",
-                'strength': 'Strong' if row['MACD_Histogram'] < 0 else 'Medium',
-                'timeframe': 'Medium-term'
-            })
+            confluences['bearish'].append(Confluence('price_below_ema21', 'bearish', MEDIUM, distance))
+        
+        # MACD Analysis (a histogram past zero always makes these Strong)
+        macd, macd_signal, histogram = row['MACD'], row['MACD_Signal'], row['MACD_Histogram']
+        if macd > macd_signal and histogram > 0:
+            confluences['bullish'].append(Confluence('macd_bullish', 'bullish', STRONG))
+        elif macd < macd_signal and histogram < 0:
+            confluences['bearish'].append(Confluence('macd_bearish', 'bearish', STRONG))
         
         # ADX Trend Strength
-        if row['ADX'] > 25:
+        adx = row['ADX']
+        if adx > p['adx_trending']:
             trend_direction = "bullish" if row['DI_Plus'] > row['DI_Minus'] else "bearish"
-            confluences[trend_direction].append({
-                'indicator': 'ADX Trend Strength',
-                'condition': f"Strong trending market (ADX: {row['ADX']:.1f})",
-                'implication': f"Strong {trend_direction} trend in place. Expect trend continuation with minor pullbacks.",
-                'strength': 'Strong' if row['ADX'] > 40 else 'Medium',
-                'timeframe': 'Medium to Long-term'
-            })
-        elif row['ADX'] < 20:
-            confluences['neutral'].append({
-                'indicator': 'ADX Trend Strength',
-                'condition': f"Weak trending market (ADX: {row['ADX']:.1f})",
-                'implication': "Market in consolidation/ranging phase. Look for breakout setups.",
-                'strength': 'Medium',
-                'timeframe': 'All timeframes'
-            })
+            confluences[trend_direction].append(Confluence('adx_trending', trend_direction,
+                                                           STRONG if adx > p['adx_strong'] else MEDIUM, adx))
+        elif adx < p['adx_ranging']:
+            confluences['neutral'].append(Confluence('adx_ranging', 'neutral', MEDIUM, adx))
         
         return confluences
     
-    def analyze_volatility_confluence(self, row):
-        """Analyze volatility and mean reversion indicators (unchanged from original)"""
-        confluences = {'bullish': [], 'bearish': [], 'neutral': []}
+    def analyze_volatility_confluence(self, row, confluences=None):
+        """Analyze volatility and mean reversion indicators (Confluence records; fills ``confluences`` if given)"""
+        if confluences is None:
+            confluences = {'bullish': [], 'bearish': [], 'neutral': []}
+        
+        p = self.confluence_params
         
         # Bollinger Bands Analysis
         bb_pos = row['BB_Position']
-        if bb_pos < 0.1:  # Near lower band
-            confluences['bullish'].append({
-                'indicator': 'Bollinger Bands',
-                'condition': f"Price near lower band (Position: {bb_pos:.2f})",
-                'implication': "Potential mean reversion setup. Watch for bounce off lower band or breakdown.",
-                'strength': 'Medium',
-                'timeframe': 'Short-term'
-            })
-        elif bb_pos > 0.9:  # Near upper band
-            confluences['bearish'].append({
-                'indicator': 'Bollinger Bands',
-                'condition': f"Price near upper band (Position: {bb_pos:.2f})",
-                'implication': "Potential mean reversion setup. Watch for rejection at upper band or breakout.",
-                'strength': 'Medium',
-                'timeframe': 'Short-term'
-            })
+        if bb_pos < p['bb_lower']:  # Near lower band
+            confluences['bullish'].append(Confluence('bb_lower', 'bullish', MEDIUM, bb_pos))
+        elif bb_pos > p['bb_upper']:  # Near upper band
+            confluences['bearish'].append(Confluence('bb_upper', 'bearish', MEDIUM, bb_pos))
         
         # Bollinger Band Width
-        if row['BB_Width'] < 2:  # Low volatility
-            confluences['neutral'].append({
-                'indicator': 'Bollinger Band Width',
-                'condition': f"Low volatility environment (Width: {row['BB_Width']:.2f}%)",
-                'implication': "Squeeze condition. Expect volatility expansion and potential breakout soon.",
-                'strength': 'Strong',
-                'timeframe': 'Short to Medium-term'
-            })
-        elif row['BB_Width'] > 8:  # High volatility
-            confluences['neutral'].append({
-                'indicator': 'Bollinger Band Width',
-                'condition': f"High volatility environment (Width: {row['BB_Width']:.2f}%)",
-                'implication': "Volatility expansion phase. Expect potential reversion to mean.",
-                'strength': 'Medium',
-                'timeframe': 'Short-term'
-            })
+        bb_width = row['BB_Width']
+        if bb_width < p['bb_squeeze']:  # Low volatility
+            confluences['neutral'].append(Confluence('bb_squeeze', 'neutral', STRONG, bb_width))
+        elif bb_width > p['bb_expansion']:  # High volatility
+            confluences['neutral'].append(Confluence('bb_expansion', 'neutral', MEDIUM, bb_width))
         
         # ATR Analysis
-        if row['ATR_Percent'] > 3:
-            confluences['neutral'].append({
-                'indicator': 'Average True Range',
-                'condition': f"High volatility (ATR: {row['ATR_Percent']:.2f}%)",
-                'implication': "Elevated volatility. Use wider stops and smaller position sizes.",
-                'strength': 'Medium',
-                'timeframe': 'All timeframes'
-            })
+        if row['ATR_Percent'] > p['atr_high']:
+            confluences['neutral'].append(Confluence('atr_high', 'neutral', MEDIUM, row['ATR_Percent']))
         
         return confluences
     
-    def analyze_volume_confluence(self, row):
-        """Analyze volume-based confluences (unchanged from original)"""
-        confluences = {'bullish': [], 'bearish': [], 'neutral': []}
+    def analyze_volume_confluence(self, row, confluences=None):
+        """Analyze volume-based confluences (Confluence records; fills ``confluences`` if given)"""
+        if confluences is None:
+            confluences = {'bullish': [], 'bearish': [], 'neutral': []}
+        
+        p = self.confluence_params
         
         # Volume Analysis
-        if row['Volume_Ratio'] > 1.5:
-            confluences['neutral'].append({
-                'indicator': 'Volume',
-                'condition': f"Above average volume ({row['Volume_Ratio']:.1f}x normal)",
-                'implication': "Strong participation. Moves likely to be more sustainable.",
-                'strength': 'Strong' if row['Volume_Ratio'] > 2 else 'Medium',
-                'timeframe': 'Short-term'
-            })
-        elif row['Volume_Ratio'] < 0.7:
-            confluences['neutral'].append({
-                'indicator': 'Volume',
-                'condition': f"Below average volume ({row['Volume_Ratio']:.1f}x normal)",
-                'implication': "Low participation. Moves may lack conviction and sustainability.",
-                'strength': 'Medium',
-                'timeframe': 'Short-term'
-            })
+        volume_ratio = row['Volume_Ratio']
+        if volume_ratio > p['volume_high']:
+            confluences['neutral'].append(Confluence('volume_high', 'neutral',
+                                                     STRONG if volume_ratio > p['volume_very_high'] else MEDIUM,
+                                                     volume_ratio))
+        elif volume_ratio < p['volume_low']:
+            confluences['neutral'].append(Confluence('volume_low', 'neutral', MEDIUM, volume_ratio))
         
         # Chaikin Money Flow
-        if row['CMF'] > 0.2:
-            confluences['bullish'].append({
-                'indicator': 'Chaikin Money Flow',
-                'condition': f"Strong buying pressure (CMF: {row['CMF']:.2f})",
-                'implication': "Money flowing into the asset. Supports bullish bias.",
-                'strength': 'Strong' if row['CMF'] > 0.3 else 'Medium',
-                'timeframe': 'Medium-term'
-            })
-        elif row['CMF'] < -0.2:
-            confluences['bearish'].append({
-                'indicator': 'Chaikin Money Flow',
-                'condition': f"Strong selling pressure (CMF: {row['CMF']:.2f})",
-                'implication': "Money flowing out of the asset. Supports bearish bias.",
-                'strength': 'Strong' if row['CMF'] < -0.3 else 'Medium',
-                'timeframe': 'Medium-term'
-            })
+        cmf = row['CMF']
+        if cmf > p['cmf_pressure']:
+            confluences['bullish'].append(Confluence('cmf_buying', 'bullish',
+                                                     STRONG if cmf > p['cmf_strong'] else MEDIUM, cmf))
+        elif cmf < -p['cmf_pressure']:
+            confluences['bearish'].append(Confluence('cmf_selling', 'bearish',
+                                                     STRONG if cmf < -p['cmf_strong'] else MEDIUM, cmf))
         
         return confluences
     
-    def analyze_price_action(self, row):
-        """Analyze price action patterns (unchanged from original)"""
-        confluences = {'bullish': [], 'bearish': [], 'neutral': []}
+    def analyze_price_action(self, row, confluences=None):
+        """Analyze price action patterns (Confluence records; fills ``confluences`` if given)"""
+        if confluences is None:
+            confluences = {'bullish': [], 'bearish': [], 'neutral': []}
+        
+        p = self.confluence_params
         
         # Candle Analysis
-        if row['Body_Size'] > 2:  # Large body
-            candle_type = "bullish" if row['Close'] > row['Open'] else "bearish"
-            confluences[candle_type].append({
-                'indicator': 'Price Action',
-                'condition': f"Large {candle_type} candle (Body: {row['Body_Size']:.2f}%)",
-                'implication': f"Strong {candle_type} conviction. Expect follow-through in next few candles.",
-                'strength': 'Strong' if row['Body_Size'] > 3 else 'Medium',
-                'timeframe': 'Short-term'
-            })
+        body = row['Body_Size']
+        bullish_close = row['Close'] > row['Open']
+        if body > p['body_large']:  # Large body
+            candle_type = "bullish" if bullish_close else "bearish"
+            confluences[candle_type].append(Confluence('large_candle', candle_type,
+                                                       STRONG if body > p['body_strong'] else MEDIUM, body))
         
         # Wick Analysis
-        if row['Upper_Wick'] > row['Body_Size'] * 2 and row['Close'] > row['Open']:
-            confluences['bearish'].append({
-                'indicator': 'Price Action - Wicks',
-                'condition': f"Long upper wick on bullish candle (Wick: {row['Upper_Wick']:.2f}%)",
-                'implication': "Rejection at highs despite bullish close. Potential resistance area.",
-                'strength': 'Medium',
-                'timeframe': 'Short-term'
-            })
-        
-        if row['Lower_Wick'] > row['Body_Size'] * 2 and row['Close'] < row['Open']:
-            confluences['bullish'].append({
-                'indicator': 'Price Action - Wicks',
-                'condition': f"Long lower wick on bearish candle (Wick: {row['Lower_Wick']:.2f}%)",
-                'implication': "Support found at lows despite bearish close. Potential support area.",
-                'strength': 'Medium',
-                'timeframe': 'Short-term'
-            })
+        if row['Upper_Wick'] > body * p['wick_ratio'] and bullish_close:
+            confluences['bearish'].append(Confluence('upper_wick', 'bearish', MEDIUM, row['Upper_Wick']))
+        
+        if row['Lower_Wick'] > body * p['wick_ratio'] and row['Close'] < row['Open']:
+            confluences['bullish'].append(Confluence('lower_wick', 'bullish', MEDIUM, row['Lower_Wick']))
         
         return confluences
     
     def generate_comprehensive_analysis(self, df):
-        """Generate comprehensive market analysis (unchanged from original)"""
-        latest_row = df.iloc[-1]
-        
-        # Gather all confluences
-        momentum_conf = self.analyze_momentum_confluence(latest_row)
-        trend_conf = self.analyze_trend_confluence(latest_row)
-        volatility_conf = self.analyze_volatility_confluence(latest_row)
-        volume_conf = self.analyze_volume_confluence(latest_row)
-        price_action_conf = self.analyze_price_action(latest_row)
-        
-        # Combine all confluences
-        all_confluences = {
-            'bullish': (momentum_conf['bullish'] + trend_conf['bullish'] + 
-                       volatility_conf['bullish'] + volume_conf['bullish'] + 
-                       price_action_conf['bullish']),
-            'bearish': (momentum_conf['bearish'] + trend_conf['bearish'] + 
-                       volatility_conf['bearish'] + volume_conf['bearish'] + 
-                       price_action_conf['bearish']),
-            'neutral': (momentum_conf['neutral'] + trend_conf['neutral'] + 
-                       volatility_conf['neutral'] + volume_conf['neutral'] + 
-                       price_action_conf['neutral'])
-        }
+        """Generate comprehensive market analysis: ({direction: [Confluence, ...]}, latest row)"""
+        latest_row = df.iloc[-1].copy()  # A view would keep the whole analysis frame alive
+        
+        # Gather all confluences: every step appends to the same lists, in step order
+        all_confluences = {'bullish': [], 'bearish': [], 'neutral': []}
+        for analyze in (self.analyze_momentum_confluence, self.analyze_trend_confluence,
+                        self.analyze_volatility_confluence, self.analyze_volume_confluence,
+                        self.analyze_price_action):
+            analyze(latest_row, all_confluences)
+        rules = self.custom_rules
+        if rules:
+            rules.apply(df, all_confluences)
         
         return all_confluences, latest_row
     
+    def evaluate_confluence_history(self, df, steps=None):
+        """Score every bar of ``df`` at once: ConfluenceHistory with per-rule signal matrices and scores
+        
+        The last bar matches generate_comprehensive_analysis + calculate_confluence_strength;
+        ``steps`` limits the rules to some ANALYSIS_COLUMNS steps (e.g. ('momentum', 'trend')).
+        Custom rules are included (as the last rule rows) when the analyzer has any.
+        """
+        return evaluate_confluences(df, self.confluence_threshold, steps, params=self.confluence_params,
+                                    strength_weights=self.strength_weights, rules=self.custom_rules)
+    
+    def backtest_confluence(self, df=None, symbol="BTCUSDT", interval="15m", start=None, end=None, **kwargs):
+        """Backtest the trading-plan rules on ``df``, or on the cached candles of symbol/interval (no network)
+        
+        Keyword arguments (fees, slippage, stop/target rules, SweepResult.best_config()...) go to
+        backtest_module.run_backtest.
+        Returns a BacktestResult (trades, equity curve, stats).
+        """
+        if df is None:
+            if self.candle_store is None:
+                raise ValueError("No candle cache to backtest from; pass a DataFrame or run backfill_ohlcv first")
+            df = self.candle_store.load(symbol, interval, start_time=to_ms(start), end_time=to_ms(end))
+            if df.empty:
+                raise ValueError(f"No cached {interval} candles for {symbol.upper()}; run backfill_ohlcv first")
+        kwargs.setdefault('threshold', self.confluence_threshold)
+        kwargs.setdefault('min_strength', self.min_strength)
+        kwargs.setdefault('params', self.confluence_params)
+        kwargs.setdefault('strength_weights', self.strength_weights)
+        kwargs.setdefault('rules', self.custom_rules)
+        return run_backtest(df, **kwargs)
+    
+    def sweep_confluence_parameters(self, symbols=("BTCUSDT",), intervals=("15m",), start=None, end=None, **kwargs):
+        """Tune the confluence threshold, strength weights and rule cutoffs on cached candles (no network)
+        
+        Keyword arguments (space, n_configs, oos_fraction, metric, workers...) go to sweep_module.run_sweep.
+        Returns a SweepResult; best_config() gives run_backtest arguments of the winner, which
+        apply_config installs for live analysis.
+        """
+        if self.candle_store is None:
+            raise ValueError("No candle cache to sweep over; run backfill_ohlcv first")
+        datasets = load_cached_datasets(symbols, intervals, start, end, store=self.candle_store)
+        if not datasets:
+            raise ValueError("No cached candles for the requested symbols/intervals; run backfill_ohlcv first")
+        return run_sweep(datasets, **kwargs)
+    
+    def apply_config(self, config):
+        """Score live analyses with a tuned configuration, e.g. SweepResult.best_config()
+        
+        ``config`` holds any of threshold, min_strength, params (RULE_PARAMS overrides) and
+        strength_weights, as run_backtest takes them.
+        """
+        unknown = set(config) - {'threshold', 'min_strength', 'params', 'strength_weights'}
+        if unknown:
+            raise ValueError(f"Unknown configuration keys: {', '.join(sorted(unknown))}")
+        if 'strength_weights' in config and set(config['strength_weights']) != set(STRENGTH_WEIGHTS):
+            raise ValueError(f"strength_weights needs exactly the keys {', '.join(STRENGTH_WEIGHTS)}")
+        if 'params' in config:
+            self.confluence_params = rule_params(config['params'])
+        if 'strength_weights' in config:
+            self.strength_weights = dict(config['strength_weights'])
+        self.confluence_threshold = config.get('threshold', self.confluence_threshold)
+        self.min_strength = config.get('min_strength', self.min_strength)
+    
+    def scoring_key(self):
+        """Hashable summary of the scoring configuration (None for the defaults)"""
+        key = (self.confluence_threshold, self.min_strength, tuple(sorted(self.confluence_params.items())),
+               tuple(sorted(self.strength_weights.items())))
+        return None if key == _DEFAULT_SCORING_KEY else key
+    
     def calculate_confluence_strength(self, confluences):
-        """Calculate overall confluence strength (unchanged from original)"""
-        strength_weights = {'Strong': 3, 'Medium': 2, 'Low': 1}
+        """Calculate overall confluence strength from the records' levels (weighted as in ConfluenceHistory)"""
+        weights = level_weights(self.strength_weights)
         
-        bullish_score = sum(strength_weights.get(conf['strength'], 1) for conf in confluences['bullish'])
-        bearish_score = sum(strength_weights.get(conf['strength'], 1) for conf in confluences['bearish'])
-        neutral_score = sum(strength_weights.get(conf['strength'], 1) for conf in confluences['neutral'])
+        bullish_score = sum(weights[conf.level] for conf in confluences['bullish'])
+        bearish_score = sum(weights[conf.level] for conf in confluences['bearish'])
+        neutral_score = sum(weights[conf.level] for conf in confluences['neutral'])
         
         total_score = bullish_score + bearish_score + neutral_score
         
@@ -880,6 +1150,71 @@ class TradingAnalyzer:
         print("⚡ Remember: This analysis is for educational purposes. Always use proper risk management!")
         print(f"{'='*80}")
 
+_analysis_flight = SingleFlight()
+
+# TradingAnalyzer.scoring_key of the default configuration
+_DEFAULT_SCORING_KEY = (3, 60, tuple(sorted(rule_params().items())), tuple(sorted(STRENGTH_WEIGHTS.items())))
+
+# Finished analyses, reused until the next candle of their interval closes
+_analysis_cache = LRUCache(maxsize=256)
+
+# Data sources whose analyses are cached: live or cached binance.com candles, never fallback data
+CACHEABLE_SOURCES = frozenset({'stream', 'candle cache', 'binance'})
+
+# Latest-row values generate_trading_plan, display_analysis, the market insights and the app read
+KEY_LEVEL_COLUMNS = ['Open', 'High', 'Low', 'Close', 'RSI_14', 'EMA_9', 'EMA_21', 'EMA_50', 'ATR', 'ATR_Percent',
+                     'BB_Upper', 'BB_Lower', 'BB_Width', 'Pivot', 'R1', 'S1', 'Volume_SMA', 'Volume_Ratio']
+
+def _last_closed_open_time(df, interval):
+    """Open time (ms) of the newest candle in ``df`` that has closed, or None"""
+    open_times = df.index.values.astype("datetime64[ms]").astype(np.int64)
+    closed = open_times[open_times + interval_to_ms(interval) <= int(time.time() * 1000)]
+    return int(closed[-1]) if len(closed) else None
+
+def _run_analysis(analyzer, symbol, interval, limit):
+    df = analyzer.fetch_binance_ohlcv(symbol=symbol, interval=interval, limit=limit)
+    source, last_closed = df.attrs.get('source'), _last_closed_open_time(df, interval)
+    df = analyzer.add_comprehensive_indicators(df)
+    confluences, latest_row = analyzer.generate_comprehensive_analysis(df)
+    bias, strength = analyzer.calculate_confluence_strength(confluences)
+    return confluences, latest_row, bias, strength, source, last_closed
+
+def analyze_symbol(symbol="BTCUSDT", interval="15m", limit=1000, analyzer=None, compact=False, use_cache=True):
+    """Fetch, add indicators and score confluences, sharing one computation between concurrent callers.
+    
+    Callers asking for the same symbol/interval while the same candle is open wait for the
+    in-flight run instead of repeating it, and later callers get the cached result until the next
+    candle boundary. Only analyses of live or cached Binance candles that include the last closed
+    candle are cached. ``compact`` (for a new analyzer) uses compact frames.
+    Returns (confluences, key levels of the latest row, bias, strength); treat them as read-only.
+    """
+    interval_ms = interval_to_ms(interval)
+    candle_open = int(bucket_open_times(int(time.time() * 1000), interval))
+    compact = analyzer.compact_frames if analyzer is not None else compact
+    rules = analyzer.custom_rules if analyzer is not None else get_custom_rules()
+    scoring = analyzer.scoring_key() if analyzer is not None else None
+    # Keyed by the last closed candle: nothing the analysis scores can change before the next close
+    key = (symbol.upper(), interval, limit, candle_open - interval_ms, compact, rules.fingerprint if rules else None,
+           scoring)
+    if use_cache:
+        cached = _analysis_cache.get(key)
+        if cached is not None:
+            return cached
+    
+    analyzer = analyzer or TradingAnalyzer(compact_frames=compact)
+    confluences, latest_row, bias, strength, source, last_closed = _analysis_flight.do(
+        key, _run_analysis, analyzer, symbol, interval, limit)
+    result = (confluences, latest_row.reindex(KEY_LEVEL_COLUMNS), bias, strength)
+    # Keyed by the candles actually analysed: stale windows and fallback data are never reused
+    data_key = key[:3] + (last_closed,) + key[4:]
+    if use_cache and source in CACHEABLE_SOURCES and data_key == key:
+        _analysis_cache.put(data_key, result, expires_at=(last_closed + 2 * interval_ms) / 1000)
+    return result
+
+def analysis_cache_stats():
+    """Hit/miss/eviction counters of the analysis result cache"""
+    return _analysis_cache.stats()
+
 def user_input_token():
     """Enhanced token selection with more options (unchanged from original)"""
     options = [
@@ -908,10 +1243,12 @@ def user_input_token():
                 return options[int(sub_choice)-1]
         elif choice_num == 12:
             custom = input("Enter custom token symbol (e.g., ATOMUSDT): ").upper().strip()
-            if custom.endswith('USDT'):
-                return custom
-            else:
-                return custom + 'USDT'
+            if not custom.endswith('USDT'):
+                custom = custom + 'USDT'
+            try:
+                return get_symbol_table().resolve(custom)
+            except UnknownSymbolError as e:
+                print(f"❌ {e}")
     
     print("Invalid choice. Defaulting to BTCUSDT.")
     return "BTCUSDT"
@@ -940,7 +1277,7 @@ def user_input_timeframe():
     selected = tf_options.get(choice, ("15m", "15 Minute - Short Term"))
     return selected[0]
 
-def generate_trading_plan(confluences, latest_row, bias, strength):
+def generate_trading_plan(confluences, latest_row, bias, strength, min_strength=60):
     """Generate a structured trading plan based on confluences (unchanged from original)"""
     print(f"\n📋 TRADING PLAN SUGGESTIONS:")
     print("=" * 50)
@@ -948,7 +1285,7 @@ def generate_trading_plan(confluences, latest_row, bias, strength):
     atr = latest_row['ATR']
     current_price = latest_row['Close']
     
-    if bias == "Bullish Bias" and strength > 60:
+    if bias == "Bullish Bias" and strength > min_strength:
         print("🎯 BULLISH SETUP IDENTIFIED")
         print(f"   Entry Strategy: Look for pullbacks to EMA 21 (${latest_row['EMA_21']:.4f}) or BB Middle")
         print(f"   Stop Loss: Below EMA 50 (${latest_row['EMA_50']:.4f}) or {atr*1.5:.4f} below entry")
@@ -956,7 +1293,7 @@ def generate_trading_plan(confluences, latest_row, bias, strength):
         print(f"   Target 2: BB Upper Band (${latest_row['BB_Upper']:.4f})")
         print(f"   Risk/Reward: Aim for 1:2 minimum ratio")
         
-    elif bias == "Bearish Bias" and strength > 60:
+    elif bias == "Bearish Bias" and strength > min_strength:
         print("🎯 BEARISH SETUP IDENTIFIED")
         print(f"   Entry Strategy: Look for rallies to EMA 21 (${latest_row['EMA_21']:.4f}) or BB Middle")
         print(f"   Stop Loss: Above EMA 50 (${latest_row['EMA_50']:.4f}) or {atr*1.5:.4f} above entry")
@@ -1010,7 +1347,7 @@ def main():
         bias, strength = analyzer.calculate_confluence_strength(confluences)
         
         # Generate trading plan
-        generate_trading_plan(confluences, latest_row, bias, strength)
+        generate_trading_plan(confluences, latest_row, bias, strength, analyzer.min_strength)
         
         # Additional insights
         print(f"\n🔮 MARKET INSIGHTS:")
@@ -0,0 +1,180 @@
+import os
+import re
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Binance kline intervals in milliseconds
+INTERVAL_MS = {
+    "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "6h": 21_600_000,
+    "8h": 28_800_000, "12h": 43_200_000, "1d": 86_400_000, "3d": 259_200_000,
+    "1w": 604_800_000,
+}
+
+_UNIT_MS = {"m": 60_000, "h": 3_600_000, "d": 86_400_000, "w": 604_800_000}
+
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+DEFAULT_CANDLE_DB = os.environ.get("NUNNO_CANDLE_DB", "candle_cache.sqlite3")
+
+
+def interval_to_ms(interval):
+    """Convert an interval such as '15m', '4h' or a custom '10m' into milliseconds"""
+    if interval in INTERVAL_MS:
+        return INTERVAL_MS[interval]
+    match = re.fullmatch(r"(\d+)([mhdw])", interval.strip())
+    if not match:
+        raise ValueError(f"Unsupported interval: {interval}")
+    return int(match.group(1)) * _UNIT_MS[match.group(2)]
+
+
+def to_ms(value):
+    """Convert epoch milliseconds, a datetime or a date string (UTC) into epoch milliseconds"""
+    if value is None:
+        return None
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert("UTC").tz_localize(None)
+    return int(timestamp.value // 1_000_000)
+
+
+def find_gaps(df, interval):
+    """Return (last_open_before_gap, first_open_after_gap) pairs where candles are missing"""
+    if len(df) < 2:
+        return []
+    open_times = df.index.values.astype("datetime64[ms]").astype(np.int64)
+    steps = np.diff(open_times)
+    holes = np.flatnonzero(steps > interval_to_ms(interval))
+    return [(df.index[i], df.index[i + 1]) for i in holes]
+
+
+def frame_to_arrays(df):
+    """Split an OHLCV frame indexed by 'Open Time' into ms timestamps and float columns"""
+    open_times = df.index.values.astype("datetime64[ms]").astype(np.int64)
+    values = df[OHLCV_COLUMNS].to_numpy(dtype=np.float64)
+    return open_times, values
+
+
+def arrays_to_frame(open_times, values):
+    """Build the standard OHLCV frame (same shape as _parse_binance_response output)"""
+    index = pd.DatetimeIndex(pd.to_datetime(open_times, unit="ms"), name="Open Time")
+    return pd.DataFrame(values, index=index, columns=OHLCV_COLUMNS)
+
+
+class CandleStore:
+    """On-disk OHLCV store keyed by (symbol, interval, open time), safe to share between threads"""
+
+    def __init__(self, path=DEFAULT_CANDLE_DB):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS candles (
+                    symbol TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    open_time INTEGER NOT NULL,
+                    open REAL, high REAL, low REAL, close REAL, volume REAL,
+                    PRIMARY KEY (symbol, interval, open_time)
+                ) WITHOUT ROWID
+            """)
+            self._conn.commit()
+
+    def last_open_time(self, symbol, interval):
+        """Open time (ms) of the newest stored candle, or None when nothing is stored"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(open_time) FROM candles WHERE symbol = ? AND interval = ?",
+                (symbol.upper(), interval)
+            ).fetchone()
+        return row[0] if row else None
+
+    def intervals(self, symbol):
+        """Intervals that have at least one stored candle for ``symbol``"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT interval FROM candles WHERE symbol = ?", (symbol.upper(),)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def count(self, symbol, interval):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM candles WHERE symbol = ? AND interval = ?",
+                (symbol.upper(), interval)
+            ).fetchone()
+        return row[0]
+
+    def upsert(self, symbol, interval, df):
+        """Insert or replace candles; a re-fetched (previously forming) candle overwrites the old row"""
+        if df is None or len(df) == 0:
+            return 0
+        open_times, values = frame_to_arrays(df)
+        key = symbol.upper()
+        rows = [(key, interval, int(t), *map(float, v)) for t, v in zip(open_times, values)]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+        return len(rows)
+
+    def load(self, symbol, interval, limit=None, start_time=None, end_time=None):
+        """Load stored candles in ascending order, optionally only the newest ``limit`` rows"""
+        query = "SELECT open_time, open, high, low, close, volume FROM candles WHERE symbol = ? AND interval = ?"
+        params = [symbol.upper(), interval]
+        if start_time is not None:
+            query += " AND open_time >= ?"
+            params.append(int(start_time))
+        if end_time is not None:
+            query += " AND open_time <= ?"
+            params.append(int(end_time))
+        query += " ORDER BY open_time DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(int(limit))
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+
+        if not rows:
+            return arrays_to_frame(np.empty(0, dtype=np.int64), np.empty((0, 5)))
+        data = np.array(rows[::-1], dtype=np.float64)
+        return arrays_to_frame(data[:, 0].astype(np.int64), data[:, 1:])
+
+    def delete(self, symbol, interval=None):
+        with self._lock:
+            if interval is None:
+                self._conn.execute("DELETE FROM candles WHERE symbol = ?", (symbol.upper(),))
+            else:
+                self._conn.execute("DELETE FROM candles WHERE symbol = ? AND interval = ?",
+                                   (symbol.upper(), interval))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_candle_store(path=None):
+    """Return the process-wide candle store (opened lazily on first use)"""
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                _default_store = CandleStore(path or DEFAULT_CANDLE_DB)
+    return _default_store
@@ -0,0 +1,241 @@
+import json
+import os
+import threading
+import time
+from difflib import SequenceMatcher
+
+import numpy as np
+
+from network_module import get_session_pool
+
+try:
+    from fuzzywuzzy import fuzz
+    _fuzzy_score = fuzz.WRatio
+except ImportError:  # Fall back to difflib when fuzzywuzzy is not installed
+    def _fuzzy_score(a, b):
+        return int(round(SequenceMatcher(None, a, b).ratio() * 100))
+
+COINGECKO_COINS_LIST_URL = "https://api.coingecko.com/api/v3/coins/list"
+
+DEFAULT_COIN_INDEX = os.environ.get("NUNNO_COIN_INDEX", "coin_universe.json")
+
+# Many CoinGecko coins share a ticker; these win exact symbol lookups
+PREFERRED_COIN_IDS = {
+    "btc": "bitcoin", "eth": "ethereum", "bnb": "binancecoin", "ada": "cardano",
+    "sol": "solana", "xrp": "ripple", "doge": "dogecoin", "avax": "avalanche-2",
+    "matic": "matic-network", "dot": "polkadot", "link": "chainlink", "uni": "uniswap",
+    "ltc": "litecoin", "bch": "bitcoin-cash", "fil": "filecoin", "shib": "shiba-inu",
+    "usdt": "tether", "usdc": "usd-coin", "steth": "staked-ether", "ton": "the-open-network",
+    "trx": "tron", "wbtc": "wrapped-bitcoin", "leo": "leo-token", "pepe": "pepe",
+    "near": "near", "dai": "dai", "kas": "kaspa", "icp": "internet-computer", "apt": "aptos",
+    "arb": "arbitrum", "vet": "vechain", "algo": "algorand", "imx": "immutable-x",
+    "op": "optimism", "inj": "injective-protocol", "hbar": "hedera-hashgraph", "sui": "sui",
+    "atom": "cosmos", "grt": "the-graph", "rune": "thorchain", "sei": "sei-network",
+    "tia": "celestia", "render": "render-token",
+}
+
+# Quote assets stripped from exchange pairs (longest first so BTCUSDT -> BTC, not BTCUSD -> ...)
+QUOTE_ASSETS = ("FDUSD", "USDT", "BUSD", "USDC", "TUSD", "USD", "EUR", "TRY", "BTC", "ETH", "BNB")
+
+
+def _ngrams(text, n=3):
+    padded = f"  {text} "
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+class _CoinIndex:
+    """Immutable lookup tables for one snapshot of the coin list (swapped whole on refresh)"""
+
+    def __init__(self, coins):
+        self.coins = coins
+        self.by_id = {}
+        self.by_symbol = {}
+        self.by_name = {}
+        for coin_id, symbol, name in coins:
+            self.by_id[coin_id] = (coin_id, symbol, name)
+            self.by_symbol.setdefault(symbol.lower(), []).append(coin_id)
+            self.by_name.setdefault(name.lower(), coin_id)
+        for symbol, coin_id in PREFERRED_COIN_IDS.items():
+            ids = self.by_symbol.setdefault(symbol, [])
+            if coin_id in ids:
+                ids.remove(coin_id)
+            ids.insert(0, coin_id)
+
+        # Trigram inverted index over ids, symbols and names for fuzzy lookup
+        self.terms = []
+        self.term_coin = []
+        for coin_id, symbol, name in coins:
+            for term in {coin_id, symbol.lower(), name.lower()}:
+                self.terms.append(term)
+                self.term_coin.append(coin_id)
+        postings = {}
+        for position, term in enumerate(self.terms):
+            for gram in _ngrams(term):
+                postings.setdefault(gram, []).append(position)
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self.term_grams = np.array([len(_ngrams(term)) for term in self.terms], dtype=np.int32)
+
+    def candidates(self, query, limit):
+        """Term positions sharing the most trigrams with ``query`` (Dice coefficient)"""
+        grams = [self.postings[g] for g in _ngrams(query) if g in self.postings]
+        if not grams:
+            return np.empty(0, dtype=np.int64)
+        shared = np.bincount(np.concatenate(grams), minlength=len(self.terms))
+        hits = np.flatnonzero(shared)
+        dice = 2.0 * shared[hits] / (len(_ngrams(query)) + self.term_grams[hits])
+        if len(hits) > limit:
+            top = np.argpartition(-dice, limit)[:limit]
+            hits, dice = hits[top], dice[top]
+        return hits[np.argsort(-dice, kind="stable")]
+
+
+class CoinUniverseIndex:
+    """CoinGecko coin list (id, symbol, name) cached on disk and refreshed in the background.
+
+    Exact id/symbol/name lookups are dict hits; fuzzy suggestions rank trigram candidates and
+    rescore only those. The first use loads the on-disk copy (or downloads the list once);
+    after ``ttl`` seconds lookups keep serving the old copy while a refresh runs.
+    """
+
+    def __init__(self, path=DEFAULT_COIN_INDEX, ttl=24 * 3600, session_pool=None,
+                 url=COINGECKO_COINS_LIST_URL, retry_interval=300):
+        self.path = path
+        self.ttl = ttl
+        self.url = url
+        self.retry_interval = retry_interval
+        self._session_pool = session_pool
+        self._index = None
+        self.fetched_at = 0
+        self._last_attempt = 0
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+
+    @property
+    def session_pool(self):
+        return self._session_pool or get_session_pool()
+
+    def _load_from_disk(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            self._index = _CoinIndex([tuple(coin) for coin in payload["coins"]])
+            self.fetched_at = payload.get("fetched_at", 0)
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def _save_to_disk(self, coins):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"fetched_at": self.fetched_at, "coins": coins}, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    def refresh(self):
+        """Download the coin list now; keeps the previous index if the download fails"""
+        self._last_attempt = time.time()
+        try:
+            response = self.session_pool.get(self.url, timeout=15)
+            response.raise_for_status()
+            coins = [(c["id"], c.get("symbol") or "", c.get("name") or "") for c in response.json() if c.get("id")]
+            if not coins:
+                raise ValueError("empty coin list")
+        except Exception as e:
+            print(f"⚠️ Coin list refresh failed: {str(e)}")
+            return False
+
+        index = _CoinIndex(coins)
+        self._index = index
+        self.fetched_at = time.time()
+        try:
+            self._save_to_disk(coins)
+        except OSError as e:
+            print(f"⚠️ Could not save coin list: {str(e)}")
+        return True
+
+    def refresh_async(self):
+        """Start a background refresh unless one is already running"""
+        with self._lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return self._refresh_thread
+            self._refresh_thread = threading.Thread(target=self.refresh, name="coin-index-refresh", daemon=True)
+            self._refresh_thread.start()
+            return self._refresh_thread
+
+    def is_stale(self):
+        return time.time() - self.fetched_at >= self.ttl
+
+    def _get_index(self):
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._load_from_disk()
+            if self._index is None and time.time() - self._last_attempt >= self.retry_interval:
+                self.refresh()
+            if self._index is None:
+                return _EMPTY_INDEX
+        if self.is_stale() and time.time() - self._last_attempt >= self.retry_interval:
+            self.refresh_async()
+        return self._index
+
+    def __len__(self):
+        return len(self._get_index().coins)
+
+    def get(self, coin_id):
+        """(id, symbol, name) for a CoinGecko id, or None"""
+        return self._get_index().by_id.get(coin_id.lower().strip())
+
+    def lookup(self, query, fields=("id", "name", "symbol")):
+        """Exact match of ``query`` against ids, names and symbols (in that order); returns an id or None"""
+        key = query.lower().strip()
+        index = self._get_index()
+        for field in fields:
+            if field == "id" and key in index.by_id:
+                return key
+            if field == "name" and key in index.by_name:
+                return index.by_name[key]
+            if field == "symbol" and index.by_symbol.get(key):
+                return index.by_symbol[key][0]
+        return None
+
+    def resolve_trading_symbol(self, symbol):
+        """Map an exchange pair such as 'BTCUSDT' (or a bare ticker) to a CoinGecko id"""
+        pair = symbol.upper().strip()
+        base = pair
+        for quote in QUOTE_ASSETS:
+            if pair.endswith(quote) and len(pair) > len(quote):
+                base = pair[:-len(quote)]
+                break
+        return self.lookup(base, fields=("symbol",)) or self.lookup(pair, fields=("symbol",))
+
+    def suggest(self, query, limit=5, min_score=60, candidates=64):
+        """Coin ids fuzzily matching ``query``, best first"""
+        key = query.lower().strip()
+        if not key:
+            return []
+        index = self._get_index()
+        scores = {}
+        for position in index.candidates(key, candidates):
+            coin_id = index.term_coin[position]
+            score = _fuzzy_score(key, index.terms[position])
+            if score > scores.get(coin_id, -1):
+                scores[coin_id] = score
+        ranked = sorted(scores.items(), key=lambda item: -item[1])
+        return [coin_id for coin_id, score in ranked if score > min_score][:limit]
+
+
+# Until the coin list is available, exact symbol lookups still resolve the preferred tickers
+_EMPTY_INDEX = _CoinIndex([])
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+
+def get_coin_index():
+    """Return the process-wide coin universe index (loaded lazily on first lookup)"""
+    global _default_index
+    if _default_index is None:
+        with _default_index_lock:
+            if _default_index is None:
+                _default_index = CoinUniverseIndex()
+    return _default_index
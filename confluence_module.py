@@ -0,0 +1,396 @@
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+DIRECTIONS = ("bullish", "bearish", "neutral")
+
+# Strength level a rule reports -> label, and the score weight of each label
+STRONG, MEDIUM, LOW = 3, 2, 1
+STRENGTH_LABELS = {STRONG: "Strong", MEDIUM: "Medium", LOW: "Low"}
+STRENGTH_WEIGHTS = {"Strong": 3, "Medium": 2, "Low": 1}
+
+BIAS_LABELS = ("No Clear Signal", "Bullish Bias", "Bearish Bias", "Mixed/Neutral")
+
+
+def level_weights(strength_weights=None):
+    """Score weight of each strength level, indexed by level (0 = rule silent)"""
+    weights = strength_weights or STRENGTH_WEIGHTS
+    return [0] + [weights[STRENGTH_LABELS[level]] for level in sorted(STRENGTH_LABELS)]
+
+
+# Default cutoffs of the confluence rules, read by evaluate_confluences and the
+# TradingAnalyzer.analyze_*_confluence methods; both accept overrides (see sweep_module)
+RULE_PARAMS = {
+    "rsi_oversold": 30, "rsi_overbought": 70, "rsi_neutral_low": 45, "rsi_neutral_high": 55,
+    "stoch_oversold": 20, "stoch_overbought": 80,
+    "williams_oversold": -80, "williams_overbought": -20,
+    "adx_ranging": 20, "adx_trending": 25, "adx_strong": 40,
+    "bb_lower": 0.1, "bb_upper": 0.9, "bb_squeeze": 2, "bb_expansion": 8,
+    "atr_high": 3,
+    "volume_low": 0.7, "volume_high": 1.5, "volume_very_high": 2,
+    "cmf_pressure": 0.2, "cmf_strong": 0.3,
+    "body_large": 2, "body_strong": 3, "wick_ratio": 2,
+}
+
+
+# Text of each confluence the TradingAnalyzer rules can report: key -> (indicator, condition,
+# implication, timeframe). Condition/implication are str.format templates over the record's
+# value(s) ({0}, {1}) and {direction}.
+CONFLUENCE_TEXT = {
+    "rsi_oversold": ("RSI (14)", "Oversold at {0:.1f}",
+                     "Potential bounce or reversal setup. Watch for bullish divergence or break above 30.",
+                     "Short-term"),
+    "rsi_overbought": ("RSI (14)", "Overbought at {0:.1f}",
+                       "Potential pullback or distribution. Watch for bearish divergence or break below 70.",
+                       "Short-term"),
+    "rsi_neutral": ("RSI (14)", "Neutral at {0:.1f}",
+                    "Balanced momentum. Look for directional break above 55 or below 45.", "Short-term"),
+    "stoch_oversold": ("Stochastic", "Both %K ({0:.1f}) and %D ({1:.1f}) oversold",
+                       "Strong oversold condition. Potential reversal when %K crosses above %D.", "Short-term"),
+    "stoch_overbought": ("Stochastic", "Both %K ({0:.1f}) and %D ({1:.1f}) overbought",
+                         "Strong overbought condition. Potential reversal when %K crosses below %D.", "Short-term"),
+    "williams_oversold": ("Williams %R", "Oversold at {0:.1f}",
+                          "Potential buying opportunity. Watch for move above -80 for confirmation.", "Short-term"),
+    "williams_overbought": ("Williams %R", "Overbought at {0:.1f}",
+                            "Potential selling pressure. Watch for move below -20 for confirmation.", "Short-term"),
+    "ema_bullish": ("EMA Alignment", "EMA 9 > EMA 21 > EMA 50",
+                    "Strong bullish trend structure. Expect continuation with pullbacks to EMAs as support.",
+                    "Medium-term"),
+    "ema_bearish": ("EMA Alignment", "EMA 9 < EMA 21 < EMA 50",
+                    "Strong bearish trend structure. Expect continuation with rallies to EMAs as resistance.",
+                    "Medium-term"),
+    "price_above_ema21": ("Price vs EMA 21", "Price {0:+.2f}% above EMA 21",
+                          "Bullish bias maintained. EMA 21 likely to act as dynamic support.", "Short to Medium-term"),
+    "price_below_ema21": ("Price vs EMA 21", "Price {0:+.2f}% below EMA 21",
+                          "Bearish bias maintained. EMA 21 likely to act as dynamic resistance.",
+                          "Short to Medium-term"),
+    "macd_bullish": ("MACD", "MACD above signal line with positive histogram",
+                     "Bullish momentum building. Watch for histogram expansion for stronger moves.", "Medium-term"),
+    "macd_bearish": ("MACD", "MACD below signal line with negative histogram",
+                     "Bearish momentum building. Watch for histogram expansion for stronger moves.", "Medium-term"),
+    "adx_trending": ("ADX Trend Strength", "Strong trending market (ADX: {0:.1f})",
+                     "Strong {direction} trend in place. Expect trend continuation with minor pullbacks.",
+                     "Medium to Long-term"),
+    "adx_ranging": ("ADX Trend Strength", "Weak trending market (ADX: {0:.1f})",
+                    "Market in consolidation/ranging phase. Look for breakout setups.", "All timeframes"),
+    "bb_lower": ("Bollinger Bands", "Price near lower band (Position: {0:.2f})",
+                 "Potential mean reversion setup. Watch for bounce off lower band or breakdown.", "Short-term"),
+    "bb_upper": ("Bollinger Bands", "Price near upper band (Position: {0:.2f})",
+                 "Potential mean reversion setup. Watch for rejection at upper band or breakout.", "Short-term"),
+    "bb_squeeze": ("Bollinger Band Width", "Low volatility environment (Width: {0:.2f}%)",
+                   "Squeeze condition. Expect volatility expansion and potential breakout soon.",
+                   "Short to Medium-term"),
+    "bb_expansion": ("Bollinger Band Width", "High volatility environment (Width: {0:.2f}%)",
+                     "Volatility expansion phase. Expect potential reversion to mean.", "Short-term"),
+    "atr_high": ("Average True Range", "High volatility (ATR: {0:.2f}%)",
+                 "Elevated volatility. Use wider stops and smaller position sizes.", "All timeframes"),
+    "volume_high": ("Volume", "Above average volume ({0:.1f}x normal)",
+                    "Strong participation. Moves likely to be more sustainable.", "Short-term"),
+    "volume_low": ("Volume", "Below average volume ({0:.1f}x normal)",
+                   "Low participation. Moves may lack conviction and sustainability.", "Short-term"),
+    "cmf_buying": ("Chaikin Money Flow", "Strong buying pressure (CMF: {0:.2f})",
+                   "Money flowing into the asset. Supports bullish bias.", "Medium-term"),
+    "cmf_selling": ("Chaikin Money Flow", "Strong selling pressure (CMF: {0:.2f})",
+                    "Money flowing out of the asset. Supports bearish bias.", "Medium-term"),
+    "large_candle": ("Price Action", "Large {direction} candle (Body: {0:.2f}%)",
+                     "Strong {direction} conviction. Expect follow-through in next few candles.", "Short-term"),
+    "upper_wick": ("Price Action - Wicks", "Long upper wick on bullish candle (Wick: {0:.2f}%)",
+                   "Rejection at highs despite bullish close. Potential resistance area.", "Short-term"),
+    "lower_wick": ("Price Action - Wicks", "Long lower wick on bearish candle (Wick: {0:.2f}%)",
+                   "Support found at lows despite bearish close. Potential support area.", "Short-term"),
+}
+
+
+class Confluence(Mapping):
+    """One fired confluence: CONFLUENCE_TEXT key, direction, strength level and the value(s) quoted.
+
+    Only the numbers are stored; the text fields are rendered when read. It still reads like the
+    dict the analyzers used to build: conf['condition'], conf.get('timeframe'), dict(conf).
+    ``text`` gives the (indicator, condition, implication, timeframe) templates of a record whose
+    key is not in CONFLUENCE_TEXT (custom rules share their rule's tuple).
+    """
+    __slots__ = ("key", "direction", "level", "value", "text")
+
+    FIELDS = ("indicator", "condition", "implication", "strength", "timeframe")
+
+    def __init__(self, key, direction, level, value=None, text=None):
+        self.key = key
+        self.direction = direction
+        self.level = level
+        self.value = value
+        self.text = text
+
+    @property
+    def templates(self):
+        return self.text or CONFLUENCE_TEXT[self.key]
+
+    @property
+    def indicator(self):
+        return self.templates[0]
+
+    @property
+    def condition(self):
+        return self._render(1)
+
+    @property
+    def implication(self):
+        return self._render(2)
+
+    @property
+    def strength(self):
+        return STRENGTH_LABELS[self.level]
+
+    @property
+    def timeframe(self):
+        return self.templates[3]
+
+    def _render(self, field):
+        values = self.value if isinstance(self.value, tuple) else (self.value,)
+        return self.templates[field].format(*values, direction=self.direction)
+
+    def __getitem__(self, field):
+        if field not in self.FIELDS:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def __repr__(self):
+        return f"Confluence({self.key!r}, {self.direction!r}, {self.strength!r}, {self.value!r})"
+
+
+def _level(mask, level):
+    return np.where(mask, level, 0).astype(np.int8)
+
+
+# Each rule mirrors one block of the TradingAnalyzer.analyze_*_confluence methods and returns
+# (bullish, bearish, neutral) strength levels per bar: 3 Strong, 2 Medium, 1 Low, 0 silent.
+
+def _rsi_rule(x, p):
+    rsi = x["RSI_14"]
+    return (_level(rsi < p["rsi_oversold"], 2), _level(rsi > p["rsi_overbought"], 2),
+            _level((rsi >= p["rsi_neutral_low"]) & (rsi <= p["rsi_neutral_high"]), 1))
+
+
+def _stochastic_rule(x, p):
+    k, d = x["Stoch_K"], x["Stoch_D"]
+    oversold = (k < p["stoch_oversold"]) & (d < p["stoch_oversold"])
+    overbought = ~oversold & (k > p["stoch_overbought"]) & (d > p["stoch_overbought"])
+    zero = np.zeros(len(k), dtype=np.int8)
+    return _level(oversold, np.where(k > d, 3, 2)), _level(overbought, np.where(k < d, 3, 2)), zero
+
+
+def _williams_rule(x, p):
+    williams = x["Williams_R"]
+    return (_level(williams < p["williams_oversold"], 2), _level(williams > p["williams_overbought"], 2),
+            np.zeros(len(williams), dtype=np.int8))
+
+
+def _ema_alignment_rule(x, p):
+    ema_9, ema_21, ema_50 = x["EMA_9"], x["EMA_21"], x["EMA_50"]
+    up = (ema_9 > ema_21) & (ema_21 > ema_50)
+    down = ~up & (ema_9 < ema_21) & (ema_21 < ema_50)
+    return _level(up, 3), _level(down, 3), np.zeros(len(up), dtype=np.int8)
+
+
+def _price_vs_ema_rule(x, p):
+    above = x["Close"] > x["EMA_21"]
+    return _level(above, 2), _level(~above, 2), np.zeros(len(above), dtype=np.int8)
+
+
+def _macd_rule(x, p):
+    macd, signal, histogram = x["MACD"], x["MACD_Signal"], x["MACD_Histogram"]
+    bullish = (macd > signal) & (histogram > 0)
+    bearish = ~bullish & (macd < signal) & (histogram < 0)
+    return _level(bullish, 3), _level(bearish, 3), np.zeros(len(macd), dtype=np.int8)
+
+
+def _adx_rule(x, p):
+    adx = x["ADX"]
+    trending = adx > p["adx_trending"]
+    rising = x["DI_Plus"] > x["DI_Minus"]
+    level = np.where(adx > p["adx_strong"], 3, 2)
+    return (_level(trending & rising, level), _level(trending & ~rising, level),
+            _level(~trending & (adx < p["adx_ranging"]), 2))
+
+
+def _bollinger_rule(x, p):
+    position = x["BB_Position"]
+    return (_level(position < p["bb_lower"], 2), _level(position > p["bb_upper"], 2),
+            np.zeros(len(position), dtype=np.int8))
+
+
+def _band_width_rule(x, p):
+    width = x["BB_Width"]
+    zero = np.zeros(len(width), dtype=np.int8)
+    return zero, zero, np.where(width < p["bb_squeeze"], 3, np.where(width > p["bb_expansion"], 2, 0)).astype(np.int8)
+
+
+def _atr_rule(x, p):
+    zero = np.zeros(len(x["ATR_Percent"]), dtype=np.int8)
+    return zero, zero, _level(x["ATR_Percent"] > p["atr_high"], 2)
+
+
+def _volume_rule(x, p):
+    ratio = x["Volume_Ratio"]
+    zero = np.zeros(len(ratio), dtype=np.int8)
+    return zero, zero, np.where(ratio > p["volume_high"], np.where(ratio > p["volume_very_high"], 3, 2),
+                                np.where(ratio < p["volume_low"], 2, 0)).astype(np.int8)
+
+
+def _cmf_rule(x, p):
+    cmf, pressure, strong = x["CMF"], p["cmf_pressure"], p["cmf_strong"]
+    return (_level(cmf > pressure, np.where(cmf > strong, 3, 2)),
+            _level(cmf < -pressure, np.where(cmf < -strong, 3, 2)), np.zeros(len(cmf), dtype=np.int8))
+
+
+def _candle_rule(x, p):
+    body = x["Body_Size"]
+    large = body > p["body_large"]
+    bullish = x["Close"] > x["Open"]
+    level = np.where(body > p["body_strong"], 3, 2)
+    return _level(large & bullish, level), _level(large & ~bullish, level), np.zeros(len(body), dtype=np.int8)
+
+
+def _upper_wick_rule(x, p):
+    rejected = (x["Upper_Wick"] > x["Body_Size"] * p["wick_ratio"]) & (x["Close"] > x["Open"])
+    zero = np.zeros(len(rejected), dtype=np.int8)
+    return zero, _level(rejected, 2), zero
+
+
+def _lower_wick_rule(x, p):
+    supported = (x["Lower_Wick"] > x["Body_Size"] * p["wick_ratio"]) & (x["Close"] < x["Open"])
+    zero = np.zeros(len(supported), dtype=np.int8)
+    return _level(supported, 2), zero, zero
+
+
+# (rule id, indicator label used in the confluence dicts, analysis step, rule function, columns read)
+CONFLUENCE_RULES = [
+    ("rsi", "RSI (14)", "momentum", _rsi_rule, ("RSI_14",)),
+    ("stochastic", "Stochastic", "momentum", _stochastic_rule, ("Stoch_K", "Stoch_D")),
+    ("williams_r", "Williams %R", "momentum", _williams_rule, ("Williams_R",)),
+    ("ema_alignment", "EMA Alignment", "trend", _ema_alignment_rule, ("EMA_9", "EMA_21", "EMA_50")),
+    ("price_vs_ema21", "Price vs EMA 21", "trend", _price_vs_ema_rule, ("Close", "EMA_21")),
+    ("macd", "MACD", "trend", _macd_rule, ("MACD", "MACD_Signal", "MACD_Histogram")),
+    ("adx", "ADX Trend Strength", "trend", _adx_rule, ("ADX", "DI_Plus", "DI_Minus")),
+    ("bollinger", "Bollinger Bands", "volatility", _bollinger_rule, ("BB_Position",)),
+    ("band_width", "Bollinger Band Width", "volatility", _band_width_rule, ("BB_Width",)),
+    ("atr", "Average True Range", "volatility", _atr_rule, ("ATR_Percent",)),
+    ("volume", "Volume", "volume", _volume_rule, ("Volume_Ratio",)),
+    ("cmf", "Chaikin Money Flow", "volume", _cmf_rule, ("CMF",)),
+    ("candle", "Price Action", "price_action", _candle_rule, ("Body_Size", "Close", "Open")),
+    ("upper_wick", "Price Action - Wicks", "price_action", _upper_wick_rule, ("Upper_Wick", "Body_Size", "Close", "Open")),
+    ("lower_wick", "Price Action - Wicks", "price_action", _lower_wick_rule, ("Lower_Wick", "Body_Size", "Close", "Open")),
+]
+
+
+class ConfluenceHistory:
+    """Every confluence rule evaluated on every bar of an indicator frame.
+
+    ``levels`` is an int8 (direction, rule, bar) matrix of strength levels (STRENGTH_LABELS,
+    0 = rule silent), with directions in DIRECTIONS order and rules in ``rules`` order
+    (``labels`` holds their indicator names); ``scores`` sums their ``strength_weights`` per
+    direction. ``bias_codes``/``strength`` follow calculate_confluence_strength bar by bar.
+    """
+
+    def __init__(self, index, rules, levels, threshold, strength_weights=None, labels=None):
+        self.index = index
+        self.rules = rules
+        if labels is None:
+            builtin = {rule_id: label for rule_id, label, *_ in CONFLUENCE_RULES}
+            labels = [builtin[rule_id] for rule_id in rules]
+        self.labels = labels
+        self.levels = levels
+        self.threshold = threshold
+        self.strength_weights = dict(strength_weights or STRENGTH_WEIGHTS)
+        # Weight of each level code (integer weights keep integer scores)
+        self._weight_table = np.asarray(level_weights(self.strength_weights))
+        counts = np.stack([(levels == level).sum(axis=1) for level in sorted(STRENGTH_LABELS)])
+        self.scores = np.tensordot(self._weight_table[1:], counts, axes=1)
+        bullish, bearish, neutral = self.scores
+        total = bullish + bearish + neutral
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.bias_codes = np.select(
+                [total == 0, (bullish > bearish) & (bullish >= threshold), (bearish > bullish) & (bearish >= threshold)],
+                [0, 1, 2], default=3).astype(np.int8)
+            self.strength = np.select(
+                [total == 0, self.bias_codes == 1, self.bias_codes == 2],
+                [0.0, bullish / total * 100, bearish / total * 100],
+                default=np.maximum(bullish, bearish) / total * 100)
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def weights(self):
+        """(direction, rule, bar) matrix of score weights (0 = rule silent)"""
+        return self._weight_table[self.levels]
+
+    @property
+    def signals(self):
+        """Boolean (direction, rule, bar) matrix of fired rules"""
+        return self.levels > 0
+
+    def bias(self, bar=-1):
+        """(bias label, strength) for one bar, as calculate_confluence_strength returns it"""
+        code = int(self.bias_codes[bar])
+        return BIAS_LABELS[code], (0 if code == 0 else float(self.strength[bar]))
+
+    def active(self, bar=-1):
+        """{direction: [(indicator, strength label), ...]} of the rules firing on one bar"""
+        return {direction: [(label, STRENGTH_LABELS[int(level)])
+                            for label, level in zip(self.labels, self.levels[d, :, bar]) if level]
+                for d, direction in enumerate(DIRECTIONS)}
+
+    def scores_frame(self):
+        """Per-bar bullish/bearish/neutral scores, bias label and strength"""
+        bullish, bearish, neutral = self.scores
+        return pd.DataFrame({"bullish": bullish, "bearish": bearish, "neutral": neutral,
+                             "bias": np.asarray(BIAS_LABELS, dtype=object)[self.bias_codes],
+                             "strength": self.strength}, index=self.index)
+
+    def signal_frame(self, direction):
+        """Per-bar score weights of one direction, one column per rule"""
+        return pd.DataFrame(self.weights[DIRECTIONS.index(direction)].T, index=self.index, columns=self.rules)
+
+
+def rule_params(params=None):
+    """RULE_PARAMS with ``params`` overrides applied; unknown names raise ValueError"""
+    params = dict(params or {})
+    unknown = set(params) - set(RULE_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown confluence rule parameters: {', '.join(sorted(unknown))}")
+    return {**RULE_PARAMS, **params}
+
+
+def evaluate_confluences(df, threshold=3, steps=None, params=None, strength_weights=None, rules=None):
+    """Evaluate the confluence rules (optionally only those of the named analysis ``steps``) on all bars
+
+    ``params`` overrides RULE_PARAMS cutoffs and ``strength_weights`` the STRENGTH_WEIGHTS scoring.
+    ``rules`` (a rules_module.RuleSet) adds custom rules after the built-in ones.
+    """
+    p = rule_params(params)
+    if strength_weights is not None and set(strength_weights) != set(STRENGTH_WEIGHTS):
+        raise ValueError(f"strength_weights needs exactly the keys {', '.join(STRENGTH_WEIGHTS)}")
+    builtin = [rule for rule in CONFLUENCE_RULES if steps is None or rule[2] in steps]
+    custom = [rule for rule in rules or () if steps is None or rule.step in steps]
+    columns = {col for rule in builtin for col in rule[4]} | {col for rule in custom for col in rule.columns}
+    missing = columns - set(df.columns)
+    if missing:
+        raise ValueError(f"Missing indicator columns: {', '.join(sorted(missing))}")
+    # float64 like the scalar path, where a row of a compact frame is upcast before comparing
+    x = {col: df[col].to_numpy(dtype=np.float64) for col in columns}
+    levels = np.zeros((len(DIRECTIONS), len(builtin) + len(custom), len(df)), dtype=np.int8)
+    with np.errstate(invalid="ignore"):
+        for r, (_, _, _, func, _) in enumerate(builtin):
+            levels[:, r] = func(x, p)
+    for r, rule in enumerate(custom, len(builtin)):
+        levels[DIRECTIONS.index(rule.direction), r] = rule.levels(x)
+    ids = [rule[0] for rule in builtin] + [rule.id for rule in custom]
+    labels = [rule[1] for rule in builtin] + [rule.indicator for rule in custom]
+    return ConfluenceHistory(df.index, ids, levels, threshold, strength_weights, labels)
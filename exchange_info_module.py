@@ -0,0 +1,206 @@
+import json
+import os
+import re
+import threading
+import time
+from difflib import get_close_matches
+
+from network_module import get_session_pool
+
+BINANCE_EXCHANGE_INFO_URLS = [
+    "https://api.binance.com/api/v3/exchangeInfo",
+    "https://api.binance.us/api/v3/exchangeInfo",
+]
+
+DEFAULT_EXCHANGE_INFO = os.environ.get("NUNNO_EXCHANGE_INFO", "exchange_info.json")
+
+# Quote assets tried when a bare ticker ("BTC") or a USD pair ("BTCUSD") is not listed
+DEFAULT_QUOTES = ("USDT", "FDUSD", "USDC")
+
+
+class UnknownSymbolError(ValueError):
+    """Raised for symbols the exchange does not list (or no longer trades)"""
+
+    def __init__(self, symbol, reason="is not listed on Binance", suggestions=()):
+        self.symbol = symbol
+        self.suggestions = list(suggestions)
+        message = f"{symbol} {reason}"
+        if self.suggestions:
+            message += f". Did you mean: {', '.join(self.suggestions)}?"
+        super().__init__(message)
+
+
+class ExchangeSymbolTable:
+    """Binance exchangeInfo symbol table (status, base/quote asset), cached on disk.
+
+    Loaded once (from disk when fresh, else downloaded in the background, waiting at most
+    ``load_timeout`` seconds) and refreshed in the background after ``ttl`` seconds. Only a table
+    from the first (binance.com) URL is authoritative: with none loaded, or only a fallback
+    (Binance.US) table, symbols it does not list are passed through unchecked.
+    """
+
+    def __init__(self, path=DEFAULT_EXCHANGE_INFO, ttl=6 * 3600, session_pool=None,
+                 urls=None, retry_interval=300, load_timeout=3.0):
+        self.path = path
+        self.ttl = ttl
+        self.urls = list(urls or BINANCE_EXCHANGE_INFO_URLS)
+        self.retry_interval = retry_interval
+        self.load_timeout = load_timeout
+        self._session_pool = session_pool
+        self._symbols = None
+        self._trading = []
+        self.fetched_at = 0
+        self.authoritative = False
+        self._last_attempt = 0
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+
+    @property
+    def session_pool(self):
+        return self._session_pool or get_session_pool()
+
+    def _install(self, symbols, fetched_at, authoritative):
+        self._trading = sorted(s for s, info in symbols.items() if info["status"] == "TRADING")
+        self._symbols = symbols
+        self.fetched_at = fetched_at
+        self.authoritative = authoritative
+
+    def _load_from_disk(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            symbols = {
+                symbol: {"symbol": symbol, "status": status, "baseAsset": base, "quoteAsset": quote}
+                for symbol, (status, base, quote) in payload["symbols"].items()
+            }
+            self._install(symbols, payload.get("fetched_at", 0), payload.get("authoritative", False))
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def _save_to_disk(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        compact = {s: [i["status"], i["baseAsset"], i["quoteAsset"]] for s, i in self._symbols.items()}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"fetched_at": self.fetched_at, "authoritative": self.authoritative, "symbols": compact},
+                      f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    def refresh(self):
+        """Download exchangeInfo from the first reachable endpoint; keeps the old table on failure.
+
+        A fallback endpoint never replaces an authoritative table, however old.
+        """
+        self._last_attempt = time.time()
+        for i, url in enumerate(self.urls):
+            if i and self.authoritative:
+                break
+            try:
+                response = self.session_pool.get(url, timeout=15)
+                response.raise_for_status()
+                symbols = {
+                    item["symbol"]: {"symbol": item["symbol"], "status": item.get("status", "TRADING"),
+                                     "baseAsset": item.get("baseAsset", ""), "quoteAsset": item.get("quoteAsset", "")}
+                    for item in response.json()["symbols"]
+                }
+                if not symbols:
+                    raise ValueError("empty symbol list")
+            except Exception as e:
+                print(f"⚠️ exchangeInfo from {url} failed: {str(e)}")
+                continue
+
+            self._install(symbols, time.time(), authoritative=i == 0)
+            try:
+                self._save_to_disk()
+            except OSError as e:
+                print(f"⚠️ Could not save exchangeInfo: {str(e)}")
+            return True
+        return False
+
+    def refresh_async(self):
+        """Start a background refresh unless one is already running"""
+        with self._lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return self._refresh_thread
+            self._refresh_thread = threading.Thread(target=self.refresh, name="exchange-info-refresh", daemon=True)
+            self._refresh_thread.start()
+            return self._refresh_thread
+
+    def is_stale(self):
+        return time.time() - self.fetched_at >= self.ttl
+
+    def _get_symbols(self):
+        if self._symbols is None:
+            with self._lock:
+                if self._symbols is None:
+                    self._load_from_disk()
+            if self._symbols is None and time.time() - self._last_attempt >= self.retry_interval:
+                # First use without a disk copy: give the download a moment, never block on it
+                self.refresh_async().join(self.load_timeout)
+            if self._symbols is None:
+                return None
+        if (self.is_stale() or not self.authoritative) and time.time() - self._last_attempt >= self.retry_interval:
+            self.refresh_async()
+        return self._symbols
+
+    def is_loaded(self):
+        return self._get_symbols() is not None
+
+    def get(self, symbol):
+        """exchangeInfo entry for ``symbol`` (symbol, status, baseAsset, quoteAsset) or None"""
+        symbols = self._get_symbols() or {}
+        return symbols.get(symbol.upper().strip())
+
+    def _candidates(self, symbol):
+        """Spellings worth trying for user input such as 'btc/usdt', 'BTC-USD' or 'btc'"""
+        compact = re.sub(r"[^A-Z0-9]", "", symbol.upper())
+        candidates = [compact]
+        if compact.endswith("USD"):
+            candidates += [compact + "T", compact[:-3] + "USDC"]
+        candidates += [compact + quote for quote in DEFAULT_QUOTES]
+        return candidates
+
+    def suggest(self, symbol, limit=3):
+        """Trading symbols that look like ``symbol``"""
+        symbols = self._get_symbols()
+        if not symbols:
+            return []
+        return get_close_matches(symbol.upper().strip(), self._trading, n=limit, cutoff=0.75)
+
+    def resolve(self, symbol):
+        """Return the listed, trading symbol for ``symbol`` or raise UnknownSymbolError.
+
+        Formatting differences and a missing/USD quote are remapped ('btc/usd' -> 'BTCUSDT');
+        look-alike symbols are only offered as suggestions.
+        """
+        symbols = self._get_symbols()
+        if symbols is None:
+            return symbol.upper().strip()  # No table available: let the fetch chain decide
+
+        for candidate in self._candidates(symbol):
+            info = symbols.get(candidate)
+            if info is None or (not self.authoritative and info["status"] != "TRADING"):
+                continue
+            if info["status"] != "TRADING":
+                raise UnknownSymbolError(candidate, f"is not trading on Binance (status {info['status']})",
+                                         self.suggest(candidate))
+            return candidate
+        if not self.authoritative:
+            # A Binance.US table misses most binance.com pairs: let the fetch chain decide
+            return symbol.upper().strip()
+        raise UnknownSymbolError(symbol.upper().strip(), suggestions=self.suggest(symbol))
+
+
+_default_table = None
+_default_table_lock = threading.Lock()
+
+
+def get_symbol_table():
+    """Return the process-wide exchangeInfo symbol table (loaded lazily on first use)"""
+    global _default_table
+    if _default_table is None:
+        with _default_table_lock:
+            if _default_table is None:
+                _default_table = ExchangeSymbolTable()
+    return _default_table
@@ -0,0 +1,771 @@
+import math
+from collections import deque
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    from scipy.signal import lfilter
+except ImportError:  # pandas ewm stands in for the linear recurrences
+    lfilter = None
+
+from candle_store_module import OHLCV_COLUMNS
+
+# Columns added by add_indicators, in the order add_comprehensive_indicators always produced them
+INDICATOR_COLUMNS = [
+    "RSI_14", "RSI_21", "Stoch_K", "Stoch_D", "Williams_R",
+    "EMA_9", "EMA_21", "EMA_50", "SMA_20", "SMA_50",
+    "MACD", "MACD_Signal", "MACD_Histogram",
+    "ADX", "DI_Plus", "DI_Minus",
+    "BB_Upper", "BB_Middle", "BB_Lower", "BB_Width", "BB_Position",
+    "KC_Upper", "KC_Lower", "KC_Middle",
+    "ATR", "ATR_Percent",
+    "Volume_SMA", "Volume_Ratio", "OBV", "CMF",
+    "Body_Size", "Upper_Wick", "Lower_Wick", "Total_Range",
+    "Pivot", "R1", "S1",
+    "ROC_5", "ROC_14",
+]
+
+# Bounded oscillators, ratios and percentages: float32 keeps ~7 significant digits, plenty for
+# threshold checks. Levels (EMAs, bands, pivots, ATR, MACD, volume SMA) stay float64 in compact frames.
+COMPACT_COLUMNS = frozenset([
+    "RSI_14", "RSI_21", "Stoch_K", "Stoch_D", "Williams_R", "ADX", "DI_Plus", "DI_Minus",
+    "BB_Width", "BB_Position", "ATR_Percent", "Volume_Ratio", "CMF",
+    "Body_Size", "Upper_Wick", "Lower_Wick", "Total_Range", "ROC_5", "ROC_14",
+])
+
+
+def _recurrence(x, decay, gain, y0):
+    """y[0] = y0 and y[i] = decay * y[i-1] + gain * x[i] along the last axis (x[0] is ignored)"""
+    x = np.asarray(x, dtype=np.float64)
+    y0 = np.asarray(y0, dtype=np.float64)
+    out = np.empty_like(x)
+    out[..., 0] = y0
+    if x.shape[-1] < 2:
+        return out
+    if lfilter is not None:
+        out[..., 1:] = lfilter([gain], [1.0, -decay], x[..., 1:], axis=-1, zi=(decay * y0)[..., None])[0]
+        return out
+    # Rescale into an adjust=False EWM: z = y * (1 - decay) / gain follows alpha = 1 - decay
+    alpha = 1.0 - decay
+    seeded = np.array(x, copy=True)
+    seeded[..., 0] = y0 * alpha / gain
+    frame = pd.DataFrame(seeded.reshape(-1, x.shape[-1]).T)
+    z = frame.ewm(alpha=alpha, adjust=False).mean().to_numpy().T * gain / alpha
+    out[...] = z.reshape(x.shape)
+    return out
+
+
+def _ema(x, span):
+    """pandas ``ewm(span, adjust=False, min_periods=span)`` over a NaN-free series"""
+    alpha = 2.0 / (span + 1)
+    out = _recurrence(x, 1.0 - alpha, alpha, x[..., 0])
+    out[..., :span - 1] = np.nan
+    return out
+
+
+def _rolling_sum(x, window, min_periods=None):
+    """Trailing window sums (NaN until ``min_periods`` values are in).
+
+    Full windows are summed directly rather than differenced from a running cumsum, so flat
+    stretches give exact results (a cumsum leaves rounding noise that turns 0/0 into inf).
+    """
+    out = np.empty(x.shape)
+    head = min(window - 1, x.shape[-1])
+    out[..., :head] = np.cumsum(x[..., :head], axis=-1)
+    if x.shape[-1] >= window:
+        out[..., window - 1:] = sliding_window_view(x, window, axis=-1).sum(axis=-1)
+    out[..., :(window if min_periods is None else min_periods) - 1] = np.nan
+    return out
+
+
+def _rolling_mean(x, window, min_periods=None):
+    counts = np.minimum(np.arange(1, x.shape[-1] + 1), window)
+    return _rolling_sum(x, window, min_periods) / counts
+
+
+def _rolling(x, window, reducer):
+    """Apply ``reducer`` (np.min, np.max, np.std...) over trailing windows; NaN for the warm-up rows"""
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] >= window:
+        out[..., window - 1:] = reducer(sliding_window_view(x, window, axis=-1), axis=-1)
+    return out
+
+
+def _shift(x, periods):
+    out = np.full(x.shape, np.nan)
+    out[..., periods:] = x[..., :-periods]
+    return out
+
+
+def _rsi(diff_up, diff_down, window):
+    """Wilder RSI with ta's conventions (both smoothed series computed in one filter call)"""
+    alpha = 1.0 / window
+    smoothed = _recurrence(np.stack([diff_up, diff_down]), 1.0 - alpha, alpha, np.stack([diff_up[..., 0], diff_down[..., 0]]))
+    smoothed[..., :window - 1] = np.nan
+    emaup, emadn = smoothed
+    return np.where(emadn == 0, 100.0, 100.0 - 100.0 / (1.0 + emaup / emadn))
+
+
+def _adx(true_range, pos, neg, window):
+    """ADX/+DI/-DI reproducing ta 0.10.2 exactly (including its index offsets)"""
+    shape = true_range.shape
+    n = shape[-1]
+    m = n - (window - 1)
+    if m < window + 2:
+        return np.full(shape, np.nan), np.full(shape, np.nan), np.full(shape, np.nan)
+
+    # Wilder running sums of TR, +DM and -DM, seeded with the first ``window`` values after row 0
+    series = np.stack([true_range, pos, neg])
+    seeds = series[..., 1:window + 1].sum(axis=-1)
+    sums = np.zeros((3, *shape[:-1], m))
+    x = np.zeros((3, *shape[:-1], m - 1))
+    x[..., 1:] = series[..., window + 1:window + m - 1]
+    sums[..., :m - 1] = _recurrence(x, 1.0 - 1.0 / window, 1.0, seeds)
+    trs, dip, din = sums
+
+    di_pos = 100 * (dip / trs)
+    di_neg = 100 * (din / trs)
+    dx = 100 * np.abs((di_pos - di_neg) / (di_pos + di_neg))
+    adx = np.zeros(shape)
+    if m > window:
+        x = np.zeros((*shape[:-1], m - window))
+        x[..., 1:] = dx[..., window:m - 1]
+        adx[..., 2 * window - 1:] = _recurrence(x, 1.0 - 1.0 / window, 1.0 / window, dx[..., :window].mean(axis=-1))
+
+    plus = np.zeros(shape)
+    minus = np.zeros(shape)
+    plus[..., window + 1:] = di_pos[..., 1:m - 1]
+    minus[..., window + 1:] = di_neg[..., 1:m - 1]
+    return adx, plus, minus
+
+
+def _close_diff(close, prev_close):
+    diff = close - prev_close
+    diff[..., 0] = 0.0
+    return diff
+
+
+def _macd_signal(macd, span):
+    signal = np.full(macd.shape, np.nan)
+    if macd.shape[-1] > 25:  # The signal EMA starts at the first defined MACD value
+        signal[..., 25:] = _ema(macd[..., 25:], span)
+    return signal
+
+
+def _true_range(high, low, prev_close):
+    """Row 0 has no previous close, so its true range is just high - low"""
+    true_range = np.maximum(high, prev_close) - np.minimum(low, prev_close)
+    true_range[..., 0] = high[..., 0] - low[..., 0]
+    return true_range
+
+
+def _directional_movement(high, low):
+    diff_up = high - _shift(high, 1)
+    diff_down = _shift(low, 1) - low
+    pos = np.where((diff_up > diff_down) & (diff_up > 0), diff_up, 0.0)
+    neg = np.where((diff_down > diff_up) & (diff_down > 0), diff_down, 0.0)
+    return pos, neg
+
+
+def _atr(true_range, window):
+    """Wilder ATR seeded with the mean of the first ``window`` true ranges (zeros before, like ta)"""
+    atr = np.zeros(true_range.shape)
+    if true_range.shape[-1] >= window:
+        x = np.zeros((*true_range.shape[:-1], true_range.shape[-1] - window + 1))
+        x[..., 1:] = true_range[..., window:]
+        atr[..., window - 1:] = _recurrence(x, (window - 1) / window, 1 / window,
+                                            true_range[..., :window].mean(axis=-1))
+    return atr
+
+
+def _money_flow(high, low, close, volume):
+    money_flow = ((close - low) - (high - close)) / (high - low)
+    return np.where(np.isnan(money_flow), 0.0, money_flow) * volume
+
+
+def _roc(close, periods):
+    return (close / _shift(close, periods) - 1) * 100
+
+
+_PRICE_INPUTS = ("open", "high", "low", "close", "volume")
+
+# Indicator graph: node -> (input nodes, function, parameters). Nodes are the INDICATOR_COLUMNS
+# plus the intermediates they share; inputs are other nodes or the raw _PRICE_INPUTS arrays.
+INDICATOR_GRAPH = {}
+
+
+def _node(name, func, *inputs, **params):
+    INDICATOR_GRAPH[name] = (inputs, func, params)
+
+
+# Shared intermediates
+_node("prev_close", _shift, "close", periods=1)
+_node("close_diff", _close_diff, "close", "prev_close")
+_node("gain", lambda diff: np.where(diff > 0, diff, 0.0), "close_diff")
+_node("loss", lambda diff: np.where(diff < 0, -diff, 0.0), "close_diff")
+_node("lowest_14", _rolling, "low", window=14, reducer=np.min)
+_node("highest_14", _rolling, "high", window=14, reducer=np.max)
+_node("range_14", lambda highest, lowest: highest - lowest, "highest_14", "lowest_14")
+_node("close_sum_20", _rolling_sum, "close", window=20)
+_node("ema_12", _ema, "close", span=12)
+_node("ema_26", _ema, "close", span=26)
+_node("true_range", _true_range, "high", "low", "prev_close")
+_node("directional_movement", _directional_movement, "high", "low")
+_node("adx_di", lambda tr, dm, window: _adx(tr, *dm, window), "true_range", "directional_movement", window=14)
+_node("std_20", _rolling, "close", window=20, reducer=np.std)
+_node("typical", lambda h, l, c: (h + l + c) / 3, "high", "low", "close")
+_node("volume_sum_20", _rolling_sum, "volume", window=20)
+_node("money_flow", _money_flow, "high", "low", "close", "volume")
+
+# Momentum
+_node("RSI_14", _rsi, "gain", "loss", window=14)
+_node("RSI_21", _rsi, "gain", "loss", window=21)
+_node("Stoch_K", lambda c, lowest, rng: 100 * (c - lowest) / rng, "close", "lowest_14", "range_14")
+_node("Stoch_D", _rolling, "Stoch_K", window=3, reducer=np.mean)
+_node("Williams_R", lambda c, highest, rng: -100 * (highest - c) / rng, "close", "highest_14", "range_14")
+
+# Trend
+_node("EMA_9", _ema, "close", span=9)
+_node("EMA_21", _ema, "close", span=21)
+_node("EMA_50", _ema, "close", span=50)
+_node("SMA_20", lambda total, window: total / window, "close_sum_20", window=20)
+_node("SMA_50", _rolling_mean, "close", window=50)
+_node("MACD", lambda fast, slow: fast - slow, "ema_12", "ema_26")
+_node("MACD_Signal", _macd_signal, "MACD", span=9)
+_node("MACD_Histogram", lambda macd, signal: macd - signal, "MACD", "MACD_Signal")
+_node("ADX", lambda adx_di: adx_di[0], "adx_di")
+_node("DI_Plus", lambda adx_di: adx_di[1], "adx_di")
+_node("DI_Minus", lambda adx_di: adx_di[2], "adx_di")
+
+# Volatility
+_node("BB_Upper", lambda sma, std: sma + 2 * std, "SMA_20", "std_20")
+_node("BB_Middle", lambda sma: sma, "SMA_20")
+_node("BB_Lower", lambda sma, std: sma - 2 * std, "SMA_20", "std_20")
+_node("BB_Width", lambda upper, lower, sma: (upper - lower) / sma * 100, "BB_Upper", "BB_Lower", "SMA_20")
+_node("BB_Position", lambda c, upper, lower: (c - lower) / (upper - lower), "close", "BB_Upper", "BB_Lower")
+_node("KC_Upper", lambda h, l, c: _rolling_mean((4 * h - 2 * l + c) / 3.0, 20, min_periods=1), "high", "low", "close")
+_node("KC_Lower", lambda h, l, c: _rolling_mean((-2 * h + 4 * l + c) / 3.0, 20, min_periods=1), "high", "low", "close")
+_node("KC_Middle", _rolling_mean, "typical", window=20)
+_node("ATR", _atr, "true_range", window=14)
+_node("ATR_Percent", lambda atr, c: atr / c * 100, "ATR", "close")
+
+# Volume
+_node("Volume_SMA", lambda total, window: total / window, "volume_sum_20", window=20)
+_node("Volume_Ratio", lambda v, sma: v / sma, "volume", "Volume_SMA")
+_node("OBV", lambda c, prev_close, v: np.cumsum(np.where(c < prev_close, -v, v), axis=-1), "close", "prev_close", "volume")
+_node("CMF", lambda flow, total: _rolling_sum(flow, 20) / total, "money_flow", "volume_sum_20")
+
+# Price action
+_node("Body_Size", lambda o, c: np.abs(c - o) / o * 100, "open", "close")
+_node("Upper_Wick", lambda o, h, c: (h - np.maximum(o, c)) / o * 100, "open", "high", "close")
+_node("Lower_Wick", lambda o, l, c: (np.minimum(o, c) - l) / o * 100, "open", "low", "close")
+_node("Total_Range", lambda o, h, l: (h - l) / o * 100, "open", "high", "low")
+
+# Support/Resistance levels (simplified)
+_node("Pivot", lambda typical: typical, "typical")
+_node("R1", lambda typical, l: 2 * typical - l, "typical", "low")
+_node("S1", lambda typical, h: 2 * typical - h, "typical", "high")
+
+# Rate of Change
+_node("ROC_5", _roc, "close", periods=5)
+_node("ROC_14", _roc, "close", periods=14)
+
+
+def indicator_columns(columns=None):
+    """Normalise a column request to a tuple in INDICATOR_COLUMNS order (None means all of them)"""
+    if columns is None:
+        return tuple(INDICATOR_COLUMNS)
+    if isinstance(columns, str):
+        columns = [columns]
+    unknown = sorted(set(columns) - set(INDICATOR_COLUMNS))
+    if unknown:
+        raise ValueError(f"Unknown indicator column(s): {', '.join(unknown)}")
+    wanted = set(columns)
+    return tuple(col for col in INDICATOR_COLUMNS if col in wanted)
+
+
+@lru_cache(maxsize=256)
+def _evaluation_order(columns):
+    order = []
+    seen = set(_PRICE_INPUTS)
+
+    def visit(name):
+        if name in seen:
+            return
+        seen.add(name)
+        for dependency in INDICATOR_GRAPH[name][0]:
+            visit(dependency)
+        order.append(name)
+
+    for col in columns:
+        visit(col)
+    return tuple(order)
+
+
+def resolve_indicators(columns=None):
+    """Graph nodes needed for ``columns``, dependencies first (each node appears once)"""
+    return list(_evaluation_order(indicator_columns(columns)))
+
+
+def compute_indicators(open_, high, low, close, volume, columns=None):
+    """Compute INDICATOR_COLUMNS series from raw float arrays in one fused pass.
+
+    Arrays may be 1-D (one symbol) or (symbols, time) panels from stack_ohlcv; every
+    indicator runs along the last axis, so a whole watchlist costs one pass over the graph.
+
+    Only the nodes ``columns`` depend on are evaluated (default: every column), and shared
+    intermediates (true range, previous close, typical price, 14-bar high/low, 20-bar close and
+    volume sums, the close diffs behind RSI) are computed once. Values match the ``ta`` 0.10.2
+    indicators the analyzer used before. Returns {column: ndarray}.
+    """
+    columns = indicator_columns(columns)
+    values = dict(zip(_PRICE_INPUTS, (np.asarray(a, dtype=np.float64) for a in (open_, high, low, close, volume))))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for name in _evaluation_order(columns):
+            inputs, func, params = INDICATOR_GRAPH[name]
+            values[name] = func(*(values[dependency] for dependency in inputs), **params)
+    return {col: values[col] for col in columns}
+
+
+def _kept_rows(valid):
+    """Row selector for ``valid``: a slice when only a warm-up prefix is dropped (the usual case)"""
+    first = int(valid.argmax()) if valid.any() else len(valid)
+    return slice(first, None) if valid[first:].all() else valid
+
+
+def add_indicators(df, columns=None, compact=False):
+    """Return ``df`` plus the requested indicator columns (default: all), without the warm-up rows (any NaN).
+
+    The result is allocated once at its trimmed size (no concat-then-dropna copy). With
+    ``compact`` the COMPACT_COLUMNS are stored as float32 and columns are not consolidated.
+    """
+    columns = list(indicator_columns(columns))
+    stale = [col for col in INDICATOR_COLUMNS if col in df.columns]
+    base = df.drop(columns=stale) if stale else df
+    indicators = compute_indicators(base["Open"].to_numpy(), base["High"].to_numpy(), base["Low"].to_numpy(),
+                                    base["Close"].to_numpy(), base["Volume"].to_numpy(), columns)
+
+    all_float = all(dtype == np.float64 for dtype in base.dtypes)
+    base_values = base.to_numpy() if all_float else None
+    valid = ~np.isnan(base_values).any(axis=1) if all_float else base.notna().all(axis=1).to_numpy()
+    for col in columns:
+        valid &= ~np.isnan(indicators[col])
+    rows = _kept_rows(valid)
+    index = base.index[rows]
+
+    if all_float and not compact:
+        # All-float input (the normal OHLCV frame): fill one (columns, rows) block pandas can adopt as is
+        width = base.shape[1]
+        block = np.empty((width + len(columns), len(index)))
+        block[:width] = base_values[rows].T
+        for j, col in enumerate(columns, start=width):
+            block[j] = indicators[col][rows]
+        return pd.DataFrame(block.T, index=index, columns=[*base.columns, *columns], copy=False)
+
+    data = {col: base[col].to_numpy()[rows] for col in base.columns}
+    for col in columns:
+        values = indicators[col][rows]
+        data[col] = values.astype(np.float32) if compact and col in COMPACT_COLUMNS else values
+    return pd.DataFrame(data, index=index, copy=False)
+
+
+def stack_ohlcv(frames, length=None):
+    """Stack the trailing ``length`` candles of each OHLCV frame into (symbols, time) panels.
+
+    ``frames`` maps symbol -> OHLCV frame; ``length`` defaults to the shortest frame. Returns
+    (symbols, per-symbol 'Open Time' indexes, (5, symbols, time) array in OHLCV_COLUMNS order).
+    """
+    symbols = list(frames)
+    if not symbols:
+        raise ValueError("No frames to stack")
+    if length is None:
+        length = min(len(frames[symbol]) for symbol in symbols)
+    short = [symbol for symbol in symbols if len(frames[symbol]) < length]
+    if short:
+        raise ValueError(f"Fewer than {length} candles for: {', '.join(short)}")
+
+    ohlcv = np.empty((len(OHLCV_COLUMNS), len(symbols), length))
+    indexes = []
+    for i, symbol in enumerate(symbols):
+        df = frames[symbol]
+        tail = len(df) - length
+        # A plain OHLCV frame converts without the (much slower) column selection
+        values = df if list(df.columns) == OHLCV_COLUMNS else df[OHLCV_COLUMNS]
+        ohlcv[:, i, :] = values.to_numpy(dtype=np.float64)[tail:].T
+        indexes.append(df.index[tail:])
+    return symbols, indexes, ohlcv
+
+
+def add_indicators_batch(frames, columns=None, length=None, chunk_cells=32_768):
+    """add_indicators for a watchlist in vectorised passes over (symbols, time) panels.
+
+    Each result equals ``add_indicators(df.tail(length)[OHLCV_COLUMNS], columns)`` for its symbol.
+    Symbols are processed in chunks of about ``chunk_cells`` values per array so the
+    intermediates stay cache-resident. Returns {symbol: frame}.
+    """
+    symbols, indexes, ohlcv = stack_ohlcv(frames, length)
+    columns = list(indicator_columns(columns))
+    fields, length = len(OHLCV_COLUMNS), ohlcv.shape[-1]
+
+    # (symbols, columns, time): each symbol's slice is the transposed block pandas stores internally
+    block = np.empty((len(symbols), fields + len(columns), length))
+    block[:, :fields] = np.moveaxis(ohlcv, 0, 1)
+    step = max(1, chunk_cells // max(length, 1))
+    for start in range(0, len(symbols), step):
+        indicators = compute_indicators(*ohlcv[:, start:start + step], columns=columns)
+        for j, col in enumerate(columns, start=fields):
+            block[start:start + step, j] = indicators[col]
+    valid = ~np.isnan(block).any(axis=1)
+
+    names = [*OHLCV_COLUMNS, *columns]
+    results = {}
+    for i, symbol in enumerate(symbols):
+        rows = _kept_rows(valid[i])
+        results[symbol] = pd.DataFrame(block[i][:, rows].T, index=indexes[i][rows], columns=names)
+    return results
+
+
+def _div(a, b):
+    """a / b with NumPy semantics for zero divisors (inf or NaN instead of an exception)"""
+    try:
+        return a / b
+    except ZeroDivisionError:
+        if a == 0 or a != a:
+            return math.nan
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+
+
+class _RollingStats:
+    """Trailing window sum/variance over a ring buffer, updated in O(1) per value.
+
+    Sums are kept as deviations from an anchor that is reset to the window mean (with an exact
+    ``fsum``) every ``window`` pushes, which bounds drift and keeps flat windows exact.
+    """
+
+    __slots__ = ("window", "values", "anchor", "total", "total_sq", "_pushes")
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.anchor = 0.0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self._pushes = 0
+
+    def peek(self, x):
+        """(count, deviation sum, squared deviation sum) of the window if ``x`` were pushed"""
+        d = x - self.anchor
+        total, total_sq, count = self.total + d, self.total_sq + d * d, len(self.values) + 1
+        if count > self.window:
+            old = self.values[0] - self.anchor
+            total, total_sq, count = total - old, total_sq - old * old, self.window
+        return count, total, total_sq
+
+    def sum(self, x, min_periods=None):
+        count, total, _ = self.peek(x)
+        if count < (self.window if min_periods is None else min_periods):
+            return math.nan
+        return self.anchor * count + total
+
+    def mean(self, x, min_periods=None):
+        count, total, _ = self.peek(x)
+        if count < (self.window if min_periods is None else min_periods):
+            return math.nan
+        return self.anchor + total / count
+
+    def std(self, x):
+        """Population standard deviation (ddof=0) of a full window"""
+        count, total, total_sq = self.peek(x)
+        if count < self.window:
+            return math.nan
+        mean = total / count
+        return math.sqrt(max(total_sq / count - mean * mean, 0.0))
+
+    def push(self, x):
+        _, self.total, self.total_sq = self.peek(x)
+        self.values.append(x)
+        self._pushes += 1
+        if self._pushes % self.window == 0:
+            self.anchor = math.fsum(self.values) / len(self.values)
+            self.total = math.fsum(v - self.anchor for v in self.values)
+            self.total_sq = math.fsum((v - self.anchor) ** 2 for v in self.values)
+
+    def copy(self):
+        other = _RollingStats.__new__(_RollingStats)
+        other.window, other.values = self.window, deque(self.values, maxlen=self.window)
+        other.anchor, other.total, other.total_sq, other._pushes = self.anchor, self.total, self.total_sq, self._pushes
+        return other
+
+
+class _RollingExtreme:
+    """Trailing window max (or min) with a monotonic deque: amortised O(1) per push"""
+
+    __slots__ = ("window", "sign", "items")
+
+    def __init__(self, window, maximum=True):
+        self.window = window
+        self.sign = 1.0 if maximum else -1.0
+        self.items = deque()  # (index, signed value), values decreasing
+
+    def peek(self, x, index):
+        """Extreme of the window ending at ``index`` if ``x`` were pushed (NaN while warming up)"""
+        if index < self.window - 1:
+            return math.nan
+        signed = self.sign * x
+        for position, value in self.items:
+            if position > index - self.window:
+                return self.sign * max(value, signed)
+        return x
+
+    def push(self, x, index):
+        signed = self.sign * x
+        while self.items and self.items[-1][1] <= signed:
+            self.items.pop()
+        self.items.append((index, signed))
+        while self.items[0][0] <= index - self.window:
+            self.items.popleft()
+
+    def copy(self):
+        other = _RollingExtreme.__new__(_RollingExtreme)
+        other.window, other.sign, other.items = self.window, self.sign, deque(self.items)
+        return other
+
+
+class IncrementalIndicators:
+    """Per-candle indicator state for the INDICATOR_COLUMNS set, matching compute_indicators.
+
+    ``update(..., final=True)`` commits a closed candle in constant time; ``final=False``
+    evaluates a still-forming candle against the committed state without changing it.
+    Re-sending the last committed open time replaces that candle (one level of undo).
+    """
+
+    _SCALARS = ("count", "prev_close", "prev_high", "prev_low", "last_open_time",
+                "ema_up_14", "ema_down_14", "ema_up_21", "ema_down_21",
+                "ema_9", "ema_21", "ema_50", "ema_12", "ema_26", "macd_signal",
+                "seed_tr", "seed_pos", "seed_neg", "trs", "dip", "din", "dx_sum", "adx",
+                "atr_sum", "atr", "obv")
+
+    def __init__(self):
+        self.count = 0
+        self.prev_close = self.prev_high = self.prev_low = math.nan
+        self.last_open_time = None
+        self.ema_up_14 = self.ema_down_14 = self.ema_up_21 = self.ema_down_21 = 0.0
+        self.ema_9 = self.ema_21 = self.ema_50 = self.ema_12 = self.ema_26 = self.macd_signal = 0.0
+        self.seed_tr = self.seed_pos = self.seed_neg = 0.0
+        self.trs = self.dip = self.din = self.dx_sum = self.adx = 0.0
+        self.atr_sum = self.atr = self.obv = 0.0
+        self.closes = deque(maxlen=14)
+        self.stoch_k = deque(maxlen=2)
+        self.close_20 = _RollingStats(20)
+        self.close_50 = _RollingStats(50)
+        self.kc_high = _RollingStats(20)
+        self.kc_low = _RollingStats(20)
+        self.typical_20 = _RollingStats(20)
+        self.volume_20 = _RollingStats(20)
+        self.money_flow_20 = _RollingStats(20)
+        self.high_14 = _RollingExtreme(14, maximum=True)
+        self.low_14 = _RollingExtreme(14, maximum=False)
+        self._undo = None
+
+    @classmethod
+    def from_frame(cls, df):
+        """Warm the state up on every row of an OHLCV frame (all treated as closed candles)"""
+        state = cls()
+        open_times = df.index.values.astype("datetime64[ms]").astype(np.int64)
+        for open_time, row in zip(open_times, df[["Open", "High", "Low", "Close", "Volume"]].to_numpy()):
+            state.update(int(open_time), *row)
+        return state
+
+    def _snapshot(self):
+        windows = {name: getattr(self, name).copy() for name in (
+            "close_20", "close_50", "kc_high", "kc_low", "typical_20", "volume_20", "money_flow_20",
+            "high_14", "low_14")}
+        windows["closes"] = deque(self.closes, maxlen=self.closes.maxlen)
+        windows["stoch_k"] = deque(self.stoch_k, maxlen=self.stoch_k.maxlen)
+        return {name: getattr(self, name) for name in self._SCALARS}, windows
+
+    def _restore(self, snapshot):
+        scalars, windows = snapshot
+        for name, value in {**scalars, **windows}.items():
+            setattr(self, name, value)
+
+    def update(self, open_time, open_, high, low, close, volume, final=True):
+        """Indicator values ({column: float}) for this candle; commits it to the state when ``final``"""
+        if open_time is not None and self.last_open_time is not None:
+            if open_time == self.last_open_time and final:
+                if self._undo is None:
+                    raise ValueError("Only the most recent committed candle can be replaced")
+                self._restore(self._undo)
+            elif open_time == self.last_open_time:
+                # Re-evaluating the newest committed candle: score it as if it were still open
+                snapshot = self._snapshot()
+                self._restore(self._undo)
+                values, _ = self._evaluate(open_, high, low, close, volume)
+                self._restore(snapshot)
+                return values
+            elif open_time < self.last_open_time:
+                raise ValueError(f"Candle {open_time} is older than the last committed candle")
+
+        values, pending = self._evaluate(open_, high, low, close, volume)
+        if final:
+            self._undo = self._snapshot()
+            self._commit(open_time, open_, high, low, close, volume, values, pending)
+        return values
+
+    def _evaluate(self, o, h, l, c, v):
+        t = self.count
+        first = t == 0
+        pc = self.prev_close
+        nan = math.nan
+        out = {}
+        pending = {}
+
+        # Momentum
+        diff = 0.0 if first else c - pc
+        up, down = (diff if diff > 0 else 0.0), (-diff if diff < 0 else 0.0)
+        for window in (14, 21):
+            alpha = 1.0 / window
+            ema_up = up if first else (1 - alpha) * getattr(self, f"ema_up_{window}") + alpha * up
+            ema_down = down if first else (1 - alpha) * getattr(self, f"ema_down_{window}") + alpha * down
+            pending[f"ema_up_{window}"], pending[f"ema_down_{window}"] = ema_up, ema_down
+            if t < window - 1:
+                out[f"RSI_{window}"] = nan
+            else:
+                out[f"RSI_{window}"] = 100.0 if ema_down == 0 else 100.0 - 100.0 / (1.0 + _div(ema_up, ema_down))
+        highest = self.high_14.peek(h, t)
+        lowest = self.low_14.peek(l, t)
+        stoch_k = _div(100 * (c - lowest), highest - lowest)
+        out["Stoch_K"] = stoch_k
+        out["Stoch_D"] = (sum(self.stoch_k) + stoch_k) / 3 if len(self.stoch_k) == 2 else nan
+        out["Williams_R"] = _div(-100 * (highest - c), highest - lowest)
+
+        # Trend
+        for span in (9, 21, 50, 12, 26):
+            alpha = 2.0 / (span + 1)
+            ema = c if first else (1 - alpha) * getattr(self, f"ema_{span}") + alpha * c
+            pending[f"ema_{span}"] = ema
+            if span in (9, 21, 50):
+                out[f"EMA_{span}"] = ema if t >= span - 1 else nan
+        sma_20 = self.close_20.mean(c)
+        out["SMA_20"] = sma_20
+        out["SMA_50"] = self.close_50.mean(c)
+        macd = pending["ema_12"] - pending["ema_26"] if t >= 25 else nan
+        alpha = 2.0 / 10
+        signal = macd if t == 25 else ((1 - alpha) * self.macd_signal + alpha * macd if t > 25 else 0.0)
+        pending["macd_signal"] = signal
+        out["MACD"] = macd
+        out["MACD_Signal"] = signal if t >= 33 else nan
+        out["MACD_Histogram"] = macd - out["MACD_Signal"]
+
+        # ADX / DI (ta 0.10.2 conventions: seeded with rows 1..14, outputs offset as in the batch kernel)
+        true_range = h - l if first else max(h, pc) - min(l, pc)
+        diff_up = nan if first else h - self.prev_high
+        diff_down = nan if first else self.prev_low - l
+        pos = diff_up if (diff_up > diff_down and diff_up > 0) else 0.0
+        neg = diff_down if (diff_down > diff_up and diff_down > 0) else 0.0
+        window = 14
+        seed_tr, seed_pos, seed_neg = self.seed_tr, self.seed_pos, self.seed_neg
+        trs, dip, din, dx_sum, adx = self.trs, self.dip, self.din, self.dx_sum, self.adx
+        if 1 <= t <= window:
+            seed_tr, seed_pos, seed_neg = seed_tr + true_range, seed_pos + pos, seed_neg + neg
+        if t == window:
+            trs, dip, din = seed_tr, seed_pos, seed_neg
+        elif t > window:
+            decay = 1.0 - 1.0 / window
+            trs, dip, din = decay * trs + true_range, decay * dip + pos, decay * din + neg
+        di_plus = di_minus = 0.0
+        adx_out = 0.0
+        if t >= window:
+            di_pos, di_neg = _div(100 * dip, trs), _div(100 * din, trs)
+            dx = 100 * abs(_div(di_pos - di_neg, di_pos + di_neg))
+            if t > window:
+                di_plus, di_minus = di_pos, di_neg
+            if t < 2 * window - 1:
+                dx_sum += dx
+            elif t == 2 * window - 1:
+                dx_sum += dx
+                adx = dx_sum / window
+                adx_out = adx
+            else:
+                adx = ((window - 1) * adx + dx) / window
+                adx_out = adx
+        pending.update(seed_tr=seed_tr, seed_pos=seed_pos, seed_neg=seed_neg, trs=trs, dip=dip, din=din,
+                       dx_sum=dx_sum, adx=adx)
+        out["ADX"], out["DI_Plus"], out["DI_Minus"] = adx_out, di_plus, di_minus
+
+        # Volatility
+        std_20 = self.close_20.std(c)
+        bb_upper, bb_lower = sma_20 + 2 * std_20, sma_20 - 2 * std_20
+        out["BB_Upper"], out["BB_Middle"], out["BB_Lower"] = bb_upper, sma_20, bb_lower
+        out["BB_Width"] = _div(bb_upper - bb_lower, sma_20) * 100
+        out["BB_Position"] = _div(c - bb_lower, bb_upper - bb_lower)
+
+        typical = (h + l + c) / 3
+        kc_high, kc_low = (4 * h - 2 * l + c) / 3.0, (-2 * h + 4 * l + c) / 3.0
+        out["KC_Upper"] = self.kc_high.mean(kc_high, min_periods=1)
+        out["KC_Lower"] = self.kc_low.mean(kc_low, min_periods=1)
+        out["KC_Middle"] = self.typical_20.mean(typical)
+
+        atr_sum, atr = self.atr_sum, self.atr
+        if t < 13:
+            atr_sum += true_range
+            atr_out = 0.0
+        else:
+            atr = (atr_sum + true_range) / 14 if t == 13 else (atr * 13 + true_range) / 14
+            atr_out = atr
+        pending.update(atr_sum=atr_sum, atr=atr)
+        out["ATR"] = atr_out
+        out["ATR_Percent"] = _div(atr_out, c) * 100
+
+        # Volume
+        volume_sum = self.volume_20.sum(v)
+        volume_sma = volume_sum / 20
+        out["Volume_SMA"] = volume_sma
+        out["Volume_Ratio"] = _div(v, volume_sma)
+        obv = v if first else self.obv + (-v if c < pc else v)
+        pending["obv"] = obv
+        out["OBV"] = obv
+        money_flow = _div((c - l) - (h - c), h - l)
+        money_flow = (0.0 if money_flow != money_flow else money_flow) * v
+        out["CMF"] = _div(self.money_flow_20.sum(money_flow), volume_sum)
+
+        # Price action
+        out["Body_Size"] = _div(abs(c - o), o) * 100
+        out["Upper_Wick"] = _div(h - max(o, c), o) * 100
+        out["Lower_Wick"] = _div(min(o, c) - l, o) * 100
+        out["Total_Range"] = _div(h - l, o) * 100
+
+        # Support/Resistance levels (simplified)
+        out["Pivot"] = typical
+        out["R1"] = 2 * typical - l
+        out["S1"] = 2 * typical - h
+
+        # Rate of Change
+        out["ROC_5"] = (_div(c, self.closes[-5]) - 1) * 100 if len(self.closes) >= 5 else nan
+        out["ROC_14"] = (_div(c, self.closes[-14]) - 1) * 100 if len(self.closes) >= 14 else nan
+
+        pending.update(typical=typical, kc_high=kc_high, kc_low=kc_low, money_flow=money_flow)
+        return out, pending
+
+    def _commit(self, open_time, o, h, l, c, v, values, pending):
+        t = self.count
+        for name in self._SCALARS:
+            if name in pending:
+                setattr(self, name, pending[name])
+        self.close_20.push(c)
+        self.close_50.push(c)
+        self.kc_high.push(pending["kc_high"])
+        self.kc_low.push(pending["kc_low"])
+        self.typical_20.push(pending["typical"])
+        self.volume_20.push(v)
+        self.money_flow_20.push(pending["money_flow"])
+        self.high_14.push(h, t)
+        self.low_14.push(l, t)
+        self.stoch_k.append(values["Stoch_K"])
+        self.closes.append(c)
+        self.prev_close, self.prev_high, self.prev_low = c, h, l
+        self.last_open_time = open_time
+        self.count = t + 1
@@ -9,7 +9,6 @@ import sys
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from fuzzywuzzy import process
 import time
 from typing import Dict, List, Optional, Tuple
 import json
@@ -18,6 +17,9 @@ import time
 import base64
 from pathlib import Path
 import streamlit.components.v1 as components
+from network_module import get_session_pool, get_health_registry
+from cache_module import SingleFlight
+from coin_index_module import get_coin_index
 
 # --- Opening Page Logic ---
 if "splash_shown" not in st.session_state:
@@ -175,8 +177,9 @@ SYSTEM_PROMPT = (
 MAX_HISTORY_MESSAGES = 20
 
 class ComprehensiveTokenomics:
-    def __init__(self):
+    def __init__(self, session_pool=None):
         self.coingecko_base = "https://api.coingecko.com/api/v3"
+        self.session_pool = session_pool or get_session_pool()
         
     def fetch_comprehensive_token_data(self, coin_id: str, investment_amount: float = 1000) -> Dict:
         """Fetch comprehensive tokenomics data with detailed analysis"""
@@ -242,7 +245,7 @@ class ComprehensiveTokenomics:
                 "sparkline": "false"
             }
             
-            response = requests.get(url, params=params, timeout=15)
+            response = self.session_pool.get(url, params=params, timeout=15)
             response.raise_for_status()
             return response.json()
             
@@ -267,7 +270,7 @@ class ComprehensiveTokenomics:
                 params = {"vs_currency": "usd", "days": days}
                 
                 try:
-                    response = requests.get(url, params=params, timeout=10)
+                    response = self.session_pool.get(url, params=params, timeout=10)
                     response.raise_for_status()
                     data = response.json()
                     
@@ -283,8 +286,6 @@ class ComprehensiveTokenomics:
                         analysis[f"Sharpe_Ratio_{period}"] = f"{returns['sharpe_ratio']:.2f}"
                         analysis[f"Max_Drawdown_{period}"] = f"-{returns['max_drawdown']:.2f}%"
                         analysis[f"Avg_Volume_{period}"] = f"${volume_analysis['avg_volume']/1e6:,.1f}M"
-                        
-                    time.sleep(0.2)  # Rate limiting
                     
                 except Exception:
                     continue
@@ -994,13 +995,23 @@ def get_ai_tokenomics_explanation(token_data: Dict, user_name: str) -> str:
             "max_tokens": 1000
         }
         
-        response = requests.post(url, headers=headers, json=payload, timeout=30)
+        response = get_session_pool().post(url, headers=headers, json=payload, timeout=30)
         response.raise_for_status()
         return response.json()["choices"][0]["message"]["content"]
         
     except Exception as e:
         return f"Unable to generate explanation: {e}"
 
+# Concurrent sessions asking about the same coin share one CoinGecko fetch
+_tokenomics_flight = SingleFlight()
+
+def _fetch_tokenomics_shared(coin_id: str, investment_amount: float) -> Dict:
+    # Accept names and tickers too ("Bitcoin", "btc" -> "bitcoin")
+    coin_id = get_coin_index().lookup(coin_id) or coin_id.lower().strip()
+    key = (coin_id, float(investment_amount))
+    return _tokenomics_flight.do(key, ComprehensiveTokenomics().fetch_comprehensive_token_data,
+                                 coin_id, investment_amount)
+
 # Enhanced tokenomics function
 def fetch_enhanced_token_data(coin_id: str, investment_amount: float = 1000) -> Tuple[Dict, str]:
     """
@@ -1008,8 +1019,7 @@ def fetch_enhanced_token_data(coin_id: str, investment_amount: float = 1000) ->
     Returns: (token_data_dict, ai_explanation)
     """
     try:
-        analyzer = ComprehensiveTokenomics()
-        token_data = analyzer.fetch_comprehensive_token_data(coin_id, investment_amount)
+        token_data = _fetch_tokenomics_shared(coin_id, investment_amount)
         
         if not token_data:
             return None, "Could not fetch token data. Please check the token name/symbol."
@@ -1709,7 +1719,7 @@ def fetch_market_news():
         "apiKey": NEWS_API_KEY
     }
     try:
-        r = requests.get(url, params=params, timeout=12)
+        r = get_session_pool().get(url, params=params, timeout=12)
         r.raise_for_status()
         data = r.json()
         return [f"- {a['title']} ({a['source']['name']})" for a in data.get("articles", [])]
@@ -1729,7 +1739,7 @@ def ask_nunno(messages):
         "messages": messages
     }
     try:
-        r = requests.post(url, headers=headers, json=payload, timeout=30)
+        r = get_session_pool().post(url, headers=headers, json=payload, timeout=30)
         r.raise_for_status()
         return r.json()["choices"][0]["message"]["content"]
     except Exception as e:
@@ -1752,12 +1762,21 @@ def analyze_chart(image_b64):
         "max_tokens": 1000
     }
     try:
-        r = requests.post(url, headers=headers, json=payload, timeout=60)
+        r = get_session_pool().post(url, headers=headers, json=payload, timeout=60)
         r.raise_for_status()
         return r.json()["choices"][0]["message"]["content"]
     except Exception as e:
         return f"[Chart API Error] {e}"
 
+# Words in tokenomics questions that are never the coin being asked about
+TOKENOMICS_FILLER_WORDS = {
+    "tokenomics", "supply", "fdv", "market", "cap", "circulating", "should", "invest",
+    "inflation", "rate", "token", "tokens", "economics", "coin", "coins", "analysis",
+    "comprehensive", "full", "detailed", "what", "whats", "about", "the", "of", "for", "is",
+    "me", "tell", "show", "give", "and", "how", "much", "with", "if", "in", "on", "an", "it",
+    "my", "do", "you", "can", "please", "to", "its", "are", "this", "that", "worth", "buy",
+}
+
 def is_tokenomics_request(text):
     """Check if request is specifically about tokenomics"""
     tokenomics_specific = [
@@ -1793,12 +1812,7 @@ def is_prediction_request(text):
 
 def suggest_similar_tokens(user_input):
     try:
-        res = requests.get("https://api.coingecko.com/api/v3/coins/list", timeout=10)
-        res.raise_for_status()
-        coin_list = res.json()
-        coin_ids = [coin['id'] for coin in coin_list]
-        best = process.extract(user_input.lower(), coin_ids, limit=5)
-        return [b[0] for b in best if b[1] > 60]
+        return get_coin_index().suggest(user_input, limit=5, min_score=60)
     except Exception:
         return []
 
@@ -2137,7 +2151,7 @@ with col1:
                         number = int(match.group(1))
                         
                         # Validate timeframe based on unit
-                        if unit == 'm' and number in [1, 5, 15, 30]:
+                        if unit == 'm' and number in [1, 3, 5, 10, 15, 30]:
                             tf = f"{number}m"
                             break
                         elif unit == 'h' and number in [1, 2, 4, 6, 8, 12]:
@@ -2174,11 +2188,10 @@ with col1:
                 print(f"DEBUG: Extracted timeframe: {tf} from input: {prompt}")  # Add this for debugging
                 
                 try:
-                    analyzer = betterpredictormodule.TradingAnalyzer()
-                    df = analyzer.fetch_binance_ohlcv(symbol=symbol, interval=tf, limit=1000)
-                    df = analyzer.add_comprehensive_indicators(df)
-                    confluences, latest = analyzer.generate_comprehensive_analysis(df)
-                    bias, strength = analyzer.calculate_confluence_strength(confluences)
+                    # Shared with any other session analyzing the same symbol/timeframe right now;
+                    # compact frames keep per-session memory down (only the consumed columns are kept)
+                    confluences, latest, bias, strength = betterpredictormodule.analyze_symbol(symbol, tf, limit=1000,
+                                                                                               compact=True)
                     
                     # Capture trading plan output
                     old_stdout = io.StringIO()
@@ -2254,10 +2267,14 @@ with col1:
                     coin = val
                     break
             
-            # If no common coin found, try fuzzy matching
+            # If no common coin found, look the words up in the coin list (exact first, then fuzzy)
             if coin == "bitcoin" and not any(k in lower for k in common_coins.keys()):
-                tokens = re.findall(r'\b([a-z]{2,10})\b', lower)
-                if tokens:
+                tokens = [t for t in re.findall(r'\b([a-z]{2,10})\b', lower) if t not in TOKENOMICS_FILLER_WORDS]
+                coin_index = get_coin_index()
+                exact = next((c for c in map(coin_index.lookup, tokens) if c), None)
+                if exact:
+                    coin = exact
+                elif tokens:
                     suggestions = suggest_similar_tokens(tokens[0])
                     if suggestions:
                         coin = suggestions[0]
@@ -2324,6 +2341,13 @@ with col2:
     else:
         st.warning("⚠️ Monte Carlo Module Missing")
     
+    # Data source health (circuit breaker state per host/source)
+    health = get_health_registry().snapshot()
+    if health:
+        with st.expander("🩺 Data Source Health", expanded=False):
+            health_df = pd.DataFrame.from_dict(health, orient="index")
+            st.dataframe(health_df[["state", "retry_in", "ewma_latency", "successes", "failures", "last_status"]])
+    
     # Upload status
     if st.session_state.uploaded_b64:
         st.success("📷 Chart Ready for Analysis")
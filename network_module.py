@@ -0,0 +1,439 @@
+import atexit
+import json
+import random
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def _supported_encodings():
+    """Build an Accept-Encoding value that only lists decoders we can actually use"""
+    encodings = ["gzip", "deflate"]
+    try:
+        import brotli  # noqa: F401
+        encodings.append("br")
+    except ImportError:
+        try:
+            import brotlicffi  # noqa: F401
+            encodings.append("br")
+        except ImportError:
+            pass
+    return ", ".join(encodings)
+
+
+ACCEPT_ENCODING = _supported_encodings()
+
+try:
+    import orjson
+
+    def json_loads(content):
+        """Decode JSON bytes/str with orjson when it is installed"""
+        return orjson.loads(content)
+except ImportError:
+    json_loads = json.loads
+
+
+def endpoint_key(url):
+    """Normalise a URL to the scheme://host key used for pooling and health tracking"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+class RateLimitExceeded(requests.exceptions.RequestException):
+    """Raised when an upstream's budget would make a request wait longer than allowed"""
+
+
+class TokenBucket:
+    """Token bucket for one upstream: ``capacity`` units refilled evenly over ``period`` seconds"""
+
+    def __init__(self, capacity, period, max_wait=30.0):
+        self.capacity = float(capacity)
+        self.period = float(period)
+        self.max_wait = max_wait
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.throttled = 0  # consecutive throttle responses, drives the backoff
+
+    @property
+    def rate(self):
+        return self.capacity / self.period
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, weight, now):
+        """Seconds until ``weight`` units can be spent"""
+        self.refill(now)
+        wait = max(0.0, self.blocked_until - now)
+        if self.tokens < weight:
+            wait = max(wait, (weight - self.tokens) / self.rate)
+        return wait
+
+
+class RateLimitScheduler:
+    """Per-upstream token buckets that delay requests before a limit is hit and back off
+    (with jitter) when an upstream answers 429/418 or reports its used weight."""
+
+    # upstream: (host suffix, capacity, period seconds)
+    DEFAULT_LIMITS = {
+        "binance": ("binance.com", 4800, 60),        # 6000 weight/min, 20% headroom
+        "binance_us": ("binance.us", 960, 60),       # 1200 weight/min, 20% headroom
+        "coingecko": ("coingecko.com", 10, 60),      # Free/demo tier
+        "openrouter": ("openrouter.ai", 20, 60),
+        "newsapi": ("newsapi.org", 100, 86400),      # Developer plan: 100 requests/day
+    }
+
+    # Binance request weights by path (everything else costs 1)
+    BINANCE_WEIGHTS = {"/api/v3/klines": 2, "/api/v3/exchangeInfo": 20, "/api/v3/ticker/24hr": 2}
+
+    def __init__(self, limits=None, max_wait=30.0, backoff_base=1.0, backoff_cap=60.0):
+        self.limits = dict(self.DEFAULT_LIMITS if limits is None else limits)
+        self.max_wait = max_wait
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._buckets = {name: TokenBucket(capacity, period, max_wait)
+                         for name, (_, capacity, period) in self.limits.items()}
+        self._lock = threading.Lock()
+
+    def upstream_for(self, url):
+        host = urlsplit(url).hostname or ""
+        for name, (suffix, _, _) in self.limits.items():
+            if host == suffix or host.endswith("." + suffix):
+                return name
+        return None
+
+    def weight_for(self, url):
+        if self.upstream_for(url) in ("binance", "binance_us"):
+            return self.BINANCE_WEIGHTS.get(urlsplit(url).path, 1)
+        return 1
+
+    def acquire(self, url, weight=None):
+        """Block until the upstream has budget for this request; returns the time waited"""
+        name = self.upstream_for(url)
+        if name is None:
+            return 0.0
+        weight = self.weight_for(url) if weight is None else weight
+        bucket = self._buckets[name]
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = bucket.wait_time(weight, now)
+                if wait <= 0:
+                    bucket.tokens -= weight
+                    return waited
+                if waited + wait > bucket.max_wait:
+                    raise RateLimitExceeded(f"{name} rate limit: next slot in {wait:.1f}s")
+            # Jitter keeps queued threads from waking in lockstep
+            delay = wait + random.uniform(0, min(0.25, wait))
+            time.sleep(delay)
+            waited += delay
+
+    def observe(self, url, response):
+        """Update an upstream's budget from a response; returns True if the request was throttled"""
+        name = self.upstream_for(url)
+        if name is None:
+            return False
+        bucket = self._buckets[name]
+        headers = response.headers
+        with self._lock:
+            now = time.monotonic()
+            used = headers.get("X-MBX-USED-WEIGHT-1M") or headers.get("x-mbx-used-weight-1m")
+            if used is not None:
+                try:
+                    # Trust the server's count of what is left in its window
+                    bucket.refill(now)
+                    remaining = max(-bucket.capacity, bucket.capacity - float(used))
+                    bucket.tokens = min(bucket.tokens, remaining)
+                except ValueError:
+                    pass
+
+            if response.status_code not in (418, 429):
+                bucket.throttled = 0
+                return False
+
+            bucket.throttled += 1
+            retry_after = headers.get("Retry-After")
+            try:
+                delay = float(retry_after)
+            except (TypeError, ValueError):
+                delay = min(self.backoff_cap, self.backoff_base * (2 ** (bucket.throttled - 1)))
+            delay += random.uniform(0, delay * 0.1 + 0.1)
+            bucket.blocked_until = max(bucket.blocked_until, now + delay)
+            bucket.tokens = min(bucket.tokens, 0.0)
+            print(f"Rate limited by {name} ({response.status_code}), backing off {delay:.1f}s")
+            return True
+
+    def snapshot(self):
+        with self._lock:
+            now = time.monotonic()
+            result = {}
+            for name, bucket in self._buckets.items():
+                bucket.refill(now)
+                result[name] = {
+                    "tokens": round(bucket.tokens, 2),
+                    "capacity": bucket.capacity,
+                    "blocked_for": max(0.0, bucket.blocked_until - now),
+                    "throttled": bucket.throttled,
+                }
+            return result
+
+
+class SessionPool:
+    """Thread-safe registry of keep-alive sessions, one connection pool per upstream host"""
+
+    def __init__(self, pool_maxsize=10, pool_block=False, default_headers=None, scheduler=None,
+                 throttle_retries=2):
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.scheduler = scheduler  # None means the process-wide rate limiter
+        self.throttle_retries = throttle_retries
+        self.default_headers = {"Accept-Encoding": ACCEPT_ENCODING, "Connection": "keep-alive"}
+        if default_headers:
+            self.default_headers.update(default_headers)
+
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _build_session(self):
+        session = requests.Session()
+        # Retries are handled by the callers, so the adapter only pools connections
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block,
+            max_retries=0
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(self.default_headers)
+        return session
+
+    def get_session(self, url):
+        """Return the pooled session for the host of ``url``, creating it on first use"""
+        key = endpoint_key(url)
+        session = self._sessions.get(key)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(key)
+                if session is None:
+                    session = self._build_session()
+                    self._sessions[key] = session
+        return session
+
+    def request(self, method, url, weight=None, **kwargs):
+        """Send a request through the host's pooled session, respecting upstream rate limits.
+        
+        Throttled (429/418) responses are retried after the scheduler's backoff, up to
+        ``throttle_retries`` times; the last response is returned either way.
+        """
+        scheduler = self.scheduler or get_rate_limiter()
+        session = self.get_session(url)
+        for attempt in range(self.throttle_retries + 1):
+            scheduler.acquire(url, weight)
+            response = session.request(method, url, **kwargs)
+            if not scheduler.observe(url, response) or attempt == self.throttle_retries:
+                return response
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def hosts(self):
+        with self._lock:
+            return sorted(self._sessions)
+
+    def close(self):
+        """Close every pooled connection; the pool can still be reused afterwards"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class EndpointHealthRegistry:
+    """Per-endpoint success/failure/latency stats with a circuit breaker.
+
+    After ``failure_threshold`` consecutive failures (or a single 451 geo-block) the circuit
+    opens and the endpoint is skipped until its cooldown expires; the next call is then a
+    half-open trial that either closes the circuit or reopens it with a doubled cooldown.
+    """
+
+    unhealthy_statuses = (403, 408, 418, 429, 451)
+
+    def __init__(self, alpha=0.3, failure_threshold=3, cooldown=60.0, geo_block_cooldown=900.0,
+                 max_cooldown=3600.0, failure_penalty=5.0, window=100, default_latency=1.0):
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.geo_block_cooldown = geo_block_cooldown
+        self.max_cooldown = max_cooldown
+        self.failure_penalty = failure_penalty  # seconds added to the score per recent failure
+        self.window = window
+        self.default_latency = default_latency
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, endpoint):
+        entry = self._stats.get(endpoint)
+        if entry is None:
+            entry = {"ewma": None, "samples": deque(maxlen=self.window),
+                     "successes": 0, "failures": 0, "consecutive_failures": 0,
+                     "last_status": None, "last_error": None, "last_used": None,
+                     "open_until": 0.0, "opened": 0}
+            self._stats[endpoint] = entry
+        return entry
+
+    def _open_circuit(self, entry, cooldown):
+        # Repeated trips back off exponentially
+        duration = min(self.max_cooldown, cooldown * (2 ** min(entry["opened"], 6)))
+        entry["open_until"] = time.time() + duration
+        entry["opened"] += 1
+
+    def record_success(self, endpoint, latency, status_code=200):
+        with self._lock:
+            entry = self._entry(endpoint)
+            entry["ewma"] = latency if entry["ewma"] is None else (
+                self.alpha * latency + (1 - self.alpha) * entry["ewma"])
+            entry["samples"].append(latency)
+            entry["successes"] += 1
+            entry["consecutive_failures"] = 0
+            entry["last_status"] = status_code
+            entry["last_used"] = time.time()
+            entry["open_until"] = 0.0
+            entry["opened"] = 0
+
+    def record_failure(self, endpoint, latency=None, status_code=None, error=None):
+        with self._lock:
+            entry = self._entry(endpoint)
+            if latency is not None:
+                entry["samples"].append(latency)
+            entry["last_status"] = status_code
+            entry["last_error"] = str(error) if error is not None else None
+            entry["last_used"] = time.time()
+            if status_code is not None and 400 <= status_code < 500 and status_code not in self.unhealthy_statuses:
+                return  # Client errors (bad symbol, bad params) say nothing about endpoint health
+            entry["failures"] += 1
+            entry["consecutive_failures"] += 1
+            if status_code == 451:
+                self._open_circuit(entry, self.geo_block_cooldown)
+            elif entry["consecutive_failures"] >= self.failure_threshold:
+                self._open_circuit(entry, self.cooldown)
+
+    def is_available(self, endpoint):
+        """False while the endpoint's circuit is open"""
+        with self._lock:
+            entry = self._stats.get(endpoint)
+            return entry is None or time.time() >= entry["open_until"]
+
+    def score(self, endpoint):
+        """Expected cost of using an endpoint in seconds (lower is better)"""
+        with self._lock:
+            entry = self._stats.get(endpoint)
+            if entry is None:
+                return self.default_latency
+            ewma = entry["ewma"] if entry["ewma"] is not None else self.default_latency
+            return ewma + entry["consecutive_failures"] * self.failure_penalty
+
+    def rank(self, endpoints, include_open=False):
+        """Order endpoints fastest-healthy first (configured order breaks ties); open circuits are
+        dropped unless ``include_open`` is set, in which case they go last"""
+        order = {endpoint: i for i, endpoint in enumerate(endpoints)}
+        available = [e for e in endpoints if self.is_available(e)]
+        ranked = sorted(available, key=lambda e: (self.score(e), order[e]))
+        if include_open:
+            ranked += [e for e in endpoints if e not in available]
+        return ranked
+
+    def reset(self, endpoint=None):
+        with self._lock:
+            if endpoint is None:
+                self._stats.clear()
+            else:
+                self._stats.pop(endpoint, None)
+
+    def snapshot(self):
+        """Debug view of every tracked endpoint"""
+        now = time.time()
+        with self._lock:
+            result = {}
+            for endpoint, entry in self._stats.items():
+                samples = sorted(entry["samples"])
+                p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))] if samples else None
+                result[endpoint] = {
+                    "state": "open" if now < entry["open_until"] else "closed",
+                    "retry_in": max(0.0, entry["open_until"] - now),
+                    "ewma_latency": entry["ewma"],
+                    "p99_latency": p99,
+                    "successes": entry["successes"],
+                    "failures": entry["failures"],
+                    "consecutive_failures": entry["consecutive_failures"],
+                    "last_status": entry["last_status"],
+                    "last_error": entry["last_error"],
+                }
+            return result
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_session_pool():
+    """Return the process-wide session pool shared by analyzers and API helpers"""
+    global _default_pool
+    if _default_pool is None:
+        with _default_pool_lock:
+            if _default_pool is None:
+                _default_pool = SessionPool()
+    return _default_pool
+
+
+def configure_session_pool(pool_maxsize=10, pool_block=False, default_headers=None, scheduler=None):
+    """Replace the shared pool with one using the given sizes, closing the old one"""
+    global _default_pool
+    with _default_pool_lock:
+        old_pool = _default_pool
+        _default_pool = SessionPool(pool_maxsize=pool_maxsize, pool_block=pool_block,
+                                    default_headers=default_headers, scheduler=scheduler)
+    if old_pool is not None:
+        old_pool.close()
+    return _default_pool
+
+
+_health_registry = EndpointHealthRegistry()
+_rate_limiter = RateLimitScheduler()
+
+
+def get_health_registry():
+    """Return the process-wide endpoint health registry so every analyzer learns from past calls"""
+    return _health_registry
+
+
+def get_rate_limiter():
+    """Return the process-wide rate limiter shared by every session pool"""
+    return _rate_limiter
+
+
+def close_session_pool():
+    """Close the shared pool's connections (safe to call more than once)"""
+    if _default_pool is not None:
+        _default_pool.close()
+
+
+atexit.register(close_session_pool)
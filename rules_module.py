@@ -0,0 +1,315 @@
+import ast
+import hashlib
+import json
+import os
+import string
+import threading
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+try:
+    import yaml
+except ImportError:  # Rule files are read as JSON only
+    yaml = None
+
+from candle_store_module import OHLCV_COLUMNS
+from confluence_module import CONFLUENCE_RULES, CONFLUENCE_TEXT, DIRECTIONS, STRENGTH_LABELS, Confluence
+from indicators_module import INDICATOR_COLUMNS
+
+DEFAULT_RULES_FILE = os.environ.get("NUNNO_CONFLUENCE_RULES", "confluence_rules.json")
+
+# Columns a rule condition or text template may name
+RULE_COLUMNS = frozenset(OHLCV_COLUMNS) | frozenset(INDICATOR_COLUMNS)
+
+# Text keys of the built-in records, which custom rule ids may not reuse
+_BUILTIN_TEXT_KEYS = frozenset(CONFLUENCE_TEXT)
+
+RULE_KEYS = {"id", "direction", "strength", "when", "indicator", "condition", "implication", "timeframe", "step"}
+
+_STRENGTH_LEVELS = {label: level for level, label in STRENGTH_LABELS.items()}
+
+
+class RuleError(ValueError):
+    """Raised for a rule file or rule definition that cannot be compiled"""
+
+_COMPARISONS = {ast.Lt: np.less, ast.LtE: np.less_equal, ast.Gt: np.greater, ast.GtE: np.greater_equal,
+                ast.Eq: np.equal, ast.NotEq: np.not_equal}
+_ARITHMETIC = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.divide}
+_FUNCTIONS = {"abs": (np.abs, 1), "min": (np.minimum, 2), "max": (np.maximum, 2)}
+
+
+def _shift(values, periods):
+    """``values`` ``periods`` bars earlier along the time (last) axis, NaN before the first bar"""
+    values = np.asarray(values, dtype=np.float64)
+    shifted = np.full(values.shape, np.nan)
+    if periods < values.shape[-1]:
+        shifted[..., periods:] = values[..., :values.shape[-1] - periods]
+    return shifted
+
+
+def compile_condition(source):
+    """Compile a rule condition such as ``"RSI_14 < 30 and prev(MACD_Histogram) < 0 < MACD_Histogram"``.
+
+    Conditions are Python expressions restricted to column names, numbers, comparisons (chains
+    included), and/or/not, + - * /, abs/min/max and prev(expr, bars=1) (the value ``bars``
+    candles earlier). Returns (evaluator, columns read, bars of lookback); the evaluator maps
+    {column: array} to a boolean array of the same shape, any leading axes (symbols) included.
+    """
+    try:
+        tree = ast.parse(source.strip(), mode="eval")
+    except SyntaxError as e:
+        raise RuleError(f"Invalid rule condition {source!r}: {e.msg}") from None
+    columns = set()
+
+    def build(node):
+        """(evaluator, lookback) of one expression node"""
+        if isinstance(node, ast.BoolOp):
+            parts = [build(value) for value in node.values]
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            funcs = [func for func, _ in parts]
+            return (lambda x: reduce(combine, (func(x) for func in funcs))), max(n for _, n in parts)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.Not, ast.USub)):
+            func, lookback = build(node.operand)
+            op = np.logical_not if isinstance(node.op, ast.Not) else np.negative
+            return (lambda x: op(func(x))), lookback
+        if isinstance(node, ast.Compare) and all(type(op) in _COMPARISONS for op in node.ops):
+            parts = [build(operand) for operand in [node.left] + node.comparators]
+            funcs = [func for func, _ in parts]
+            ops = [_COMPARISONS[type(op)] for op in node.ops]
+
+            def compare(x):
+                values = [func(x) for func in funcs]
+                return reduce(np.logical_and, (op(values[i], values[i + 1]) for i, op in enumerate(ops)))
+            return compare, max(n for _, n in parts)
+        if isinstance(node, ast.BinOp) and type(node.op) in _ARITHMETIC:
+            (left, n_left), (right, n_right) = build(node.left), build(node.right)
+            op = _ARITHMETIC[type(node.op)]
+            return (lambda x: op(left(x), right(x))), max(n_left, n_right)
+        if isinstance(node, ast.Name):
+            if node.id not in RULE_COLUMNS:
+                raise RuleError(f"Unknown column {node.id!r} in rule condition {source!r}")
+            columns.add(node.id)
+            return (lambda x: x[node.id]), 0
+        if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+            return (lambda x: node.value), 0
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+            name, args = node.func.id, node.args
+            if name == "prev" and len(args) in (1, 2):
+                # The lookback must be a literal: prev(x, 0) or prev(x, -1) would read the current or future bars
+                if len(args) == 2 and not (isinstance(args[1], ast.Constant) and type(args[1].value) is int
+                                           and args[1].value >= 1):
+                    raise RuleError(f"prev() needs a positive integer literal for bars, got "
+                                    f"{ast.unparse(args[1])!r} in rule condition {source!r}")
+                bars = args[1].value if len(args) == 2 else 1
+                if not any(isinstance(n, ast.Name) and n.id in RULE_COLUMNS for n in ast.walk(args[0])):
+                    raise RuleError(f"prev() of an expression without columns in rule condition {source!r}")
+                func, lookback = build(args[0])
+                return (lambda x: _shift(func(x), bars)), lookback + bars
+            if name in _FUNCTIONS and len(args) == _FUNCTIONS[name][1]:
+                op = _FUNCTIONS[name][0]
+                parts = [build(arg) for arg in args]
+                funcs = [func for func, _ in parts]
+                return (lambda x: op(*(func(x) for func in funcs))), max(n for _, n in parts)
+        raise RuleError(f"Unsupported expression {ast.unparse(node)!r} in rule condition {source!r}")
+
+    evaluator, lookback = build(tree.body)
+    return evaluator, frozenset(columns), lookback
+
+
+def _positional_template(template, fields, rule_id):
+    """Rewrite '{RSI_14:.1f}' fields as positions into ``fields`` (extended in place); {direction} stays"""
+    parts = []
+    try:
+        parsed = list(string.Formatter().parse(template))
+    except ValueError as e:
+        raise RuleError(f"Invalid text template in rule {rule_id!r}: {e}") from None
+    for literal, field, spec, conversion in parsed:
+        parts.append(literal.replace("{", "{{").replace("}", "}}"))
+        if field is None:
+            continue
+        if field != "direction":
+            if field not in RULE_COLUMNS:
+                raise RuleError(f"Unknown column {field!r} in the text of rule {rule_id!r}")
+            if field not in fields:
+                fields.append(field)
+            field = str(fields.index(field))
+        parts.append("{" + field + (f"!{conversion}" if conversion else "") + (f":{spec}" if spec else "") + "}")
+    return "".join(parts)
+
+
+class CompiledRule:
+    """One declarative confluence rule with its condition compiled to a NumPy evaluator"""
+
+    def __init__(self, spec):
+        if not isinstance(spec, dict):
+            raise RuleError(f"A rule must be a mapping, got {spec!r}")
+        unknown = set(spec) - RULE_KEYS
+        missing = {"id", "direction", "strength", "when", "condition"} - set(spec)
+        rule_id = spec.get("id", "?")
+        problems = ([f"unknown keys {', '.join(sorted(unknown))}"] if unknown else []) + \
+                   ([f"missing keys {', '.join(sorted(missing))}"] if missing else [])
+        if problems:
+            raise RuleError(f"Rule {rule_id!r}: {'; '.join(problems)}")
+        if spec["direction"] not in DIRECTIONS:
+            raise RuleError(f"Rule {rule_id!r}: direction must be one of {', '.join(DIRECTIONS)}")
+        if spec["strength"] not in _STRENGTH_LEVELS:
+            raise RuleError(f"Rule {rule_id!r}: strength must be one of {', '.join(_STRENGTH_LEVELS)}")
+
+        self.id = str(rule_id)
+        self.direction = spec["direction"]
+        self.level = _STRENGTH_LEVELS[spec["strength"]]
+        self.step = spec.get("step", "custom")
+        self.indicator = spec.get("indicator", self.id)
+        self.when = spec["when"]
+        self._evaluate, self.columns, self.lookback = compile_condition(self.when)
+        if not self.columns:
+            raise RuleError(f"Rule {self.id!r}: the condition reads no columns, so it would fire on every bar or none")
+        # Columns the text quotes, stored on each Confluence record as its value(s)
+        fields = []
+        self.text = (self.indicator, _positional_template(spec["condition"], fields, self.id),
+                     _positional_template(spec.get("implication", ""), fields, self.id), spec.get("timeframe", ""))
+        self.text_columns = tuple(fields)
+
+    def __repr__(self):
+        return f"CompiledRule({self.id!r}, {self.direction!r}, {STRENGTH_LABELS[self.level]!r}, {self.when!r})"
+
+    def mask(self, x):
+        """Boolean array of the bars (along the last axis of the ``x`` arrays) where the rule fires"""
+        # Constant parts of the condition (e.g. "ADX > 20 or 1 > 0") still give one value per bar
+        shape = np.shape(x[next(iter(self.columns))])
+        with np.errstate(all="ignore"):
+            return np.broadcast_to(self._evaluate(x), shape)
+
+    def levels(self, x):
+        """int8 strength level where the rule fires, 0 elsewhere"""
+        return np.where(self.mask(x), self.level, 0).astype(np.int8)
+
+    def record(self, x, bar=-1):
+        """Confluence record of this rule for one bar of ``x``"""
+        values = tuple(x[col][..., bar] for col in self.text_columns)
+        return Confluence(self.id, self.direction, self.level, values[0] if len(values) == 1 else values or None,
+                          self.text)
+
+
+class RuleSet:
+    """Compiled custom confluence rules, evaluated next to the built-in analyze_*_confluence rules.
+
+    Each rule keeps its own text templates and hands them to its Confluence records, which render
+    like the built-in ones; nothing is registered globally.
+    """
+
+    def __init__(self, specs, source=None):
+        self.rules = [CompiledRule(spec) for spec in specs]
+        self.source = source
+        ids = [rule.id for rule in self.rules]
+        duplicates = sorted({rule_id for rule_id in ids if ids.count(rule_id) > 1})
+        if duplicates:
+            raise RuleError(f"Duplicate rule ids: {', '.join(duplicates)}")
+        reserved = {rule[0] for rule in CONFLUENCE_RULES} | set(_BUILTIN_TEXT_KEYS)
+        clashes = sorted(set(ids) & reserved)
+        if clashes:
+            raise RuleError(f"Rule ids clash with built-in rules: {', '.join(clashes)}")
+
+        # Columns the conditions read or the texts quote
+        self.columns = frozenset().union(*(rule.columns | set(rule.text_columns) for rule in self.rules))
+        self.lookback = max((rule.lookback for rule in self.rules), default=0)
+        self.fingerprint = hashlib.sha1(json.dumps(specs, sort_keys=True, default=str).encode()).hexdigest()
+
+    def __len__(self):
+        return len(self.rules)
+
+    def __iter__(self):
+        return iter(self.rules)
+
+    @property
+    def indicator_columns(self):
+        """Indicator (non-OHLCV) columns the rules read, in INDICATOR_COLUMNS order"""
+        return [col for col in INDICATOR_COLUMNS if col in self.columns]
+
+    def _tail(self, df, rows=None):
+        # The last bar plus the lookback prev() needs (default), upcast like evaluate_confluences
+        missing = self.columns - set(df.columns)
+        if missing:
+            raise ValueError(f"Missing indicator columns for custom rules: {', '.join(sorted(missing))}")
+        rows = rows or self.lookback + 1
+        return {col: df[col].to_numpy()[-rows:].astype(np.float64) for col in self.columns}
+
+    def evaluate(self, df):
+        """int8 (direction, rule, bar) strength levels of these rules alone over all bars of ``df``"""
+        x = self._tail(df, len(df))
+        levels = np.zeros((len(DIRECTIONS), len(self.rules), len(df)), dtype=np.int8)
+        for r, rule in enumerate(self.rules):
+            levels[DIRECTIONS.index(rule.direction), r] = rule.levels(x)
+        return levels
+
+    def apply(self, df, confluences):
+        """Append Confluence records of the rules firing on the last bar of indicator frame ``df``"""
+        x = self._tail(df)
+        for rule in self.rules:
+            if rule.mask(x)[..., -1]:
+                confluences[rule.direction].append(rule.record(x))
+        return confluences
+
+    def scan(self, frames):
+        """Strength levels of every rule on the latest bar of each {symbol: indicator frame}.
+
+        The tails of all frames are stacked into (symbols, bars) arrays, so each rule runs once for
+        the whole watchlist. Returns a symbols x rule ids frame (0 = silent).
+        """
+        rows = self.lookback + 1
+        symbols = list(frames)
+        x = {}
+        for col in self.columns:
+            panel = np.full((len(symbols), rows), np.nan)
+            for i, symbol in enumerate(symbols):
+                tail = frames[symbol][col].to_numpy()[-rows:]
+                panel[i, rows - len(tail):] = tail
+            x[col] = panel
+        levels = {rule.id: rule.levels(x)[:, -1] for rule in self.rules}
+        return pd.DataFrame(levels, index=pd.Index(symbols, name="symbol"), columns=[rule.id for rule in self.rules])
+
+
+def load_rules(path):
+    """RuleSet from a rule file: JSON (or YAML with PyYAML installed), {"rules": [...]} or a bare list"""
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise RuleError("YAML rule files need PyYAML; use JSON or install it")
+            try:
+                payload = yaml.safe_load(f)
+            except yaml.YAMLError as e:
+                raise RuleError(f"{path}: {e}") from None
+        else:
+            payload = json.load(f)
+    specs = payload.get("rules") if isinstance(payload, dict) else payload
+    if not isinstance(specs, list):
+        raise RuleError(f"{path}: expected a list of rules")
+    return RuleSet(specs, source=path)
+
+
+_default_rules = None  # (path, mtime, RuleSet or None)
+_default_rules_lock = threading.Lock()
+
+
+def get_custom_rules(path=None):
+    """Rules of DEFAULT_RULES_FILE (reloaded when the file changes), or None when there is no file.
+
+    A file that fails to load is reported and ignored, so a bad edit never stops the analysis.
+    """
+    global _default_rules
+    path = path or DEFAULT_RULES_FILE
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    with _default_rules_lock:
+        if _default_rules is None or _default_rules[:2] != (path, mtime):
+            try:
+                rules = load_rules(path)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Ignoring custom confluence rules in {path}: {str(e)}")
+                rules = None
+            _default_rules = (path, mtime, rules)
+        return _default_rules[2]
@@ -0,0 +1,564 @@
+"""Live Binance kline streaming with REST catch-up.
+
+A small standard-library WebSocket client (RFC 6455) keeps one rolling candle window per
+symbol/interval pair up to date from Binance's combined kline streams. After every
+(re)connect the windows are caught up through the REST klines path, so a dropped
+connection never leaves a hole. ``LocalKlineStreamServer`` speaks the same protocol and
+message format for offline testing.
+"""
+import base64
+import hashlib
+import json
+import os
+import queue
+import random
+import select
+import socket
+import socketserver
+import ssl
+import struct
+import threading
+import time
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+
+from candle_store_module import arrays_to_frame, interval_to_ms
+from indicators_module import IncrementalIndicators
+
+BINANCE_STREAM_URL = "wss://stream.binance.com:9443"
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OP_CONT, OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG = 0x0, 0x1, 0x2, 0x8, 0x9, 0xA
+
+
+class WebSocketClosed(Exception):
+    """The peer closed the WebSocket connection"""
+
+
+def _accept_key(key):
+    return base64.b64encode(hashlib.sha1((key + _WS_GUID).encode()).digest()).decode()
+
+
+def _recv_exact(sock, n):
+    chunks = []
+    while n:
+        chunk = sock.recv(n)
+        if not chunk:
+            raise WebSocketClosed("Connection closed by peer")
+        chunks.append(chunk)
+        n -= len(chunk)
+    return b"".join(chunks)
+
+
+def _mask(payload, mask):
+    if not payload:
+        return payload
+    repeated = (mask * (len(payload) // 4 + 1))[:len(payload)]
+    return (int.from_bytes(payload, "big") ^ int.from_bytes(repeated, "big")).to_bytes(len(payload), "big")
+
+
+def _encode_frame(opcode, payload, masked):
+    header = bytearray([0x80 | opcode])
+    length = len(payload)
+    mask_bit = 0x80 if masked else 0
+    if length < 126:
+        header.append(mask_bit | length)
+    elif length < 65536:
+        header.append(mask_bit | 126)
+        header += struct.pack("!H", length)
+    else:
+        header.append(mask_bit | 127)
+        header += struct.pack("!Q", length)
+    if masked:
+        mask = os.urandom(4)
+        return bytes(header) + mask + _mask(payload, mask)
+    return bytes(header) + payload
+
+
+def _read_frame(sock):
+    """Read one frame: returns (fin, opcode, payload)"""
+    first, second = _recv_exact(sock, 2)
+    fin, opcode = first & 0x80, first & 0x0F
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", _recv_exact(sock, 2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", _recv_exact(sock, 8))[0]
+    mask = _recv_exact(sock, 4) if second & 0x80 else None
+    payload = _recv_exact(sock, length) if length else b""
+    if mask:
+        payload = _mask(payload, mask)
+    return bool(fin), opcode, payload
+
+
+class WebSocketConnection:
+    """Minimal WebSocket client/server endpoint over a connected socket"""
+
+    def __init__(self, sock, is_client=True):
+        self.sock = sock
+        self.is_client = is_client
+        self._send_lock = threading.Lock()
+        self.closed = False
+
+    @classmethod
+    def connect(cls, url, timeout=10):
+        parts = urlsplit(url)
+        secure = parts.scheme == "wss"
+        port = parts.port or (443 if secure else 80)
+        sock = socket.create_connection((parts.hostname, port), timeout=timeout)
+        if secure:
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=parts.hostname)
+
+        key = base64.b64encode(os.urandom(16)).decode()
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        request = (
+            f"GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\nUpgrade: websocket\r\n"
+            f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+        )
+        sock.sendall(request.encode())
+
+        response = b""
+        while b"\r\n\r\n" not in response:
+            chunk = sock.recv(1024)
+            if not chunk:
+                raise WebSocketClosed("Handshake failed: connection closed")
+            response += chunk
+        head = response.split(b"\r\n\r\n", 1)[0].decode(errors="replace")
+        status_line, *header_lines = head.split("\r\n")
+        headers = {k.strip().lower(): v.strip() for k, v in
+                   (line.split(":", 1) for line in header_lines if ":" in line)}
+        if " 101 " not in status_line + " " or headers.get("sec-websocket-accept") != _accept_key(key):
+            sock.close()
+            raise WebSocketClosed(f"Handshake rejected: {status_line}")
+        return cls(sock, is_client=True)
+
+    def send(self, opcode, payload):
+        with self._send_lock:
+            self.sock.sendall(_encode_frame(opcode, payload, masked=self.is_client))
+
+    def send_text(self, text):
+        self.send(OP_TEXT, text.encode())
+
+    def readable(self, timeout):
+        if isinstance(self.sock, ssl.SSLSocket) and self.sock.pending():
+            return True
+        return bool(select.select([self.sock], [], [], timeout)[0])
+
+    def recv(self, timeout=None):
+        """Return the next text/binary message, None on timeout; answers pings transparently"""
+        message = b""
+        while True:
+            if not message and timeout is not None and not self.readable(timeout):
+                return None
+            fin, opcode, payload = _read_frame(self.sock)
+            if opcode == OP_PING:
+                self.send(OP_PONG, payload)
+                continue
+            if opcode == OP_PONG:
+                continue
+            if opcode == OP_CLOSE:
+                self.close()
+                raise WebSocketClosed("Close frame received")
+            message += payload
+            if fin:
+                return message.decode() if opcode in (OP_TEXT, OP_CONT) else message
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.send(OP_CLOSE, struct.pack("!H", 1000))
+        except OSError:
+            pass
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RollingCandleWindow:
+    """Fixed-size OHLCV window backed by NumPy buffers; appends and in-place updates are O(1)"""
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self._times = np.empty(capacity * 2, dtype=np.int64)
+        self._values = np.empty((capacity * 2, 5), dtype=np.float64)
+        self._start = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._end - self._start
+
+    def last_open_time(self):
+        with self._lock:
+            return int(self._times[self._end - 1]) if self._end > self._start else None
+
+    def _append(self, open_time, values):
+        if self._end == len(self._times):
+            # Compact: keep the newest capacity - 1 rows at the front of the buffer
+            keep = self.capacity - 1
+            self._times[:keep] = self._times[self._end - keep:self._end]
+            self._values[:keep] = self._values[self._end - keep:self._end]
+            self._start, self._end = 0, keep
+        self._times[self._end] = open_time
+        self._values[self._end] = values
+        self._end += 1
+        if self._end - self._start > self.capacity:
+            self._start += 1
+
+    def update(self, open_time, values):
+        """Apply one candle: a newer open time appends, the current one is updated in place"""
+        with self._lock:
+            if self._end == self._start or open_time > self._times[self._end - 1]:
+                self._append(open_time, values)
+            elif open_time == self._times[self._end - 1]:
+                self._values[self._end - 1] = values
+            else:
+                i = self._start + np.searchsorted(self._times[self._start:self._end], open_time)
+                if i < self._end and self._times[i] == open_time:
+                    self._values[i] = values
+
+    def merge(self, open_times, values):
+        """Merge a batch (e.g. a REST catch-up), newest data winning on duplicate open times"""
+        with self._lock:
+            times = np.concatenate([self._times[self._start:self._end], open_times])
+            rows = np.concatenate([self._values[self._start:self._end], values])
+            # Keep the last occurrence of each open time
+            order = np.argsort(times, kind="stable")
+            times, rows = times[order], rows[order]
+            last = np.append(times[1:] != times[:-1], True)
+            times, rows = times[last][-self.capacity:], rows[last][-self.capacity:]
+            n = len(times)
+            self._times[:n] = times
+            self._values[:n] = rows
+            self._start, self._end = 0, n
+
+    def to_frame(self, limit=None):
+        with self._lock:
+            start = self._start if limit is None else max(self._start, self._end - limit)
+            return arrays_to_frame(self._times[start:self._end].copy(), self._values[start:self._end].copy())
+
+
+class KlineStream:
+    """Keeps rolling kline windows for (symbol, interval) pairs fed by Binance's WebSocket streams.
+
+    ``analyzer`` provides the REST catch-up path (``_fetch_binance_klines_raw`` and
+    ``_parse_binance_response``) and, if it has one, a candle store for closed candles.
+    """
+
+    def __init__(self, analyzer, pairs, window=1000, url=BINANCE_STREAM_URL, idle_timeout=90,
+                 reconnect_delay=1.0, max_reconnect_delay=60.0, track_indicators=False):
+        self.analyzer = analyzer
+        self.pairs = [(symbol.upper(), interval) for symbol, interval in pairs]
+        self.window_size = window
+        self.url = url.rstrip("/")
+        self.idle_timeout = idle_timeout
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+
+        self.windows = {pair: RollingCandleWindow(window) for pair in self.pairs}
+        # Incremental indicator state per pair: closed candles commit, the live one is only scored
+        self.track_indicators = track_indicators
+        self.indicator_states = {}
+        self.live_indicators = {}
+        self.connected = False
+        self.last_message = 0.0
+        self.reconnects = 0
+        self.messages = 0
+        self._connection = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def stream_url(self):
+        streams = "/".join(f"{symbol.lower()}@kline_{interval}" for symbol, interval in self.pairs)
+        return f"{self.url}/stream?streams={streams}"
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="kline-stream", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._connection is not None:
+            self._connection.close()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.connected = False
+
+    def is_live(self):
+        return self.connected and time.time() - self.last_message < self.idle_timeout
+
+    def wait_until_ready(self, timeout=10):
+        """Block until connected and every window holds data (returns False on timeout)"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.connected and all(len(w) for w in self.windows.values()):
+                return True
+            time.sleep(0.05)
+        return False
+
+    def has(self, symbol, interval):
+        return (symbol.upper(), interval) in self.windows
+
+    def get_frame(self, symbol, interval, limit=None):
+        return self.windows[(symbol.upper(), interval)].to_frame(limit)
+
+    def get_indicators(self, symbol, interval):
+        """Indicator values for the newest (possibly still forming) candle, or None"""
+        return self.live_indicators.get((symbol.upper(), interval))
+
+    def _update_indicators(self, pair, open_time, values, closed):
+        state = self.indicator_states.get(pair)
+        if state is None or (state.last_open_time is not None and
+                             open_time - state.last_open_time > interval_to_ms(pair[1])):
+            # First candle or a gap was backfilled: rebuild the state from the window
+            history = self.windows[pair].to_frame()
+            history = history[history.index.values.astype("datetime64[ms]").astype(np.int64) < open_time]
+            state = self.indicator_states[pair] = IncrementalIndicators.from_frame(history)
+        self.live_indicators[pair] = state.update(open_time, *values, final=closed)
+
+    def catch_up(self, symbol, interval, page_size=1000):
+        """Fill the window from REST: every candle since its last one, paged forward to the present.
+
+        An empty window, or one further behind than it can hold, takes the newest full window instead.
+        """
+        window = self.windows[(symbol, interval)]
+        last = window.last_open_time()
+        interval_ms = interval_to_ms(interval)
+        now = int(time.time() * 1000)
+        if last is None or (now - last) // interval_ms >= self.window_size:
+            pages = [self.analyzer._fetch_binance_klines_raw(symbol, interval, self.window_size)]
+        else:
+            pages, start = [], last
+            while True:
+                data = self.analyzer._fetch_binance_klines_raw(symbol, interval, page_size, start_time=start)
+                pages.append(data)
+                if not data or len(data) < page_size or int(data[-1][0]) >= now - interval_ms:
+                    break
+                start = int(data[-1][0]) + interval_ms
+        rows = [row for data in pages if data for row in data]
+        if not rows:
+            print(f"⚠️ REST catch-up failed for {symbol} ({interval})")
+            return 0
+        if not pages[-1]:
+            print(f"⚠️ REST catch-up for {symbol} ({interval}) stopped after {len(rows)} candles")
+        df = self.analyzer._parse_binance_response(rows)
+        window.merge(df.index.values.astype("datetime64[ms]").astype(np.int64), df.to_numpy())
+        store = getattr(self.analyzer, "candle_store", None)
+        if store is not None:
+            store.upsert(symbol, interval, df)
+        return len(df)
+
+    def _handle_message(self, message):
+        payload = json.loads(message)
+        data = payload.get("data", payload)
+        if data.get("e") != "kline":
+            return
+        kline = data["k"]
+        pair = (data["s"].upper(), kline["i"])
+        window = self.windows.get(pair)
+        if window is None:
+            return
+
+        open_time = int(kline["t"])
+        last = window.last_open_time()
+        if last is not None and open_time - last > interval_to_ms(pair[1]):
+            # Missed candles between the window and this message: backfill them first
+            self.catch_up(*pair)
+
+        values = [float(kline["o"]), float(kline["h"]), float(kline["l"]), float(kline["c"]), float(kline["v"])]
+        window.update(open_time, values)
+        if self.track_indicators:
+            self._update_indicators(pair, open_time, values, bool(kline.get("x")))
+        if kline.get("x"):
+            store = getattr(self.analyzer, "candle_store", None)
+            if store is not None:
+                store.upsert(pair[0], pair[1], window.to_frame(1))
+
+    def _process(self, messages):
+        """Worker thread of one connection: REST catch-up first, then the frames buffered meanwhile.
+
+        Kept off the receive thread so pings are still answered while a slow catch-up runs.
+        """
+        try:
+            # Catch up after every (re)connect so a dropped stream never leaves a gap
+            for symbol, interval in self.pairs:
+                if self._stop.is_set():
+                    return
+                self.catch_up(symbol, interval)
+            self.connected = True
+            print(f"📡 Kline stream connected ({len(self.pairs)} pairs)")
+            while True:
+                message = messages.get()
+                if message is None:
+                    return
+                try:
+                    self._handle_message(message)
+                except Exception as e:
+                    print(f"Kline stream message error: {str(e)}")
+        finally:
+            self.connected = False
+
+    def _run(self):
+        delay = self.reconnect_delay
+        while not self._stop.is_set():
+            messages = queue.Queue()
+            processor = threading.Thread(target=self._process, args=(messages,), name="kline-stream-process",
+                                         daemon=True)
+            try:
+                self._connection = WebSocketConnection.connect(self.stream_url())
+                self.last_message = time.time()
+                delay = self.reconnect_delay
+                processor.start()
+
+                while not self._stop.is_set():
+                    message = self._connection.recv(timeout=1.0)
+                    if message is None:
+                        if time.time() - self.last_message > self.idle_timeout:
+                            raise WebSocketClosed("Stream idle, reconnecting")
+                        continue
+                    self.last_message = time.time()
+                    self.messages += 1
+                    messages.put(message)
+            except Exception as e:
+                if not self._stop.is_set():
+                    print(f"Kline stream error: {str(e)}")
+            finally:
+                if self._connection is not None:
+                    self._connection.close()
+                if processor.is_alive():
+                    # Let the worker finish its catch-up and buffered frames before reconnecting
+                    messages.put(None)
+                    processor.join()
+                self.connected = False
+
+            if self._stop.is_set():
+                break
+            self.reconnects += 1
+            self._stop.wait(delay + random.uniform(0, delay * 0.2))
+            delay = min(self.max_reconnect_delay, delay * 2)
+
+
+class LocalKlineStreamServer:
+    """Local stand-in for Binance's combined kline stream endpoint (``/stream?streams=...``).
+
+    Tests push candles with ``push_kline`` and simulate outages with ``drop_connections``.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self._clients = []
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                server._serve_client(self.request)
+
+        self._server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"ws://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="local-kline-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.drop_connections()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def client_count(self):
+        with self._lock:
+            return len(self._clients)
+
+    def _serve_client(self, sock):
+        request = b""
+        while b"\r\n\r\n" not in request:
+            chunk = sock.recv(1024)
+            if not chunk:
+                return
+            request += chunk
+        lines = request.decode(errors="replace").split("\r\n")
+        path = lines[0].split(" ")[1]
+        headers = {k.strip().lower(): v.strip() for k, v in (l.split(":", 1) for l in lines[1:] if ":" in l)}
+        streams = set(parse_qs(urlsplit(path).query).get("streams", [""])[0].split("/"))
+        sock.sendall((
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {_accept_key(headers.get('sec-websocket-key', ''))}\r\n\r\n"
+        ).encode())
+
+        connection = WebSocketConnection(sock, is_client=False)
+        client = (connection, streams)
+        with self._lock:
+            self._clients.append(client)
+        try:
+            while not connection.closed:
+                connection.recv()  # Answers pings; returns on close or error
+        except (WebSocketClosed, OSError):
+            pass
+        finally:
+            with self._lock:
+                if client in self._clients:
+                    self._clients.remove(client)
+
+    def push_kline(self, symbol, interval, open_time, open_, high, low, close, volume, closed=False):
+        """Broadcast one kline event to every client subscribed to symbol@kline_interval"""
+        stream = f"{symbol.lower()}@kline_{interval}"
+        interval_ms = interval_to_ms(interval)
+        event = {
+            "stream": stream,
+            "data": {
+                "e": "kline", "E": int(time.time() * 1000), "s": symbol.upper(),
+                "k": {"t": int(open_time), "T": int(open_time) + interval_ms - 1, "s": symbol.upper(),
+                      "i": interval, "o": str(open_), "h": str(high), "l": str(low), "c": str(close),
+                      "v": str(volume), "x": bool(closed)},
+            },
+        }
+        message = json.dumps(event)
+        with self._lock:
+            clients = [c for c in self._clients if stream in c[1]]
+        for connection, _ in clients:
+            try:
+                connection.send_text(message)
+            except OSError:
+                pass
+        return len(clients)
+
+    def drop_connections(self):
+        """Abruptly close every client connection (simulates a network drop)"""
+        with self._lock:
+            clients = list(self._clients)
+            self._clients.clear()
+        for connection, _ in clients:
+            try:
+                connection.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            connection.sock.close()
+
+
+_active_stream = None
+
+
+def get_active_kline_stream():
+    """The process-wide stream started through TradingAnalyzer.start_streaming, if any"""
+    return _active_stream
+
+
+def set_active_kline_stream(stream):
+    global _active_stream
+    _active_stream = stream
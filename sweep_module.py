@@ -0,0 +1,284 @@
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from backtest_module import run_backtest, with_backtest_indicators
+from candle_store_module import get_candle_store, to_ms
+from confluence_module import RULE_PARAMS, STRENGTH_WEIGHTS, evaluate_confluences
+
+# Values tried per parameter: the confluence threshold, the trade-entry strength cutoff, the
+# calculate_confluence_strength weights and the RULE_PARAMS cutoffs. Each list holds the default.
+PARAMETER_SPACE = {
+    "threshold": [2, 3, 4, 5, 6],
+    "min_strength": [50, 55, 60, 65, 70],
+    "weight_strong": [3, 4, 5],
+    "weight_medium": [2],
+    "weight_low": [0, 1, 2],
+    "rsi_oversold": [25, 30, 35],
+    "rsi_overbought": [65, 70, 75],
+    "bb_squeeze": [1.5, 2, 3],
+    "bb_expansion": [6, 8, 10],
+    "adx_ranging": [15, 20, 25],
+    "adx_trending": [20, 25, 30],
+    "adx_strong": [35, 40, 50],
+    "volume_low": [0.6, 0.7, 0.8],
+    "volume_high": [1.3, 1.5, 1.8],
+    "volume_very_high": [2, 2.5, 3],
+    "cmf_pressure": [0.1, 0.15, 0.2, 0.25],
+}
+
+DEFAULT_CONFIG = {
+    "threshold": 3, "min_strength": 60,
+    **{f"weight_{label.lower()}": weight for label, weight in STRENGTH_WEIGHTS.items()},
+    **RULE_PARAMS,
+}
+
+# (lower, upper) pairs a configuration must keep ordered for the rules to stay meaningful
+_ORDERED = [("rsi_oversold", "rsi_overbought"), ("adx_ranging", "adx_trending"), ("adx_trending", "adx_strong"),
+            ("bb_squeeze", "bb_expansion"), ("volume_low", "volume_high"), ("volume_high", "volume_very_high"),
+            ("weight_low", "weight_medium"), ("weight_medium", "weight_strong")]
+
+STAT_COLUMNS = ["trades", "win_rate", "expectancy_pct", "expectancy_r", "profit_factor", "total_return_pct",
+                "max_drawdown_pct"]
+
+# Metrics where the smallest value ranks first (drawdowns are positive percentages)
+LOWER_IS_BETTER = frozenset({"max_drawdown_pct"})
+
+
+def _is_valid(config):
+    full = {**DEFAULT_CONFIG, **config}
+    return all(full[lower] <= full[upper] for lower, upper in _ORDERED)
+
+
+def sample_configs(space=None, n_configs=1000, seed=None):
+    """Up to ``n_configs`` distinct valid configurations of ``space``, the defaults first.
+
+    The whole grid is used when it fits in ``n_configs``, otherwise a random sample of distinct cells.
+    """
+    space = PARAMETER_SPACE if space is None else space
+    unknown = set(space) - set(DEFAULT_CONFIG)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {', '.join(sorted(unknown))}")
+    names = list(space)
+    default = tuple(DEFAULT_CONFIG[name] for name in names)
+    shape = tuple(len(space[name]) for name in names)
+    size = int(np.prod(shape))
+    if size <= n_configs:
+        candidates = itertools.product(*(space[name] for name in names))
+    else:
+        rng = np.random.default_rng(seed)
+        # Distinct grid cells in random order (a full shuffle when the grid is small), decoded per
+        # parameter; extra draws make up for invalid orderings
+        flat = rng.choice(size, size=min(size, n_configs * 4), replace=False)
+        picks = zip(*np.unravel_index(flat, shape))
+        candidates = (tuple(space[name][i] for name, i in zip(names, pick)) for pick in picks)
+
+    configs, seen = [dict(zip(names, default))], {default}
+    for values in candidates:
+        if len(configs) >= n_configs:
+            break
+        config = dict(zip(names, values))
+        if values not in seen and _is_valid(config):
+            seen.add(values)
+            configs.append(config)
+    return configs
+
+
+def backtest_settings(config):
+    """run_backtest keyword arguments (threshold, min_strength, params, strength_weights) of a configuration"""
+    full = {**DEFAULT_CONFIG, **config}
+    return {"threshold": full["threshold"], "min_strength": full["min_strength"],
+            "params": {name: full[name] for name in RULE_PARAMS},
+            "strength_weights": {label: full[f"weight_{label.lower()}"] for label in STRENGTH_WEIGHTS}}
+
+
+def _pooled_stats(results):
+    """Trade statistics over the trades of several backtests pooled together"""
+    returns = np.concatenate([r.trades["return_pct"].to_numpy() for r in results])
+    r_multiples = np.concatenate([r.trades["r_multiple"].to_numpy() for r in results])
+    wins, gross_loss = returns[returns > 0], -returns[returns <= 0].sum()
+    return {
+        "trades": len(returns),
+        "win_rate": len(wins) / len(returns) * 100 if len(returns) else 0.0,
+        "expectancy_pct": float(returns.mean()) if len(returns) else 0.0,
+        "expectancy_r": float(r_multiples.mean()) if len(returns) else 0.0,
+        "profit_factor": float(wins.sum() / gross_loss) if gross_loss > 0 else float("inf") if len(wins) else 0.0,
+        "total_return_pct": float(np.mean([r.stats["total_return_pct"] for r in results])),
+        "max_drawdown_pct": float(max(r.stats["max_drawdown_pct"] for r in results)),
+    }
+
+
+def evaluate_config(config, frames, **backtest_kwargs):
+    """Pooled backtest statistics of one configuration over indicator ``frames``"""
+    settings = backtest_settings(config)
+    results = []
+    for frame in frames:
+        history = evaluate_confluences(frame, settings["threshold"], params=settings["params"],
+                                       strength_weights=settings["strength_weights"])
+        results.append(run_backtest(frame, min_strength=settings["min_strength"], history=history, **backtest_kwargs))
+    return _pooled_stats(results)
+
+
+# Datasets of a pool worker, handed over once by the initializer instead of with every task
+_worker_samples = None
+
+
+def _init_worker(samples):
+    global _worker_samples
+    _worker_samples = samples
+
+
+def _evaluate_chunk(configs, sample, backtest_kwargs):
+    frames = [frames[sample] for frames in _worker_samples.values()]
+    return [evaluate_config(config, frames, **backtest_kwargs) for config in configs]
+
+
+def _evaluate_configs(run, configs, sample, chunk_size, backtest_kwargs):
+    """Stats frame (one row per configuration) of ``configs`` on one sample, chunked over ``run``"""
+    chunks = [configs[i:i + chunk_size] for i in range(0, len(configs), chunk_size)]
+    evaluated = run(partial(_evaluate_chunk, sample=sample, backtest_kwargs=backtest_kwargs), chunks)
+    return pd.DataFrame([stats for chunk in evaluated for stats in chunk], columns=STAT_COLUMNS)
+
+
+class SweepResult:
+    """In-sample stats of every configuration, ranked, with out-of-sample stats of the best ones"""
+
+    def __init__(self, results, metric, min_trades, elapsed):
+        self.results = results
+        self.metric = metric
+        self.min_trades = min_trades
+        self.elapsed = elapsed
+
+    @property
+    def best(self):
+        """Validated configurations, best in-sample score first"""
+        return self.results[self.results["oos_trades"].notna() & (self.results.index > 0)]
+
+    @property
+    def baseline(self):
+        """Row of the default configuration"""
+        return self.results.loc[0]
+
+    def best_config(self):
+        """run_backtest keyword arguments of the top configuration (the defaults when none qualified)"""
+        label = self.best.index[0] if len(self.best) else 0
+        return backtest_settings({name: self.results.at[label, name].item()
+                                  for name in self.results.columns if name in DEFAULT_CONFIG})
+
+    def summary(self, top=10):
+        metric = self.metric
+        lines = [f"🔬 {len(self.results)} configurations in {self.elapsed:.1f}s, ranked by in-sample {metric} "
+                 f"(min {self.min_trades} trades)"]
+        varied = [name for name in self.results.columns if name in DEFAULT_CONFIG
+                  and self.results[name].nunique() > 1]
+        rows = [("baseline", self.baseline)] + [(f"#{rank}", row) for rank, (_, row)
+                                                 in enumerate(self.best.head(top).iterrows(), 1)]
+        for label, row in rows:
+            params = ", ".join(f"{name}={row[name]:g}" for name in varied if row[name] != DEFAULT_CONFIG[name])
+            lines.append(f"{'📌' if label == 'baseline' else '🏆'} {label:<8} in {row[f'is_{metric}']:+.3f} "
+                         f"({int(row['is_trades'])} trades) | out {row[f'oos_{metric}']:+.3f} "
+                         f"({int(row['oos_trades'])} trades, win {row['oos_win_rate']:.1f}%) | "
+                         f"{params or 'defaults'}")
+        return "\n".join(lines)
+
+
+def run_sweep(datasets, space=None, n_configs=1000, oos_fraction=0.3, metric="expectancy_r", min_trades=30,
+              top=10, workers=None, chunk_size=8, seed=None, **backtest_kwargs):
+    """Backtest configurations of ``space`` across ``datasets`` and validate the best out of sample.
+
+    ``datasets`` maps a name (e.g. 'BTCUSDT 15m') to an OHLCV frame. Indicators are computed once
+    per dataset and shared by every configuration; each frame is split in time, the last
+    ``oos_fraction`` held out. Configurations are ranked by the pooled in-sample ``metric`` (a
+    STAT_COLUMNS name, NaN below ``min_trades`` trades, smallest first for LOWER_IS_BETTER) and
+    the ``top`` ones plus the defaults are re-run on the held-out bars. ``workers`` processes
+    share the work (1 = in process).
+    Remaining keyword arguments go to run_backtest.
+    """
+    if metric not in STAT_COLUMNS:
+        raise ValueError(f"Unknown metric: {metric}")
+    if not 0 < oos_fraction < 1:
+        raise ValueError("oos_fraction must be between 0 and 1")
+    samples = {}
+    for name, df in datasets.items():
+        frame = with_backtest_indicators(df)
+        split = int(len(frame) * (1 - oos_fraction))
+        # The held-out part keeps the in-sample bars as indicator warm-up
+        samples[name] = {"in": frame.iloc[:split], "out": frame.iloc[split:]}
+    if not samples:
+        raise ValueError("No datasets to sweep")
+
+    configs = sample_configs(space, n_configs, seed)
+    workers = workers or os.cpu_count() or 1
+    print(f"🔬 Sweeping {len(configs)} configurations over {len(samples)} datasets with {workers} workers")
+    started = time.perf_counter()
+    if workers > 1:
+        pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(samples,))
+        run = pool.map
+    else:
+        pool = None
+        _init_worker(samples)
+        run = map
+    try:
+        in_sample = _evaluate_configs(run, configs, "in", chunk_size, backtest_kwargs)
+        score = in_sample[metric].where(in_sample["trades"] >= min_trades)
+        ranked = score.drop(index=0).sort_values(ascending=metric in LOWER_IS_BETTER, na_position="last")
+        validate = [0] + [i for i in ranked.index[:top] if not np.isnan(score[i])]
+        out_of_sample = _evaluate_configs(run, [configs[i] for i in validate], "out", chunk_size,
+                                          backtest_kwargs).set_axis(validate)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    results = pd.DataFrame(configs)
+    results = results.join(in_sample.add_prefix("is_")).join(out_of_sample.add_prefix("oos_"))
+    results.insert(len(results.columns) - len(STAT_COLUMNS) * 2, "score", score)
+    order = [0] + list(ranked.index)
+    elapsed = time.perf_counter() - started
+    print(f"✅ Sweep done in {elapsed:.1f}s ({len(configs) / elapsed:.1f} configurations/s)")
+    return SweepResult(results.loc[order], metric, min_trades, elapsed)
+
+
+def load_cached_datasets(symbols, intervals, start=None, end=None, store=None):
+    """{'SYMBOL interval': OHLCV frame} from the candle cache (no network); empty series are skipped"""
+    store = store or get_candle_store()
+    datasets = {}
+    for symbol, interval in itertools.product(symbols, intervals):
+        df = store.load(symbol, interval, start_time=to_ms(start), end_time=to_ms(end))
+        if df.empty:
+            print(f"⚠️ No cached {interval} candles for {symbol.upper()}; run backfill_ohlcv first")
+            continue
+        datasets[f"{symbol.upper()} {interval}"] = df
+    return datasets
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep confluence rule parameters over cached candles")
+    parser.add_argument("--symbols", nargs="+", default=["BTCUSDT", "ETHUSDT"])
+    parser.add_argument("--intervals", nargs="+", default=["15m", "1h"])
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    parser.add_argument("--configs", type=int, default=1000)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--metric", default="expectancy_r", choices=STAT_COLUMNS)
+    parser.add_argument("--oos", type=float, default=0.3, help="fraction of each series held out")
+    parser.add_argument("--min-trades", type=int, default=30)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    datasets = load_cached_datasets(args.symbols, args.intervals, args.start, args.end)
+    if not datasets:
+        return
+    result = run_sweep(datasets, n_configs=args.configs, oos_fraction=args.oos, metric=args.metric,
+                       min_trades=args.min_trades, top=args.top, workers=args.workers, seed=args.seed)
+    print(result.summary(args.top))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from candle_store_module import OHLCV_COLUMNS, interval_to_ms
+
+# Example regime set for ``regimes=``: calm uptrend, volatile selloff, quiet range
+MARKET_REGIMES = [
+    {"drift": 0.0004, "volatility": 0.008},
+    {"drift": -0.0006, "volatility": 0.02},
+    {"drift": 0.0, "volatility": 0.004},
+]
+
+
+def _drift_path(trend, length):
+    """Per-candle drift: a scalar, or a (start, end) pair ramped linearly across the series"""
+    if isinstance(trend, (tuple, list)):
+        return np.linspace(trend[0], trend[1], length)
+    return np.full(length, float(trend))
+
+
+def simulate_ohlcv_arrays(n_symbols, length, base_prices=100.0, volatility=0.01, trend=0.0,
+                          regimes=None, regime_switch_prob=0.01, intrabar_range=(0.005, 0.025),
+                          volume_range=(50000, 500000), floor=0.1, rng=None, seed=None):
+    """Simulate OHLCV paths for ``n_symbols`` symbols at once; returns a dict of (n_symbols, length) arrays.
+
+    Returns are Gaussian with ``volatility`` and ``trend`` drift. With ``regimes`` (a list of
+    {'drift', 'volatility'} dicts) each symbol switches regime with probability
+    ``regime_switch_prob`` per candle. Prices are floored at ``floor`` x the base price.
+    """
+    rng = rng if rng is not None else np.random.default_rng(seed)
+    shape = (n_symbols, length)
+    base = np.broadcast_to(np.asarray(base_prices, dtype=np.float64), (n_symbols,))[:, None]
+
+    drift = np.broadcast_to(_drift_path(trend, length), shape)
+    sigma = np.full(shape, float(volatility))
+    if regimes:
+        regime_drift = np.array([r.get("drift", 0.0) for r in regimes])
+        regime_vol = np.array([r.get("volatility", volatility) for r in regimes])
+        # Regime segments: a switch starts a new segment, each segment draws a random regime
+        segment = np.cumsum(rng.random(shape) < regime_switch_prob, axis=1)
+        segment_regime = rng.integers(len(regimes), size=(n_symbols, int(segment.max()) + 1))
+        regime = np.take_along_axis(segment_regime, segment, axis=1)
+        drift = drift + regime_drift[regime]
+        sigma = regime_vol[regime]
+
+    returns = drift + sigma * rng.standard_normal(shape)
+    returns[:, 0] = 0.0  # First candle sits at the base price
+    # Per-step floor close[t] = max(close[t-1] * (1 + r[t]), floor) in log space: the running
+    # maximum of the floor's overshoot pushes the path back up so it restarts from the floor
+    log_path = np.cumsum(np.log1p(np.maximum(returns, -0.99)), axis=1)
+    overshoot = np.maximum(np.log(floor) - log_path, 0.0)
+    lift = np.maximum.accumulate(overshoot, axis=1)
+    close = base * np.exp(log_path + lift)
+    on_floor = (overshoot > 0) & (overshoot == lift)
+    close[on_floor] = np.broadcast_to(base * floor, shape)[on_floor]  # Exact floor, no exp/log rounding
+
+    open_ = np.empty_like(close)
+    open_[:, 0] = close[:, 0]
+    open_[:, 1:] = close[:, :-1]
+
+    intrabar = rng.uniform(intrabar_range[0], intrabar_range[1], shape)
+    high = np.maximum(open_, close) * (1 + rng.random(shape) * intrabar)
+    low = np.minimum(open_, close) * (1 - rng.random(shape) * intrabar)
+    volume = rng.uniform(volume_range[0], volume_range[1], shape)
+    return {"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume}
+
+
+def synthetic_index(length, interval="15m", end=None):
+    """Open times ending at the interval boundary at/before ``end`` (default now)"""
+    step = interval_to_ms(interval)
+    end_ms = int(pd.Timestamp(end or datetime.now()).value // 1_000_000) // step * step
+    open_times = end_ms - step * np.arange(length - 1, -1, -1, dtype=np.int64)
+    return pd.DatetimeIndex(pd.to_datetime(open_times, unit="ms"), name="Open Time")
+
+
+def generate_ohlcv(length=1000, base_price=100.0, interval="15m", end=None, rng=None, seed=None, **params):
+    """Generate one synthetic OHLCV frame (same layout as the Binance parser output)"""
+    arrays = simulate_ohlcv_arrays(1, length, base_prices=base_price, rng=rng, seed=seed, **params)
+    values = np.column_stack([arrays[col][0] for col in OHLCV_COLUMNS])
+    return pd.DataFrame(values, index=synthetic_index(length, interval, end), columns=OHLCV_COLUMNS)
+
+
+def generate_panel(symbols, length=1000, base_prices=None, interval="15m", end=None, rng=None, seed=None,
+                   **params):
+    """Generate aligned synthetic frames for several symbols in one vectorized pass.
+
+    ``symbols`` is a list of names (or an int count); ``base_prices`` maps symbol -> price.
+    Returns {symbol: DataFrame}, all sharing one index.
+    """
+    if isinstance(symbols, int):
+        symbols = [f"SYN{i}USDT" for i in range(symbols)]
+    base_prices = base_prices or {}
+    bases = [base_prices.get(symbol, 100.0) for symbol in symbols]
+    arrays = simulate_ohlcv_arrays(len(symbols), length, base_prices=bases, rng=rng, seed=seed, **params)
+    index = synthetic_index(length, interval, end)
+    return {
+        symbol: pd.DataFrame(np.column_stack([arrays[col][i] for col in OHLCV_COLUMNS]),
+                             index=index, columns=OHLCV_COLUMNS)
+        for i, symbol in enumerate(symbols)
+    }